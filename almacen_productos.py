@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Productos convertidos por conversor_a_json.py en una base SQLite, con índices por nombre,
+slug, SKU, link de origen y hash del contenido.
+
+El modo incremental busca ahí cada fila del CSV (por link y si no por nombre) en vez de
+cargar el catálogo entero: si la fila no cambió se ignora, si cambió (también si cambió
+el nombre) se actualiza el producto conservando su SKU, y si no existe se agrega.
+Desde la base se exportan los formatos de siempre (lista JSON y catálogo JSON Lines).
+"""
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+from catalogo import escribir_atomico, escribir_lista_json, linea_producto
+from salida_json import a_json
+
+# Base del modo incremental (junto al JSON que exporta)
+RUTA_PRODUCTOS = 'datos/json/productos_mercadolibre.sqlite'
+
+# Máximo de parámetros por consulta (SQLite admite 999 en versiones antiguas)
+PARAMETROS_POR_CONSULTA = 500
+
+
+class ProductoGuardado(NamedTuple):
+    id: int
+    sku: str
+    nombre: str
+    slug: str
+    link: Optional[str]
+    hash: Optional[str]
+
+
+class AlmacenProductos:
+    """Productos convertidos, indexados para el modo incremental"""
+
+    def __init__(self, ruta: str = RUTA_PRODUCTOS):
+        """
+        Args:
+            ruta: Archivo SQLite (se crea si no existe)
+        """
+        self.ruta = ruta
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._db = sqlite3.connect(ruta)
+        # link es la clave estable del link de origen (ver huellas.clave_producto) y hash
+        # el de las columnas del CSV que forman el producto; los importados no los tienen.
+        # orden crece con cada alta o cambio: es el orden del catálogo JSON Lines.
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS productos (
+                id INTEGER PRIMARY KEY,
+                sku TEXT NOT NULL,
+                nombre TEXT NOT NULL,
+                slug TEXT NOT NULL,
+                link TEXT,
+                hash TEXT,
+                orden INTEGER NOT NULL,
+                documento TEXT NOT NULL,
+                actualizado REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS productos_nombre ON productos (nombre);
+            CREATE INDEX IF NOT EXISTS productos_slug ON productos (slug);
+            CREATE INDEX IF NOT EXISTS productos_sku ON productos (sku);
+            CREATE INDEX IF NOT EXISTS productos_link ON productos (link);
+            CREATE INDEX IF NOT EXISTS productos_hash ON productos (hash);
+            CREATE INDEX IF NOT EXISTS productos_orden ON productos (orden);
+        """)
+        self._db.commit()
+        self._orden = self._db.execute("SELECT COALESCE(MAX(orden), 0) FROM productos").fetchone()[0]
+
+    def cantidad(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+
+    def _buscar_por(self, columna: str, valores: Sequence[str]) -> Dict[str, ProductoGuardado]:
+        encontrados = {}
+        valores = list(dict.fromkeys(valor for valor in valores if valor))
+        for inicio in range(0, len(valores), PARAMETROS_POR_CONSULTA):
+            lote = valores[inicio:inicio + PARAMETROS_POR_CONSULTA]
+            filas = self._db.execute(
+                f"SELECT id, sku, nombre, slug, link, hash FROM productos "
+                f"WHERE {columna} IN ({','.join('?' * len(lote))}) ORDER BY orden",
+                lote
+            )
+            for fila in filas:
+                # Con repetidos vale el último (como en el catálogo)
+                producto = ProductoGuardado(*fila)
+                encontrados[getattr(producto, columna)] = producto
+        return encontrados
+
+    def buscar(self, links: Sequence[str], nombres: Sequence[str]) -> Tuple[Dict[str, ProductoGuardado],
+                                                                            Dict[str, ProductoGuardado]]:
+        """
+        Productos guardados con alguno de los links o nombres, en dos consultas indexadas.
+
+        Returns:
+            (link → producto, nombre → producto)
+        """
+        return self._buscar_por('link', links), self._buscar_por('nombre', nombres)
+
+    def guardar(self, producto: Dict, link: Optional[str] = None, hash_contenido: Optional[str] = None,
+                id_producto: Optional[int] = None):
+        """
+        Agrega el producto, o reemplaza el de id_producto. Se confirma con confirmar().
+        """
+        self._orden += 1
+        valores = (producto['sku'], producto.get('nombre', ''), producto.get('slug', ''), link or None,
+                   hash_contenido, self._orden, linea_producto(producto), time.time())
+        if id_producto is None:
+            self._db.execute(
+                "INSERT INTO productos (sku, nombre, slug, link, hash, orden, documento, actualizado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", valores)
+        else:
+            self._db.execute(
+                "UPDATE productos SET sku = ?, nombre = ?, slug = ?, link = ?, hash = ?, orden = ?, "
+                "documento = ?, actualizado = ? WHERE id = ?", (*valores, id_producto))
+
+    def asociar(self, id_producto: int, link: Optional[str], hash_contenido: str):
+        """Anota link y hash de un producto importado sin cambiar el producto"""
+        self._db.execute("UPDATE productos SET link = ?, hash = ? WHERE id = ?",
+                         (link or None, hash_contenido, id_producto))
+
+    def importar(self, productos: Iterable[Dict]) -> int:
+        """
+        Agrega productos ya convertidos (sin link ni hash: se asocian la primera vez que
+        aparecen en un CSV, por nombre).
+
+        Returns:
+            Cantidad de productos importados
+        """
+        importados = 0
+        for producto in productos:
+            self.guardar(producto)
+            importados += 1
+        self.confirmar()
+        return importados
+
+    def confirmar(self):
+        self._db.commit()
+
+    def documentos(self) -> Iterator[str]:
+        """JSON compacto de cada producto, en el orden del catálogo"""
+        for (documento,) in self._db.execute("SELECT documento FROM productos ORDER BY orden"):
+            yield documento
+
+    def productos(self) -> Iterator[Dict]:
+        for documento in self.documentos():
+            yield json.loads(documento)
+
+    def exportar_json(self, ruta_json: str, compacto: bool = False):
+        """Escribe los productos como lista JSON con indent=2 (productos_mercadolibre.json)"""
+        if compacto:
+            # Los documentos ya están guardados compactos
+            escribir_atomico(ruta_json, lambda temporal: escribir_lista_json(temporal, self.documentos(), True))
+            return
+        escribir_atomico(ruta_json, lambda temporal: escribir_lista_json(temporal, (
+            a_json(producto) for producto in self.productos()
+        )))
+
+    def exportar_jsonl(self, ruta_jsonl: str):
+        """Escribe los productos como catálogo JSON Lines (ver catalogo.py), ya compactado"""
+        def escribir(temporal: Path):
+            with open(temporal, 'w', encoding='utf-8') as f:
+                for documento in self.documentos():
+                    f.write(documento + '\n')
+
+        escribir_atomico(ruta_jsonl, escribir)
+
+    def cerrar(self):
+        self._db.commit()
+        self._db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Exporta la base de productos del modo incremental")
+    parser.add_argument('--base', default=RUTA_PRODUCTOS, help=f"Base SQLite (por defecto {RUTA_PRODUCTOS})")
+    parser.add_argument('--json', help="Archivo de la lista JSON (por defecto el .json junto a la base)")
+    parser.add_argument('--jsonl', help="Archivo del catálogo JSON Lines (por defecto el .jsonl junto a la base)")
+    args = parser.parse_args()
+
+    almacen = AlmacenProductos(args.base)
+    for ruta, exportar in ((args.json or str(Path(args.base).with_suffix('.json')), almacen.exportar_json),
+                           (args.jsonl or str(Path(args.base).with_suffix('.jsonl')), almacen.exportar_jsonl)):
+        exportar(ruta)
+        print(f"💾 {almacen.cantidad()} productos exportados a {ruta}")
+    almacen.cerrar()
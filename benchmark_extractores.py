@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compara los extractores de listado (bs4 vs lxml) sobre páginas guardadas.
+Verifica que ambos produzcan exactamente los mismos datos por tarjeta y mide
+cuántas tarjetas por segundo procesa cada uno (parseo + extracción).
+
+Con --detalles compara en cambio el parseo completo de las páginas de producto
+con la lectura parcial (corte anticipado): datos, tiempo de CPU y memoria máxima.
+
+Uso:
+    python benchmark_extractores.py pagina1.html pagina2.html
+    python benchmark_extractores.py            # usa los listados guardados en datos/cache_http/
+    python benchmark_extractores.py --detalles # usa las páginas de producto del cache
+"""
+
+import sqlite3
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from cache_http import CARPETA_CACHE
+from extractores import (ESTRATEGIAS_ITEMS, EXTRACTORES, TAMANO_TROZO, detalles_desde_html,
+                         detalles_parciales, detalles_vacios, obtener_extractor)
+
+
+def paginas_del_cache(carpeta=CARPETA_CACHE):
+    """Devuelve (url, html) de las respuestas guardadas en el cache HTTP"""
+    indice = Path(carpeta) / 'indice.sqlite'
+    if not indice.exists():
+        return []
+    db = sqlite3.connect(str(indice))
+    filas = db.execute("SELECT url, hash FROM respuestas").fetchall()
+    db.close()
+    paginas = []
+    for url, hash_contenido in filas:
+        ruta = Path(carpeta) / 'objetos' / hash_contenido[:2] / hash_contenido
+        if ruta.exists():
+            paginas.append((url, ruta.read_bytes().decode('utf-8', errors='replace')))
+    return paginas
+
+
+def extraer_tarjetas(extractor, html, url):
+    """Parsea la página y extrae todas las tarjetas con el extractor"""
+    doc = extractor.parsear(html)
+    items = []
+    for estrategia in ESTRATEGIAS_ITEMS:
+        items = extractor.buscar_items(doc, estrategia)
+        if items:
+            break
+    if not items:
+        enlaces = extractor.enlaces_productos(doc)
+        items = extractor.items_desde_enlaces(enlaces) if enlaces else []
+    return [extractor.datos_tarjeta(item, url) for item in items]
+
+
+def medir(extractor, paginas, repeticiones):
+    """Tarjetas por segundo del extractor sobre todas las páginas"""
+    inicio = time.perf_counter()
+    tarjetas = 0
+    for _ in range(repeticiones):
+        for url, html in paginas:
+            tarjetas += len(extraer_tarjetas(extractor, html, url))
+    duracion = time.perf_counter() - inicio
+    return tarjetas / duracion if duracion else 0.0
+
+
+def trozos(contenido):
+    """Divide el contenido como lo entregaría response.iter_content(TAMANO_TROZO)"""
+    return (contenido[i:i + TAMANO_TROZO] for i in range(0, len(contenido), TAMANO_TROZO))
+
+
+def medir_detalles(funcion, paginas):
+    """Milisegundos de CPU por página y pico de memoria (KB) de una función de detalles"""
+    inicio = time.process_time()
+    for _, contenido in paginas:
+        funcion(contenido)
+    ms_por_pagina = (time.process_time() - inicio) * 1000 / len(paginas)
+
+    pico = 0
+    for _, contenido in paginas:
+        tracemalloc.start()
+        funcion(contenido)
+        pico = max(pico, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return ms_por_pagina, pico / 1024
+
+
+def comparar_detalles(paginas):
+    """Compara el parseo completo de las páginas de producto con la lectura parcial"""
+    paginas = [(url, html.encode('utf-8')) for url, html in paginas]
+    paginas = [(url, contenido) for url, contenido in paginas
+               if detalles_desde_html(contenido.decode('utf-8')) != detalles_vacios()]
+    if not paginas:
+        print("❌ No hay páginas de producto para comparar.")
+        sys.exit(1)
+    print(f"📄 {len(paginas)} páginas de producto")
+
+    leidos = 0
+    total = 0
+    for url, contenido in paginas:
+        detalles, lectura = detalles_parciales(trozos(contenido))
+        leidos += lectura['bytes_leidos']
+        total += len(contenido)
+        if detalles != detalles_desde_html(contenido.decode('utf-8')):
+            print(f"⚠️  La lectura parcial difiere en {url[:80]}")
+    print(f"📉 La lectura parcial usó {leidos / total:.0%} de los bytes")
+
+    completo = medir_detalles(lambda c: detalles_desde_html(c.decode('utf-8')), paginas)
+    parcial = medir_detalles(lambda c: detalles_parciales(trozos(c)), paginas)
+    print(f"\n⏱️  Por página:")
+    print(f"   • completo: {completo[0]:.1f} ms de CPU, {completo[1]:,.0f} KB de memoria máxima")
+    print(f"   • parcial : {parcial[0]:.1f} ms de CPU, {parcial[1]:,.0f} KB de memoria máxima")
+
+
+def main():
+    argumentos = sys.argv[1:]
+    detalles = '--detalles' in argumentos
+    argumentos = [a for a in argumentos if a != '--detalles']
+    if argumentos:
+        paginas = [(Path(ruta).resolve().as_uri(), Path(ruta).read_text(encoding='utf-8'))
+                   for ruta in argumentos]
+    else:
+        paginas = paginas_del_cache()
+
+    if detalles:
+        comparar_detalles(paginas)
+        return
+
+    referencia = obtener_extractor('bs4')
+    # Solo páginas de listado: las que tienen tarjetas con el extractor de referencia
+    paginas = [(url, html) for url, html in paginas if extraer_tarjetas(referencia, html, url)]
+    if not paginas:
+        print("❌ No hay páginas de listado para comparar.")
+        print("   Pasa archivos HTML como argumentos o ejecuta antes el scraper con cache.")
+        sys.exit(1)
+
+    total_tarjetas = sum(len(extraer_tarjetas(referencia, html, url)) for url, html in paginas)
+    print(f"📄 {len(paginas)} páginas de listado, {total_tarjetas} tarjetas")
+
+    # 1. Verificar que todos los extractores den los mismos datos
+    diferencias = 0
+    for nombre in EXTRACTORES:
+        if nombre == referencia.nombre:
+            continue
+        extractor = obtener_extractor(nombre)
+        for url, html in paginas:
+            esperado = extraer_tarjetas(referencia, html, url)
+            obtenido = extraer_tarjetas(extractor, html, url)
+            if esperado != obtenido:
+                diferencias += 1
+                print(f"❌ {nombre} difiere de {referencia.nombre} en {url[:80]}")
+    if diferencias:
+        sys.exit(1)
+    print("✅ Todos los extractores producen los mismos datos")
+
+    # 2. Medir velocidad
+    repeticiones = max(1, 2000 // total_tarjetas)
+    print(f"\n⏱️  Tarjetas por segundo ({repeticiones} repeticiones):")
+    resultados = {}
+    for nombre in EXTRACTORES:
+        resultados[nombre] = medir(obtener_extractor(nombre), paginas, repeticiones)
+        print(f"   • {nombre:5s}: {resultados[nombre]:,.0f} tarjetas/s")
+
+    base = resultados[referencia.nombre]
+    for nombre, velocidad in resultados.items():
+        if nombre != referencia.nombre and base:
+            print(f"   → {nombre} es {velocidad / base:.1f}x más rápido que {referencia.nombre}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache persistente de respuestas HTTP para el scraper.
+Los cuerpos se guardan direccionados por contenido (SHA-256) en datos/cache_http/objetos/
+y un índice SQLite relaciona cada URL con su contenido, ETag/Last-Modified y fechas de uso.
+
+- Las entradas vigentes (dentro del TTL) se sirven sin tocar la red.
+- Las vencidas se revalidan con If-None-Match / If-Modified-Since (un 304 no descarga nada).
+- Si el total supera el tamaño máximo se eliminan las entradas usadas hace más tiempo (LRU).
+- En modo "solo replay" todo se sirve desde el cache y nunca se accede a la red.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CARPETA_CACHE = 'datos/cache_http'
+
+# Tiempo de vida por tipo de página (en segundos)
+TTL_POR_TIPO = {
+    'listado': 60 * 60,         # 1 hora: los listados cambian con precios y stock
+    'detalle': 24 * 60 * 60,    # 1 día: descripciones y características cambian poco
+}
+TTL_POR_DEFECTO = 60 * 60
+
+# Tamaño máximo del cache en disco
+TAMANO_MAXIMO = 500 * 1024 * 1024
+
+# Headers de la respuesta que se guardan junto al contenido
+HEADERS_GUARDADOS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+class SinCacheError(requests.RequestException):
+    """La URL no está en el cache y el modo solo replay impide descargarla"""
+
+
+class CacheHTTP:
+    """
+    Cache en disco de respuestas GET, direccionado por contenido.
+    Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, carpeta: str = CARPETA_CACHE, ttls: Optional[Dict[str, int]] = None,
+                 tamano_maximo: int = TAMANO_MAXIMO, solo_replay: bool = False):
+        """
+        Args:
+            carpeta: Carpeta del cache (índice y objetos)
+            ttls: TTL en segundos por tipo de página; se combina con TTL_POR_TIPO
+            tamano_maximo: Tamaño máximo en bytes antes de eliminar entradas (LRU)
+            solo_replay: Si es True nunca se accede a la red
+        """
+        self.carpeta = Path(carpeta)
+        self.carpeta_objetos = self.carpeta / 'objetos'
+        self.carpeta_objetos.mkdir(parents=True, exist_ok=True)
+        self.ttls = {**TTL_POR_TIPO, **(ttls or {})}
+        self.tamano_maximo = tamano_maximo
+        self.solo_replay = solo_replay
+        self.estadisticas = {'aciertos': 0, 'revalidadas': 0, 'descargadas': 0, 'eliminadas': 0}
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.carpeta / 'indice.sqlite'), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS respuestas (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                url_final TEXT,
+                headers TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                guardado REAL NOT NULL,
+                ultimo_acceso REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_acceso ON respuestas(ultimo_acceso)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_hash ON respuestas(hash)")
+        self._db.commit()
+
+    def _ruta_objeto(self, hash_contenido: str) -> Path:
+        return self.carpeta_objetos / hash_contenido[:2] / hash_contenido
+
+    def buscar(self, url: str) -> Optional[Dict]:
+        """Devuelve la entrada del índice para la URL, o None si no está"""
+        with self._lock:
+            fila = self._db.execute(
+                "SELECT hash, url_final, headers, etag, last_modified, guardado FROM respuestas WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if not fila or not self._ruta_objeto(fila[0]).exists():
+            return None
+        return {
+            'url': url,
+            'hash': fila[0],
+            'url_final': fila[1] or url,
+            'headers': json.loads(fila[2] or '{}'),
+            'etag': fila[3],
+            'last_modified': fila[4],
+            'guardado': fila[5],
+        }
+
+    def vigente(self, entrada: Dict, tipo: Optional[str] = None) -> bool:
+        """Indica si la entrada puede servirse sin revalidar según el TTL de su tipo"""
+        ttl = self.ttls.get(tipo, TTL_POR_DEFECTO)
+        return self.solo_replay or time.time() - entrada['guardado'] < ttl
+
+    def headers_condicionales(self, entrada: Dict) -> Dict[str, str]:
+        """Headers para revalidar una entrada vencida con un GET condicional"""
+        headers = {}
+        if entrada.get('etag'):
+            headers['If-None-Match'] = entrada['etag']
+        if entrada.get('last_modified'):
+            headers['If-Modified-Since'] = entrada['last_modified']
+        return headers
+
+    def respuesta(self, entrada: Dict) -> Optional[requests.Response]:
+        """
+        Construye un requests.Response a partir de una entrada del cache.
+        Devuelve None si el archivo ya no está (p. ej. lo eliminó el límite de tamaño desde otro hilo).
+        """
+        try:
+            with open(self._ruta_objeto(entrada['hash']), 'rb') as f:
+                contenido = f.read()
+        except OSError:
+            return None
+
+        with self._lock:
+            self._db.execute("UPDATE respuestas SET ultimo_acceso = ? WHERE url = ?",
+                             (time.time(), entrada['url']))
+            self._db.commit()
+
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response._content = contenido
+        response._content_consumed = True
+        response.url = entrada['url_final']
+        response.headers = CaseInsensitiveDict(entrada['headers'])
+        response.from_cache = True
+        return response
+
+    def obtener(self, url: str, descargar: Callable[[Dict[str, str]], requests.Response],
+                tipo: Optional[str] = None) -> requests.Response:
+        """
+        Devuelve la respuesta para la URL usando el cache cuando es posible.
+        
+        Args:
+            url: URL pedida (clave del cache)
+            descargar: Función que hace el GET real; recibe los headers condicionales a agregar
+            tipo: Tipo de página ('listado', 'detalle'...) para elegir el TTL
+        """
+        entrada = self.buscar(url)
+        if entrada and self.vigente(entrada, tipo):
+            response = self.respuesta(entrada)
+            if response is not None:
+                with self._lock:
+                    self.estadisticas['aciertos'] += 1
+                return response
+
+        self.exigir_red(url)
+
+        response = descargar(self.headers_condicionales(entrada) if entrada else {})
+        if response.status_code == 304 and entrada:
+            self.renovar(entrada, response)
+            guardada = self.respuesta(entrada)
+            if guardada is not None:
+                return guardada
+            # El archivo se eliminó mientras se revalidaba: se descarga entero
+            response = descargar({})
+        if response.status_code == 200:
+            self.guardar(url, response)
+        return response
+
+    def copia_vigente(self, url: str, tipo: Optional[str] = None) -> Optional[requests.Response]:
+        """Respuesta guardada para la URL si puede servirse sin revalidar, o None"""
+        entrada = self.buscar(url)
+        if not entrada or not self.vigente(entrada, tipo):
+            return None
+        response = self.respuesta(entrada)
+        if response is not None:
+            with self._lock:
+                self.estadisticas['aciertos'] += 1
+        return response
+
+    def exigir_red(self, url: str):
+        """Lanza SinCacheError si el modo solo replay impide descargar la URL"""
+        if self.solo_replay:
+            raise SinCacheError(f"Sin copia en cache (modo solo replay): {url}")
+
+    def renovar(self, entrada: Dict, response: requests.Response):
+        """Marca como fresca una entrada revalidada con 304 Not Modified"""
+        ahora = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE respuestas SET guardado = ?, ultimo_acceso = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (ahora, ahora, response.headers.get('ETag'), response.headers.get('Last-Modified'), entrada['url'])
+            )
+            self._db.commit()
+            self.estadisticas['revalidadas'] += 1
+
+    def guardar(self, url: str, response: requests.Response):
+        """Guarda una respuesta 200 en el cache y aplica el límite de tamaño"""
+        contenido = response.content
+        hash_contenido = hashlib.sha256(contenido).hexdigest()
+        ruta = self._ruta_objeto(hash_contenido)
+
+        if not ruta.exists():
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            temporal = ruta.with_name(f"{ruta.name}.{threading.get_ident()}.tmp")
+            with open(temporal, 'wb') as f:
+                f.write(contenido)
+            os.replace(temporal, ruta)
+
+        headers = {k: response.headers[k] for k in HEADERS_GUARDADOS if k in response.headers}
+        ahora = time.time()
+        with self._lock:
+            anterior = self._db.execute("SELECT hash FROM respuestas WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO respuestas "
+                "(url, hash, tamano, url_final, headers, etag, last_modified, guardado, ultimo_acceso) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, hash_contenido, len(contenido), response.url, json.dumps(headers),
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), ahora, ahora)
+            )
+            if anterior and anterior[0] != hash_contenido:
+                self._eliminar_objeto_si_huerfano(anterior[0])
+            self._db.commit()
+            self.estadisticas['descargadas'] += 1
+            self._aplicar_limite()
+
+    def _eliminar_objeto_si_huerfano(self, hash_contenido: str) -> bool:
+        """
+        Borra el archivo de contenido si ninguna URL lo referencia (requiere el lock).
+
+        Returns:
+            True si el contenido quedó sin referencias
+        """
+        en_uso = self._db.execute("SELECT 1 FROM respuestas WHERE hash = ? LIMIT 1", (hash_contenido,)).fetchone()
+        if en_uso:
+            return False
+        try:
+            self._ruta_objeto(hash_contenido).unlink()
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _tamano_total(self) -> int:
+        fila = self._db.execute(
+            "SELECT COALESCE(SUM(tamano), 0) FROM (SELECT MAX(tamano) AS tamano FROM respuestas GROUP BY hash)"
+        ).fetchone()
+        return fila[0]
+
+    def _aplicar_limite(self):
+        """Elimina las entradas menos usadas recientemente hasta respetar el tamaño máximo (requiere el lock)"""
+        total = self._tamano_total()
+        while total > self.tamano_maximo:
+            fila = self._db.execute(
+                "SELECT url, hash, tamano FROM respuestas ORDER BY ultimo_acceso LIMIT 1"
+            ).fetchone()
+            if not fila:
+                break
+            self._db.execute("DELETE FROM respuestas WHERE url = ?", (fila[0],))
+            # El total cuenta cada contenido una vez: solo baja cuando ninguna URL lo usa
+            if self._eliminar_objeto_si_huerfano(fila[1]):
+                total -= fila[2]
+            self.estadisticas['eliminadas'] += 1
+        self._db.commit()
+
+    def imprimir_estadisticas(self):
+        """Muestra el resumen de uso del cache"""
+        stats = self.estadisticas
+        print(f"🗄️  Cache HTTP: {stats['aciertos']} aciertos, {stats['revalidadas']} revalidadas (304), "
+              f"{stats['descargadas']} descargadas, {stats['eliminadas']} eliminadas por tamaño")
+
+    def cerrar(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Catálogo consolidado de productos en JSON Lines (un producto por línea), solo de agregado.
+
+El modo incremental de conversor_a_json.py agrega al final las líneas de los productos
+nuevos en vez de reescribir todo el JSON, y quien lo lea puede recorrerlo producto a
+producto. Si un producto aparece en varias líneas vale la última; cuando las líneas
+reemplazadas pasan de COMPACTAR_DESDE el archivo se compacta, escribiendo las vigentes en
+un temporal que se renombra al terminar (el catálogo nunca queda a medias).
+
+exportar_json() genera el formato de siempre (productos_mercadolibre.json, una lista JSON).
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from salida_json import a_json
+
+# Catálogo del modo incremental (junto al JSON que exporta)
+RUTA_CATALOGO = 'datos/json/productos_mercadolibre.jsonl'
+
+# Proporción de líneas reemplazadas desde la que conviene compactar
+COMPACTAR_DESDE = 0.5
+
+# Con menos líneas reemplazadas que esto no vale la pena reescribir el archivo
+COMPACTAR_MINIMO = 100
+
+
+def clave_catalogo(producto: Dict) -> str:
+    """Identidad de un producto en el catálogo: su nombre (como en el modo incremental)"""
+    return producto.get('nombre', '')
+
+
+def linea_producto(producto: Dict) -> str:
+    """Línea JSON compacta de un producto, sin el salto de línea"""
+    return a_json(producto, compacto=True)
+
+
+def escribir_lista_json(ruta: Path, textos: Iterable[str], compacto: bool = False):
+    """
+    Escribe una lista JSON a partir del JSON (indent=2) de cada elemento, sin volver a
+    serializarlos: el archivo queda igual que con json.dump(lista, f, indent=2).
+    Con compacto los elementos vienen compactos y la lista también lo es.
+    """
+    with open(ruta, 'w', encoding='utf-8') as f:
+        if compacto:
+            f.write('[')
+            for posicion, texto in enumerate(textos):
+                f.write(',' + texto if posicion else texto)
+            f.write(']')
+            return
+        separador = '[\n  '
+        for texto in textos:
+            f.write(separador)
+            f.write(texto.replace('\n', '\n  '))
+            separador = ',\n  '
+        f.write('[]' if separador == '[\n  ' else '\n]')
+
+
+def escribir_atomico(ruta: Path, escribir: Callable[[Path], None]):
+    """Llama a escribir() con un temporal de la misma carpeta y lo renombra a ruta al terminar"""
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=f'.{ruta.name}-')
+    os.close(descriptor)
+    try:
+        escribir(Path(temporal))
+        with open(temporal, 'rb') as f:
+            os.fsync(f.fileno())
+        # mkstemp crea el temporal solo para el dueño; se deja como un archivo normal
+        os.chmod(temporal, ruta.stat().st_mode if ruta.exists() else 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.remove(temporal)
+        raise
+
+
+class CatalogoJSONL:
+    """
+    Catálogo de productos en un archivo JSON Lines. Solo se agregan líneas; un producto
+    repetido reemplaza al anterior con la misma clave (ver clave_catalogo).
+    """
+
+    def __init__(self, ruta: str = RUTA_CATALOGO, clave: Callable[[Dict], str] = clave_catalogo):
+        """
+        Args:
+            ruta: Archivo .jsonl del catálogo (se crea al agregar el primer producto)
+            clave: Función que da la identidad de un producto
+        """
+        self.ruta = Path(ruta)
+        self.clave = clave
+        # Conteo de líneas y de productos vigentes, si ya se leyó el archivo
+        self._lineas = None
+        self._vigentes = None
+
+    def existe(self) -> bool:
+        return self.ruta.exists()
+
+    def _leer_lineas(self) -> Iterator[Tuple[str, Dict]]:
+        """(línea, producto) de cada línea válida, en orden"""
+        if not self.existe():
+            return
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            for numero, linea in enumerate(f, 1):
+                linea = linea.rstrip('\n')
+                if not linea:
+                    continue
+                try:
+                    yield linea, json.loads(linea)
+                except json.JSONDecodeError:
+                    # Normalmente una última línea cortada por una interrupción
+                    print(f"⚠️  Línea {numero} inválida en {self.ruta.name}, se omite")
+
+    def claves(self) -> Dict[str, int]:
+        """Clave de cada producto vigente → número de su última línea válida"""
+        vigentes = {}
+        lineas = 0
+        for lineas, (_, producto) in enumerate(self._leer_lineas(), 1):
+            vigentes[self.clave(producto)] = lineas
+        self._lineas, self._vigentes = lineas, len(vigentes)
+        return vigentes
+
+    def lineas_vigentes(self) -> Iterator[str]:
+        """Línea JSON de cada producto vigente, en el orden del archivo"""
+        vigentes = self.claves()
+        for numero, (linea, producto) in enumerate(self._leer_lineas(), 1):
+            if vigentes.get(self.clave(producto)) == numero:
+                yield linea
+
+    def productos(self) -> Iterator[Dict]:
+        """Productos vigentes, de a uno (sin cargar el catálogo entero)"""
+        for linea in self.lineas_vigentes():
+            yield json.loads(linea)
+
+    def _reparar_final(self):
+        """Descarta una última línea sin terminar, para no pegarle la siguiente"""
+        if not self.existe() or self.ruta.stat().st_size == 0:
+            return
+        with open(self.ruta, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b'\n':
+                return
+            f.seek(0)
+            contenido = f.read()
+            f.truncate(contenido.rfind(b'\n') + 1)
+        print(f"⚠️  Se descartó una línea incompleta al final de {self.ruta.name}")
+
+    def agregar(self, productos: Iterable[Dict], vigentes: Optional[Dict[str, int]] = None) -> int:
+        """
+        Agrega los productos al final del catálogo.
+
+        Args:
+            productos: Productos a agregar
+            vigentes: El resultado de claves(); se actualiza con los agregados, así los
+                conteos siguen al día sin volver a leer el archivo
+
+        Returns:
+            Cantidad de productos agregados
+        """
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._reparar_final()
+        agregados = 0
+        with open(self.ruta, 'a', encoding='utf-8') as f:
+            for producto in productos:
+                f.write(linea_producto(producto) + '\n')
+                agregados += 1
+                if vigentes is not None:
+                    vigentes[self.clave(producto)] = self._lineas + agregados
+            f.flush()
+            os.fsync(f.fileno())
+        if vigentes is not None:
+            self._lineas += agregados
+            self._vigentes = len(vigentes)
+        else:
+            # Los agregados pueden reemplazar productos: se sabrá al volver a leer
+            self._lineas = self._vigentes = None
+        return agregados
+
+    def contar_lineas(self) -> int:
+        """Líneas del archivo, sin interpretarlas"""
+        if not self.existe():
+            return 0
+        lineas = 0
+        with open(self.ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                lineas += bloque.count(b'\n')
+        return lineas
+
+    def necesita_compactar(self, vigentes: Optional[int] = None) -> bool:
+        """
+        True si las líneas reemplazadas pasan de COMPACTAR_DESDE (y de COMPACTAR_MINIMO).
+
+        Args:
+            vigentes: Cantidad de productos, si se sabe (p. ej. por almacen_productos.py);
+                así solo se cuentan las líneas en vez de leer el catálogo
+        """
+        if vigentes is not None:
+            if self._lineas is None:
+                self._lineas = self.contar_lineas()
+            self._vigentes = vigentes
+        elif self._lineas is None or self._vigentes is None:
+            self.claves()
+        reemplazadas = self._lineas - self._vigentes
+        return reemplazadas >= COMPACTAR_MINIMO and reemplazadas > COMPACTAR_DESDE * self._lineas
+
+    def compactar(self) -> Tuple[int, int]:
+        """
+        Reescribe el catálogo solo con las líneas vigentes.
+
+        Returns:
+            (líneas antes, líneas después)
+        """
+        def escribir(temporal: Path):
+            with open(temporal, 'w', encoding='utf-8') as f:
+                for linea in self.lineas_vigentes():
+                    f.write(linea + '\n')
+
+        # lineas_vigentes() recorre el archivo y actualiza los conteos
+        escribir_atomico(self.ruta, escribir)
+        antes = self._lineas
+        self._lineas = self._vigentes
+        return antes, self._vigentes
+
+    def reescribir(self, productos: Iterable[Dict]):
+        """Reemplaza el catálogo entero por los productos dados"""
+        def escribir(temporal: Path):
+            with open(temporal, 'w', encoding='utf-8') as f:
+                for producto in productos:
+                    f.write(linea_producto(producto) + '\n')
+
+        escribir_atomico(self.ruta, escribir)
+        self._lineas = self._vigentes = None
+
+    def importar_json(self, ruta_json: str):
+        """Crea el catálogo desde una lista JSON (el productos_mercadolibre.json de antes)"""
+        with open(ruta_json, 'r', encoding='utf-8') as f:
+            self.reescribir(json.load(f))
+
+    def exportar_json(self, ruta_json: str, compacto: bool = False):
+        """Escribe los productos vigentes como lista JSON con indent=2 (el formato de siempre)"""
+        escribir_atomico(ruta_json, lambda temporal: escribir_lista_json(temporal, (
+            a_json(producto, compacto) for producto in self.productos()
+        ), compacto))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mantenimiento del catálogo JSON Lines de productos")
+    parser.add_argument('--catalogo', default=RUTA_CATALOGO, help=f"Archivo del catálogo (por defecto {RUTA_CATALOGO})")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    exportar = subcomandos.add_parser('exportar', help="Exporta el catálogo a una lista JSON")
+    exportar.add_argument('salida', nargs='?', help="Archivo JSON (por defecto el .json junto al catálogo)")
+    subcomandos.add_parser('compactar', help="Deja solo la última línea de cada producto")
+    importar = subcomandos.add_parser('importar', help="Crea el catálogo desde una lista JSON")
+    importar.add_argument('entrada', help="Archivo JSON con la lista de productos")
+    args = parser.parse_args()
+
+    catalogo = CatalogoJSONL(args.catalogo)
+    if args.comando == 'exportar':
+        salida = args.salida or str(catalogo.ruta.with_suffix('.json'))
+        catalogo.exportar_json(salida)
+        print(f"💾 {catalogo._vigentes} productos exportados a {salida}")
+    elif args.comando == 'compactar':
+        antes, despues = catalogo.compactar()
+        print(f"🗜️  Catálogo compactado: {antes} → {despues} líneas")
+    else:
+        catalogo.importar_json(args.entrada)
+        print(f"📦 Catálogo creado desde {args.entrada}: {len(catalogo.claves())} productos")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checkpoint de un scraping largo, para poder reanudarlo si se corta (error, Ctrl+C).
+Cada paso se guarda en SQLite en cuanto termina:
+- La frontera: las URLs de las páginas del listado y si ya se procesaron.
+- Cada producto terminado (con sus detalles e imagen).
+
+Al reanudar, las páginas completas se reconstruyen desde el checkpoint sin tocar la red
+y en las demás solo se procesan los productos que faltan.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+RUTA_CHECKPOINT = 'datos/checkpoint.sqlite'
+
+# Cómo se descubren las páginas del listado (ver iterar_paginas_listado)
+ESQUEMA_OFFSET = 'offset'
+ESQUEMA_SIGUIENTE = 'siguiente'
+
+
+class CheckpointCrawl:
+    """
+    Checkpoint del scraping de una tienda. Varias tiendas pueden compartir el mismo archivo.
+    Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, url_tienda: str, ruta: str = RUTA_CHECKPOINT, reanudar: bool = False):
+        """
+        Args:
+            url_tienda: URL inicial del listado (identifica el scraping)
+            ruta: Archivo SQLite del checkpoint
+            reanudar: Si es False se descarta lo guardado antes para esta tienda
+        """
+        self.url_tienda = url_tienda
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        # WAL: cada escritura queda en disco sin bloquear las lecturas
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS crawls (
+                url_tienda TEXT PRIMARY KEY,
+                esquema TEXT,
+                iniciado REAL NOT NULL,
+                terminado REAL
+            );
+            CREATE TABLE IF NOT EXISTS paginas (
+                url_tienda TEXT NOT NULL,
+                numero INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                completa INTEGER NOT NULL DEFAULT 0,
+                items INTEGER,
+                siguiente TEXT,
+                PRIMARY KEY (url_tienda, numero)
+            );
+            CREATE TABLE IF NOT EXISTS productos (
+                url_tienda TEXT NOT NULL,
+                pagina INTEGER NOT NULL,
+                indice INTEGER NOT NULL,
+                link TEXT,
+                datos TEXT NOT NULL,
+                PRIMARY KEY (url_tienda, pagina, indice)
+            );
+        """)
+
+        with self._lock:
+            existe = self._db.execute("SELECT terminado FROM crawls WHERE url_tienda = ?",
+                                      (url_tienda,)).fetchone()
+            # Un scraping que ya terminó no se reanuda: se empieza de nuevo
+            self.reanudado = bool(reanudar and existe and existe[0] is None)
+            if reanudar and existe and not self.reanudado:
+                print("ℹ️  El scraping anterior de esta tienda ya había terminado, se empieza de cero")
+            if not self.reanudado:
+                for tabla in ('crawls', 'paginas', 'productos'):
+                    self._db.execute(f"DELETE FROM {tabla} WHERE url_tienda = ?", (url_tienda,))
+                self._db.execute("INSERT INTO crawls (url_tienda, iniciado) VALUES (?, ?)",
+                                 (url_tienda, time.time()))
+            self._db.commit()
+
+    # --- Frontera ---
+
+    @property
+    def esquema(self) -> Optional[str]:
+        with self._lock:
+            fila = self._db.execute("SELECT esquema FROM crawls WHERE url_tienda = ?",
+                                    (self.url_tienda,)).fetchone()
+        return fila[0] if fila else None
+
+    def registrar_paginas(self, paginas: List[Tuple[int, str]], esquema: str):
+        """Agrega (número, url) a la frontera; las ya registradas no cambian"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO paginas (url_tienda, numero, url) VALUES (?, ?, ?)",
+                [(self.url_tienda, numero, url) for numero, url in paginas]
+            )
+            self._db.execute("UPDATE crawls SET esquema = ? WHERE url_tienda = ?", (esquema, self.url_tienda))
+            self._db.commit()
+
+    def frontera(self) -> List[Dict]:
+        """Páginas registradas en orden, con su estado"""
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT numero, url, completa, items, siguiente FROM paginas "
+                "WHERE url_tienda = ? ORDER BY numero", (self.url_tienda,)
+            ).fetchall()
+        return [{'numero': f[0], 'url': f[1], 'completa': bool(f[2]), 'items': f[3], 'siguiente': f[4]}
+                for f in filas]
+
+    def pagina(self, numero: int) -> Optional[Dict]:
+        """Estado de una página de la frontera"""
+        for pagina in self.frontera():
+            if pagina['numero'] == numero:
+                return pagina
+        return None
+
+    def completar_pagina(self, numero: int, items: int, siguiente: Optional[str] = None):
+        """Marca una página como procesada entera"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE paginas SET completa = 1, items = ?, siguiente = ? WHERE url_tienda = ? AND numero = ?",
+                (items, siguiente, self.url_tienda, numero)
+            )
+            self._db.commit()
+
+    def terminar(self):
+        """Marca el scraping como terminado"""
+        with self._lock:
+            self._db.execute("UPDATE crawls SET terminado = ? WHERE url_tienda = ?", (time.time(), self.url_tienda))
+            self._db.commit()
+
+    # --- Productos ---
+
+    def guardar_producto(self, pagina: int, indice: int, producto: Dict):
+        """Guarda un producto terminado (posición indice dentro de la página)"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO productos (url_tienda, pagina, indice, link, datos) VALUES (?, ?, ?, ?, ?)",
+                (self.url_tienda, pagina, indice, producto.get('Link'), json.dumps(producto, ensure_ascii=False))
+            )
+            self._db.commit()
+
+    def productos_pagina(self, pagina: int) -> Dict[int, Dict]:
+        """Productos guardados de una página, por posición"""
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT indice, datos FROM productos WHERE url_tienda = ? AND pagina = ? ORDER BY indice",
+                (self.url_tienda, pagina)
+            ).fetchall()
+        return {indice: json.loads(datos) for indice, datos in filas}
+
+    def cerrar(self):
+        with self._lock:
+            self._db.close()
@@ -9,10 +9,29 @@ import pandas as pd
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
 import unicodedata
 import random
 
+from almacen_productos import AlmacenProductos
+from catalogo import CatalogoJSONL, escribir_lista_json
+from huellas import clave_producto
+from salida_json import MODOS_INDIVIDUALES, EscritorIndividuales, a_json
+
+# Categoría y subcategoría que se asignan a todos los productos
+CATEGORIA = "OTROS"
+SUBCATEGORIA = "Varios"
+
+# Filas que se convierten juntas (un trozo por tarea del pool de procesos)
+FILAS_POR_TROZO = 5000
+
+# Carpeta del almacén de imágenes (ver imagenes.py)
+RUTA_IMAGENES = "datos/imagenes"
+
 def limpiar_texto(texto: str) -> str:
     """Limpia y normaliza texto"""
     if pd.isna(texto) or texto == "":
@@ -31,19 +50,21 @@ def generar_slug(nombre: str) -> str:
     texto = re.sub(r'[-\s]+', '-', texto)
     return texto.strip('-')
 
+def prefijo_sku(texto: str, largo: int) -> str:
+    """Primeras `largo` letras del texto en mayúsculas, completadas con X"""
+    limpio = re.sub(r'[^a-zA-Z]', '', texto.upper())
+    return limpio[:largo] if len(limpio) >= largo else limpio.ljust(largo, 'X')
+
 def generar_sku_personalizado(nombre: str, categoria: str, subcategoria: str) -> str:
     """Genera SKU personalizado: NOM-CAT-SUB-###"""
     # Extraer primeras 3 letras del nombre (solo letras)
-    nombre_limpio = re.sub(r'[^a-zA-Z]', '', nombre.upper())
-    prefijo_nombre = nombre_limpio[:3] if len(nombre_limpio) >= 3 else nombre_limpio.ljust(3, 'X')
+    prefijo_nombre = prefijo_sku(nombre, 3)
     
     # Primeras 3-4 letras de categoría
-    categoria_limpio = re.sub(r'[^a-zA-Z]', '', categoria.upper())
-    prefijo_cat = categoria_limpio[:4] if len(categoria_limpio) >= 4 else categoria_limpio.ljust(4, 'X')
+    prefijo_cat = prefijo_sku(categoria, 4)
     
     # Primeras 3 letras de subcategoría
-    subcategoria_limpio = re.sub(r'[^a-zA-Z]', '', subcategoria.upper())
-    prefijo_sub = subcategoria_limpio[:3] if len(subcategoria_limpio) >= 3 else subcategoria_limpio.ljust(3, 'X')
+    prefijo_sub = prefijo_sku(subcategoria, 3)
     
     # 3 números aleatorios
     numeros = random.randint(100, 999)
@@ -92,32 +113,36 @@ def parsear_caracteristicas(caracteristicas: str) -> Dict[str, Any]:
     
     return atributos
 
-def extraer_tags(titulo: str, caracteristicas: str = "") -> List[str]:
-    """Extrae tags relevantes del título y características"""
+# Palabras comunes a ignorar en los tags
+STOPWORDS_TAGS = {'de', 'la', 'el', 'en', 'para', 'con', 'y', 'a', 'por', 'un', 'una', 
+                  'los', 'las', 'del', 'al', 'que', 'se', 'su', 'producto', 'este', 'esta',
+                  'son', 'más', 'todo', 'cada', 'como', 'desde', 'hasta', 'muy', 'otros',
+                  'mismo', 'también', 'solo', 'puede', 'cada'}
+
+# Palabras candidatas a tag: del título (3 a 20 letras) y de las características (4 a 20)
+RE_TAGS_TITULO = r'\b[a-záéíóúñ]{3,20}\b'
+RE_TAGS_CARACTERISTICAS = r'\b[a-záéíóúñ]{4,20}\b'
+
+def tags_desde_palabras(palabras_titulo: List[str], palabras_caract: List[str]) -> List[str]:
+    """Tags a partir de las palabras ya extraídas del título y de las características"""
     tags = set()
-    
-    # Palabras comunes a ignorar
-    stopwords = {'de', 'la', 'el', 'en', 'para', 'con', 'y', 'a', 'por', 'un', 'una', 
-                 'los', 'las', 'del', 'al', 'que', 'se', 'su', 'producto', 'este', 'esta',
-                 'son', 'más', 'todo', 'cada', 'como', 'desde', 'hasta', 'muy', 'otros',
-                 'mismo', 'también', 'solo', 'puede', 'cada'}
-    
-    # Extraer palabras del título (mínimo 3 caracteres, no más de 20)
-    palabras_titulo = re.findall(r'\b[a-záéíóúñ]{3,20}\b', titulo.lower())
     for palabra in palabras_titulo:
-        if palabra not in stopwords and not palabra.isdigit():
+        if palabra not in STOPWORDS_TAGS and not palabra.isdigit():
             tags.add(palabra)
     
-    # Extraer de características también
-    if caracteristicas:
-        palabras_caract = re.findall(r'\b[a-záéíóúñ]{4,20}\b', caracteristicas.lower())
-        for palabra in palabras_caract[:5]:  # Solo las primeras 5
-            if palabra not in stopwords and not palabra.isdigit():
-                tags.add(palabra)
+    for palabra in palabras_caract[:5]:  # Solo las primeras 5
+        if palabra not in STOPWORDS_TAGS and not palabra.isdigit():
+            tags.add(palabra)
     
     # Limitar a máximo 10 tags más relevantes
     return sorted(list(tags))[:10]
 
+def extraer_tags(titulo: str, caracteristicas: str = "") -> List[str]:
+    """Extrae tags relevantes del título y características"""
+    palabras_titulo = re.findall(RE_TAGS_TITULO, titulo.lower())
+    palabras_caract = re.findall(RE_TAGS_CARACTERISTICAS, caracteristicas.lower()) if caracteristicas else []
+    return tags_desde_palabras(palabras_titulo, palabras_caract)
+
 def extraer_precio(precio_str: str) -> int:
     """Extrae el precio numérico del string como entero"""
     if pd.isna(precio_str):
@@ -126,7 +151,10 @@ def extraer_precio(precio_str: str) -> int:
     # Eliminar símbolo $ y puntos de miles, convertir
     precio_limpio = re.sub(r'[^\d,]', '', str(precio_str))
     precio_limpio = precio_limpio.replace(',', '.')
-    
+    return precio_desde_limpio(precio_limpio)
+
+def precio_desde_limpio(precio_limpio: str) -> int:
+    """Entero de un precio ya limpio (solo dígitos y punto decimal); 0 si no es un número"""
     try:
         return int(float(precio_limpio))
     except ValueError:
@@ -145,13 +173,106 @@ def generar_descripcion_corta(descripcion_completa: str, titulo: str) -> str:
     
     return desc[:157] + "..."
 
-def convertir_producto_a_json(row: pd.Series, ruta_imagenes: str = "datos/imagenes") -> Dict[str, Any]:
-    """Convierte una fila del CSV al formato JSON del modelo"""
+def _parquet_como_texto(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columnas tipadas del Parquet (ver salidas.SalidaParquet) de vuelta al texto del CSV:
+    las características a "clave: valor | clave: valor" y el precio a su texto
+    (los centavos como los escribe el scraper, "12990.50").
+    """
+    from salidas import COLUMNAS_CARACTERISTICAS, pares_a_caracteristicas
+    
+    for columna in COLUMNAS_CARACTERISTICAS:
+        if columna in df.columns:
+            df[columna] = [pares_a_caracteristicas(pares) or None for pares in df[columna]]
+    if 'Precio' in df.columns:
+        # 6480.0 no debe quedar como "64800"
+        df['Precio'] = [None if pd.isna(precio) else
+                        str(int(precio)) if float(precio).is_integer() else f"{precio:.2f}"
+                        for precio in df['Precio']]
+    return df
+
+def leer_productos(archivo: str) -> pd.DataFrame:
+    """
+    Lee los productos scrapeados desde CSV o Parquet (según la extensión).
+    Las columnas del CSV se leen como texto, tal cual se scrapearon (sin que pandas adivine
+    números), y las del Parquet vuelven a ese mismo texto, para que el resto de la
+    conversión sea la misma.
+    """
+    if Path(archivo).suffix.lower() != '.parquet':
+        return pd.read_csv(archivo, dtype=str)
+    return _parquet_como_texto(pd.read_parquet(archivo))
+
+def leer_productos_por_trozos(archivo: str, filas: int = FILAS_POR_TROZO) -> Iterator[pd.DataFrame]:
+    """Como leer_productos, pero entrega el archivo de a `filas` filas"""
+    if Path(archivo).suffix.lower() != '.parquet':
+        yield from pd.read_csv(archivo, dtype=str, chunksize=filas)
+        return
+    
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    for lote in pq.ParquetFile(archivo).iter_batches(batch_size=filas):
+        yield _parquet_como_texto(pa.Table.from_batches([lote]).to_pandas())
+
+def abrir_indice_imagenes(ruta_imagenes: str = RUTA_IMAGENES):
+    """AlmacenImagenes de la carpeta si tiene índice (ver imagenes.py), si no None"""
+    from imagenes import AlmacenImagenes
+    
+    if not AlmacenImagenes.existe_indice(ruta_imagenes):
+        return None
+    return AlmacenImagenes(ruta_imagenes)
+
+def imagenes_producto(nombre: str, url_imagen: str, imagen_local: str, link: str,
+                      ruta_imagenes: str = RUTA_IMAGENES, almacen=None) -> List[Dict]:
+    """
+    Imagen principal del producto (la externa si existe, si no la local) con sus variantes.
+    Los textos ya vienen limpios (ver limpiar_texto).
+    """
+    imagenes = []
+    
+    # Usar solo UNA imagen - preferir la externa si existe, sino la local
+    if url_imagen:
+        imagenes.append({
+            "url": url_imagen,
+            "textoAlternativo": nombre,
+            "esPrincipal": True
+        })
+    elif imagen_local or almacen:
+        # Ruta en el almacén de imágenes según su índice (sin adivinar por el nombre)
+        ruta_relativa = almacen.ruta_producto(link) if almacen else None
+        if not ruta_relativa and imagen_local:
+            # Convertir ruta de imagenes_mercadolibre/ a datos/imagenes/
+            nombre_archivo = Path(imagen_local).name
+            ruta_relativa = f"{ruta_imagenes}/{nombre_archivo}"
+        
+        if ruta_relativa:
+            imagenes.append({
+                "url": ruta_relativa,
+                "textoAlternativo": nombre,
+                "esPrincipal": True
+            })
+    
+    # Miniaturas y versiones WebP/AVIF generadas por variantes_imagenes.py, si las hay
+    if imagenes and almacen:
+        variantes_imagen = almacen.variantes_producto(link)
+        if variantes_imagen:
+            imagenes[0]["variantes"] = variantes_imagen
+    
+    return imagenes
+
+def convertir_producto_a_json(row: pd.Series, ruta_imagenes: str = RUTA_IMAGENES,
+                              almacen=None) -> Dict[str, Any]:
+    """
+    Convierte una fila del CSV al formato JSON del modelo.
+    Con almacen (ver abrir_indice_imagenes) la imagen local del producto se busca en el
+    índice del almacén por su link (si no, por el nombre del archivo de Imagen_Local) y se
+    agregan las variantes reducidas de su imagen, si se generaron.
+    """
     
     # Extraer datos básicos
     nombre = limpiar_texto(row.get('Titulo', 'Producto sin nombre'))
-    categoria = "OTROS"
-    subcategoria = "Varios"
+    categoria = CATEGORIA
+    subcategoria = SUBCATEGORIA
     
     # Generar SKU personalizado
     sku = generar_sku_personalizado(nombre, categoria, subcategoria)
@@ -180,27 +301,17 @@ def convertir_producto_a_json(row: pd.Series, ruta_imagenes: str = "datos/imagen
     precio = extraer_precio(row.get('Precio', '0'))
     
     # Imágenes - Priorizar imagen externa, si no existe usar local
-    imagenes = []
-    url_imagen = limpiar_texto(row.get('URL_Imagen', ''))
-    imagen_local = limpiar_texto(row.get('Imagen_Local', ''))
+    imagenes = imagenes_producto(nombre, limpiar_texto(row.get('URL_Imagen', '')),
+                                 limpiar_texto(row.get('Imagen_Local', '')),
+                                 limpiar_texto(row.get('Link', '')), ruta_imagenes, almacen)
     
-    # Usar solo UNA imagen - preferir la externa si existe, sino la local
-    if url_imagen:
-        imagenes.append({
-            "url": url_imagen,
-            "textoAlternativo": nombre,
-            "esPrincipal": True
-        })
-    elif imagen_local:
-        # Convertir ruta de imagenes_mercadolibre/ a datos/imagenes/
-        nombre_archivo = Path(imagen_local).name
-        ruta_relativa = f"{ruta_imagenes}/{nombre_archivo}"
-        
-        imagenes.append({
-            "url": ruta_relativa,
-            "textoAlternativo": nombre,
-            "esPrincipal": True
-        })
+    return armar_producto_json(nombre, sku, slug, categoria, subcategoria, descripcion_corta,
+                               descripcion_completa, imagenes, precio, tags, atributos, marca)
+
+def armar_producto_json(nombre: str, sku: str, slug: str, categoria: str, subcategoria: str,
+                        descripcion_corta: str, descripcion_completa: str, imagenes: List[Dict],
+                        precio: int, tags: List[str], atributos: Dict[str, Any], marca: str) -> Dict[str, Any]:
+    """Arma el producto según el modelo a partir de sus campos ya calculados"""
     
     # Variante predeterminada con SKU basado en el SKU principal
     variantes = [{
@@ -248,82 +359,327 @@ def convertir_producto_a_json(row: pd.Series, ruta_imagenes: str = "datos/imagen
     # Eliminar campos None para mantener el JSON limpio
     return {k: v for k, v in producto.items() if v is not None and v != ""}
 
+def _texto_columna(df: pd.DataFrame, columna: str, defecto: str = '') -> pd.Series:
+    """Columna limpia como con limpiar_texto, de una vez (el defecto si la columna no existe)"""
+    if columna not in df.columns:
+        return pd.Series([limpiar_texto(defecto)] * len(df), index=df.index, dtype=object)
+    serie = df[columna]
+    return serie.astype(str).str.strip().where(serie.notna(), '')
+
+# Columnas del CSV que forman el producto (el link se compara aparte, ver huellas.clave_producto)
+CAMPOS_CONTENIDO = ('Titulo', 'Precio', 'Descripcion', 'Caracteristicas_Principales',
+                    'Caracteristicas_Ventas', 'Otras_Caracteristicas', 'URL_Imagen', 'Imagen_Local')
+
+def hash_contenido_filas(df: pd.DataFrame) -> List[str]:
+    """Hash de los CAMPOS_CONTENIDO de cada fila: si no cambia, el producto tampoco"""
+    columnas = [_texto_columna(df, columna).tolist() for columna in CAMPOS_CONTENIDO]
+    return [hashlib.sha1('\x1f'.join(valores).encode('utf-8')).hexdigest() for valores in zip(*columnas)]
+
+def conservar_sku(producto: Dict[str, Any], sku: str):
+    """Cambia el SKU del producto (y el de sus variantes) por el que ya tenía"""
+    anterior = producto['sku']
+    producto['sku'] = sku
+    for variante in producto.get('variantes', []):
+        if variante['sku'].startswith(anterior):
+            variante['sku'] = sku + variante['sku'][len(anterior):]
+
+def convertir_lote_a_json(df: pd.DataFrame, ruta_imagenes: str = RUTA_IMAGENES,
+                          almacen=None, numeros: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Convierte todas las filas del DataFrame a la vez: los campos de texto (slug, precio,
+    descripción corta, marca, palabras de los tags, prefijo del SKU) se calculan por columna
+    con las operaciones de texto de pandas y los diccionarios se arman al final.
+    El resultado es el mismo que convertir_producto_a_json fila por fila (incluidos los
+    números aleatorios de los SKU, que se piden en el mismo orden).
+    
+    Args:
+        numeros: Números de los SKU ya sorteados, uno por fila (ver convertir_trozos);
+            por defecto se sortean aquí
+    """
+    if df.empty:
+        return []
+    categoria = CATEGORIA
+    subcategoria = SUBCATEGORIA
+    
+    nombres = _texto_columna(df, 'Titulo', 'Producto sin nombre')
+    
+    # SKU: prefijo del nombre por columna; categoría y subcategoría son fijas
+    prefijos = (nombres.str.upper().str.replace(r'[^a-zA-Z]', '', regex=True)
+                .str[:3].str.ljust(3, fillchar='X'))
+    sufijo_sku = f"{prefijo_sku(categoria, 4)}-{prefijo_sku(subcategoria, 3)}"
+    if numeros is None:
+        numeros = [random.randint(100, 999) for _ in range(len(df))]
+    
+    # Igual que generar_slug
+    slugs = (nombres.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii').str.lower()
+             .str.replace(r'[^\w\s-]', '', regex=True).str.replace(r'[-\s]+', '-', regex=True).str.strip('-'))
+    
+    # Igual que generar_descripcion_corta
+    descripciones = _texto_columna(df, 'Descripcion')
+    cortas = descripciones.where(descripciones.str.len() <= 160, descripciones.str[:157] + "...")
+    cortas = cortas.where(descripciones != "", nombres.str[:160])
+    
+    # Características unidas con " | " saltando las vacías
+    caract_principales = _texto_columna(df, 'Caracteristicas_Principales')
+    todas = caract_principales
+    for columna in ('Caracteristicas_Ventas', 'Otras_Caracteristicas'):
+        otra = _texto_columna(df, columna)
+        separador = pd.Series(' | ', index=df.index).where((todas != "") & (otra != ""), '')
+        todas = todas + separador + otra
+    marcas = caract_principales.str.extract(r'Marca:\s*([^|]+)', expand=False).fillna('').str.strip()
+    palabras_titulo = nombres.str.lower().str.findall(RE_TAGS_TITULO)
+    palabras_caract = todas.str.lower().str.findall(RE_TAGS_CARACTERISTICAS)
+    
+    # Igual que extraer_precio
+    if 'Precio' in df.columns:
+        precios_limpios = (df['Precio'].astype(str).str.replace(r'[^\d,]', '', regex=True)
+                           .str.replace(',', '.', regex=False).where(df['Precio'].notna(), ''))
+    else:
+        precios_limpios = pd.Series(['0'] * len(df), index=df.index, dtype=object)
+    
+    urls_imagen = _texto_columna(df, 'URL_Imagen')
+    imagenes_locales = _texto_columna(df, 'Imagen_Local')
+    links = _texto_columna(df, 'Link')
+    
+    # Se recorren listas: iterar las Series elemento a elemento es bastante más lento
+    columnas = [serie.tolist() for serie in (nombres, prefijos, slugs, cortas, descripciones, todas, marcas,
+                                             palabras_titulo, palabras_caract, precios_limpios, urls_imagen,
+                                             imagenes_locales, links)]
+    productos = []
+    for numero, (nombre, prefijo, slug, corta, completa, caracteristicas, marca, titulo_palabras,
+                 caract_palabras, precio, url_imagen, imagen_local, link) in zip(numeros, zip(*columnas)):
+        productos.append(armar_producto_json(
+            nombre, f"{prefijo}-{sufijo_sku}-{numero}", slug, categoria, subcategoria, corta, completa,
+            imagenes_producto(nombre, url_imagen, imagen_local, link, ruta_imagenes, almacen),
+            precio_desde_limpio(precio), tags_desde_palabras(titulo_palabras, caract_palabras),
+            parsear_caracteristicas(caracteristicas), marca))
+    return productos
+
+def _convertir_y_serializar(trozo: pd.DataFrame, numeros: List[int], ruta_imagenes: str,
+                            almacen, compacto: bool = False) -> List[Tuple[Dict[str, Any], str]]:
+    """Productos del trozo junto a su JSON (el del archivo individual, ver salida_json.a_json)"""
+    productos = convertir_lote_a_json(trozo, ruta_imagenes, almacen, numeros)
+    return [(producto, a_json(producto, compacto)) for producto in productos]
+
+# Índice de imágenes de cada proceso del pool (lo abre _iniciar_proceso)
+_almacen_proceso = None
+
+def _iniciar_proceso(ruta_imagenes: str):
+    global _almacen_proceso
+    _almacen_proceso = abrir_indice_imagenes(ruta_imagenes)
+
+def _convertir_trozo(trozo: pd.DataFrame, numeros: List[int], ruta_imagenes: str, compacto: bool):
+    return _convertir_y_serializar(trozo, numeros, ruta_imagenes, _almacen_proceso, compacto)
+
+def convertir_trozos(trozos: Iterable[pd.DataFrame], procesos: int = 0,
+                     ruta_imagenes: str = RUTA_IMAGENES, compacto: bool = False) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """
+    Convierte los trozos en un pool de procesos y entrega (producto, json) en el orden de
+    entrada. Los números de los SKU se sortean aquí, trozo a trozo, así el resultado es el
+    mismo que convirtiendo todo en un solo proceso. Si el pool falla, sigue en este proceso.
+    
+    Args:
+        trozos: DataFrames a convertir (ver leer_productos_por_trozos)
+        procesos: Procesos del pool; 0 convierte en el proceso actual (útil para depurar)
+        ruta_imagenes: Carpeta del almacén de imágenes (cada proceso abre su índice)
+        compacto: Si True, el JSON de cada producto va sin sangría
+    """
+    if procesos <= 0:
+        almacen = abrir_indice_imagenes(ruta_imagenes)
+        try:
+            for trozo in trozos:
+                numeros = [random.randint(100, 999) for _ in range(len(trozo))]
+                yield from _convertir_y_serializar(trozo, numeros, ruta_imagenes, almacen, compacto)
+        finally:
+            if almacen:
+                almacen.cerrar()
+        return
+    
+    pool = ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(ruta_imagenes,))
+    pendientes = deque()
+    
+    def resultado(pendiente):
+        futuro, trozo, numeros = pendiente
+        try:
+            return futuro.result()
+        except BrokenProcessPool:
+            print("⚠️  El pool de conversión dejó de funcionar; se sigue en este proceso")
+            almacen = abrir_indice_imagenes(ruta_imagenes)
+            try:
+                return _convertir_y_serializar(trozo, numeros, ruta_imagenes, almacen, compacto)
+            finally:
+                if almacen:
+                    almacen.cerrar()
+    
+    try:
+        for trozo in trozos:
+            numeros = [random.randint(100, 999) for _ in range(len(trozo))]
+            pendientes.append((pool.submit(_convertir_trozo, trozo, numeros, ruta_imagenes, compacto), trozo, numeros))
+            # Se lee por delante solo lo justo para tener ocupados a los procesos
+            if len(pendientes) > 2 * procesos:
+                yield from resultado(pendientes.popleft())
+        while pendientes:
+            yield from resultado(pendientes.popleft())
+    finally:
+        pool.shutdown(cancel_futures=True)
+
 def convertir_csv_a_json_incremental(
     archivo_csv: str,
     carpeta_salida: str = "datos/json",
     archivo_salida: str = "productos_mercadolibre.json",
-    generar_individuales: bool = True
+    generar_individuales: bool = True,
+    procesos: int = 0,
+    filas_por_trozo: int = FILAS_POR_TROZO,
+    exportar_json: bool = False,
+    modo_individuales: str = 'plano',
+    compacto: bool = False
 ):
     """
-    Convierte el CSV a JSON de manera incremental, sin eliminar productos existentes
+    Convierte el CSV a JSON de manera incremental, sin eliminar productos existentes.
+    Los productos se guardan en una base SQLite (ver almacen_productos.py) y en un catálogo
+    JSON Lines (ver catalogo.py) junto a archivo_salida; se convierten solo las filas nuevas
+    o con cambios, y un producto con cambios conserva su SKU.
     
     Args:
         archivo_csv: Ruta al archivo CSV con los datos
         carpeta_salida: Carpeta donde guardar los JSON
-        archivo_salida: Nombre del archivo JSON con todos los productos
+        archivo_salida: Nombre del archivo JSON con todos los productos (el catálogo es el .jsonl)
         generar_individuales: Si True, genera un JSON por cada producto
+        procesos: Procesos para convertir los trozos en paralelo (0 = en este proceso)
+        filas_por_trozo: Filas del CSV que se leen y convierten juntas
+        exportar_json: Si True, también reescribe archivo_salida como lista JSON
+        modo_individuales: 'plano', 'carpetas' o 'paquete' (ver salida_json.py)
+        compacto: Si True, los JSON se escriben sin sangría
     """
     from datetime import datetime
     
     print(f"📂 Leyendo archivo CSV: {archivo_csv}")
-    df = pd.read_csv(archivo_csv)
-    
-    print(f"📊 Total de productos en CSV: {len(df)}")
+    if procesos > 0:
+        print(f"⚙️  Conversión en {procesos} procesos, de a {filas_por_trozo} filas")
     
     # Crear carpeta de salida si no existe
     Path(carpeta_salida).mkdir(parents=True, exist_ok=True)
     
-    # Leer productos existentes
+    # Catálogo y base de productos existentes (la primera vez se crean desde el JSON de antes)
     ruta_consolidado = Path(carpeta_salida) / archivo_salida
-    productos_existentes = {}
-    productos_anteriores = 0
-    
-    if ruta_consolidado.exists():
-        print(f"📋 Cargando productos existentes...")
-        with open(ruta_consolidado, 'r', encoding='utf-8') as f:
-            productos_list = json.load(f)
-            productos_anteriores = len(productos_list)
-            # Usar el título como clave única para identificar duplicados
-            for p in productos_list:
-                productos_existentes[p['nombre']] = p
-        print(f"  ✅ {productos_anteriores} productos existentes cargados")
-    
-    # Convertir productos nuevos
-    productos_nuevos = []
+    catalogo = CatalogoJSONL(ruta_consolidado.with_suffix('.jsonl'))
+    base = AlmacenProductos(str(ruta_consolidado.with_suffix('.sqlite')))
+    
+    if not catalogo.existe() and ruta_consolidado.exists():
+        print(f"📦 Creando el catálogo {catalogo.ruta.name} desde {archivo_salida}...")
+        catalogo.importar_json(ruta_consolidado)
+    if base.cantidad() == 0 and catalogo.existe():
+        print(f"📦 Creando la base {Path(base.ruta).name} desde {catalogo.ruta.name}...")
+        base.importar(catalogo.productos())
+    
+    productos_anteriores = base.cantidad()
+    print(f"📋 {productos_anteriores} productos existentes en {Path(base.ruta).name}")
+    
     productos_ignorados = []
-    skus_nuevos = []
+    filas_leidas = 0
+    # Por cada fila que se convierte: (producto guardado o None si es nuevo, link, hash)
+    destinos = deque()
+    
+    def trozos_a_convertir():
+        """
+        Solo las filas nuevas o con cambios de cada trozo. Un producto se busca por su link
+        y si no por su nombre; dentro del CSV cuenta solo la primera aparición.
+        """
+        nonlocal filas_leidas
+        vistos_links = set()
+        vistos_nombres = set()
+        for trozo in leer_productos_por_trozos(archivo_csv, filas_por_trozo):
+            filas_leidas += len(trozo)
+            nombres = _texto_columna(trozo, 'Titulo', 'Producto sin nombre').tolist()
+            links = [clave_producto(link) if link else '' for link in _texto_columna(trozo, 'Link').tolist()]
+            hashes = hash_contenido_filas(trozo)
+            por_link, por_nombre = base.buscar(links, nombres)
+            posiciones = []
+            for posicion, (nombre, link, hash_fila) in enumerate(zip(nombres, links, hashes)):
+                if nombre in vistos_nombres or (link and link in vistos_links):
+                    productos_ignorados.append(nombre)
+                    continue
+                vistos_nombres.add(nombre)
+                if link:
+                    vistos_links.add(link)
+                
+                guardado = por_link.get(link)
+                if guardado is None:
+                    guardado = por_nombre.get(nombre)
+                    if guardado is not None and guardado.link and guardado.link != link:
+                        # Otra publicación con el mismo título: se trata como duplicado
+                        productos_ignorados.append(nombre)
+                        continue
+                
+                if guardado is not None and guardado.hash is None:
+                    # Importado del JSON anterior: se asocia a esta fila sin convertirlo de nuevo
+                    base.asociar(guardado.id, link, hash_fila)
+                    productos_ignorados.append(nombre)
+                elif guardado is not None and guardado.hash == hash_fila:
+                    productos_ignorados.append(nombre)
+                else:
+                    posiciones.append(posicion)
+                    destinos.append((guardado, link, hash_fila))
+            if posiciones:
+                yield trozo.iloc[posiciones]
     
-    for idx, row in df.iterrows():
-        nombre = limpiar_texto(row.get('Titulo', 'Producto sin nombre'))
-        
-        # Verificar si el producto ya existe
-        if nombre in productos_existentes:
-            productos_ignorados.append(nombre)
-            continue
+    # Convertir productos nuevos y con cambios
+    productos_nuevos = []
+    productos_actualizados = []
+    renombrados = 0
+    individuales = EscritorIndividuales(carpeta_salida, modo_individuales) if generar_individuales else None
+    
+    for producto, texto in convertir_trozos(trozos_a_convertir(), procesos, compacto=compacto):
+        guardado, link, hash_fila = destinos.popleft()
         
-        # Producto nuevo - convertir
-        producto = convertir_producto_a_json(row)
-        productos_existentes[nombre] = producto
-        productos_nuevos.append(producto)
-        skus_nuevos.append(producto['sku'])
+        if guardado is None:
+            productos_nuevos.append(producto)
+        else:
+            # Un producto que cambió conserva su SKU
+            conservar_sku(producto, guardado.sku)
+            texto = a_json(producto, compacto)
+            productos_actualizados.append(producto)
+            if producto.get('nombre', '') != guardado.nombre:
+                renombrados += 1
+        base.guardar(producto, link, hash_fila, guardado.id if guardado else None)
         
         # Generar JSON individual si se solicita
-        if generar_individuales:
+        if individuales:
             nombre_archivo = f"{producto['sku']}_{producto['slug'][:30]}.json"
-            ruta_archivo = Path(carpeta_salida) / nombre_archivo
+            individuales.escribir(nombre_archivo, texto)
             
-            with open(ruta_archivo, 'w', encoding='utf-8') as f:
-                json.dump(producto, f, ensure_ascii=False, indent=2)
+            # Si cambió el slug, el archivo anterior del producto queda reemplazado
+            if guardado is not None:
+                anterior = f"{guardado.sku}_{guardado.slug[:30]}.json"
+                if anterior != nombre_archivo:
+                    individuales.eliminar(anterior)
         
-        if (idx + 1) % 10 == 0:
-            print(f"  ⏳ Procesados {idx + 1}/{len(df)} productos...")
-    
-    # Guardar archivo consolidado actualizado
-    print(f"\n💾 Actualizando archivo consolidado: {archivo_salida}")
-    todos_productos = list(productos_existentes.values())
-    
-    with open(ruta_consolidado, 'w', encoding='utf-8') as f:
-        json.dump(todos_productos, f, ensure_ascii=False, indent=2)
+        convertidos = len(productos_nuevos) + len(productos_actualizados)
+        if convertidos % 10 == 0:
+            print(f"  ⏳ Procesados {convertidos} productos nuevos o con cambios...")
+        if convertidos % 1000 == 0:
+            base.confirmar()
+    base.confirmar()
+    if individuales:
+        individuales.cerrar()
+    
+    skus_nuevos = [producto['sku'] for producto in productos_nuevos]
+    skus_actualizados = [producto['sku'] for producto in productos_actualizados]
+    total_productos = base.cantidad()
+    print(f"📊 Total de productos en CSV: {filas_leidas}")
+    
+    # Agregar los cambios al catálogo (los demás productos no se reescriben); si hubo
+    # renombrados, o si ya sobran muchas líneas reemplazadas, se reescribe desde la base
+    print(f"\n💾 Actualizando catálogo: {catalogo.ruta.name}")
+    catalogo.agregar(productos_nuevos + productos_actualizados)
+    if renombrados or catalogo.necesita_compactar(total_productos):
+        base.exportar_jsonl(str(catalogo.ruta))
+        print(f"  🗜️  Catálogo reescrito desde la base: {total_productos} líneas")
+    
+    if exportar_json:
+        print(f"💾 Exportando archivo consolidado: {archivo_salida}")
+        base.exportar_json(str(ruta_consolidado), compacto)
+    base.cerrar()
     
     # Generar reporte
     fecha_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -331,9 +687,11 @@ def convertir_csv_a_json_incremental(
         "fecha_actualizacion": fecha_hora,
         "productos_anteriores": productos_anteriores,
         "productos_nuevos": len(productos_nuevos),
+        "productos_actualizados": len(productos_actualizados),
         "productos_ignorados": len(productos_ignorados),
-        "total_productos": len(todos_productos),
+        "total_productos": total_productos,
         "skus_nuevos": skus_nuevos,
+        "skus_actualizados": skus_actualizados,
         "nombres_ignorados": productos_ignorados[:10] if len(productos_ignorados) > 10 else productos_ignorados
     }
     
@@ -346,8 +704,9 @@ def convertir_csv_a_json_incremental(
     print(f"\n📊 RESUMEN:")
     print(f"   • Productos anteriores: {productos_anteriores}")
     print(f"   • Productos nuevos agregados: {len(productos_nuevos)}")
-    print(f"   • Productos ignorados (duplicados): {len(productos_ignorados)}")
-    print(f"   • Total productos ahora: {len(todos_productos)}")
+    print(f"   • Productos actualizados (con cambios): {len(productos_actualizados)}")
+    print(f"   • Productos ignorados (sin cambios o duplicados): {len(productos_ignorados)}")
+    print(f"   • Total productos ahora: {total_productos}")
     
     if skus_nuevos:
         print(f"\n🆕 SKUs de productos nuevos:")
@@ -364,7 +723,11 @@ def convertir_csv_a_json(
     archivo_csv: str,
     carpeta_salida: str = "datos/json",
     archivo_salida: str = "productos.json",
-    generar_individuales: bool = True
+    generar_individuales: bool = True,
+    procesos: int = 0,
+    filas_por_trozo: int = FILAS_POR_TROZO,
+    modo_individuales: str = 'plano',
+    compacto: bool = False
 ):
     """
     Convierte el CSV de productos a JSON según el modelo
@@ -374,40 +737,45 @@ def convertir_csv_a_json(
         carpeta_salida: Carpeta donde guardar los JSON
         archivo_salida: Nombre del archivo JSON con todos los productos
         generar_individuales: Si True, genera un JSON por cada producto
+        procesos: Procesos para convertir los trozos en paralelo (0 = en este proceso)
+        filas_por_trozo: Filas del CSV que se leen y convierten juntas
+        modo_individuales: 'plano', 'carpetas' o 'paquete' (ver salida_json.py)
+        compacto: Si True, los JSON se escriben sin sangría
     """
     
     print(f"📂 Leyendo archivo: {archivo_csv}")
-    df = pd.read_csv(archivo_csv)
-    
-    print(f"📊 Total de productos en CSV: {len(df)}")
+    if procesos > 0:
+        print(f"⚙️  Conversión en {procesos} procesos, de a {filas_por_trozo} filas")
     
     # Crear carpeta de salida si no existe
     Path(carpeta_salida).mkdir(parents=True, exist_ok=True)
     
+    # Convertir por trozos (ver convertir_trozos); llegan en el orden del CSV
     productos_json = []
+    textos = []
+    individuales = EscritorIndividuales(carpeta_salida, modo_individuales, nuevo=True) if generar_individuales else None
+    trozos = leer_productos_por_trozos(archivo_csv, filas_por_trozo)
     
-    # Convertir cada producto
-    for idx, row in df.iterrows():
-        producto = convertir_producto_a_json(row)
+    for producto, texto in convertir_trozos(trozos, procesos, compacto=compacto):
         productos_json.append(producto)
+        textos.append(texto)
         
         # Generar JSON individual si se solicita
-        if generar_individuales:
+        if individuales:
             nombre_archivo = f"{producto['sku']}_{producto['slug'][:30]}.json"
-            ruta_archivo = Path(carpeta_salida) / nombre_archivo
+            individuales.escribir(nombre_archivo, texto)
             
-            with open(ruta_archivo, 'w', encoding='utf-8') as f:
-                json.dump(producto, f, ensure_ascii=False, indent=2)
-            
-            if (idx + 1) % 10 == 0:
-                print(f"  ✅ Procesados {idx + 1}/{len(df)} productos")
+            if len(productos_json) % 10 == 0:
+                print(f"  ✅ Procesados {len(productos_json)} productos")
+    if individuales:
+        individuales.cerrar()
     
+    print(f"📊 Total de productos en CSV: {len(productos_json)}")
     print(f"\n💾 Guardando archivo consolidado: {archivo_salida}")
     
-    # Guardar todos los productos en un solo archivo
+    # Guardar todos los productos en un solo archivo (ya serializados)
     ruta_consolidado = Path(carpeta_salida) / archivo_salida
-    with open(ruta_consolidado, 'w', encoding='utf-8') as f:
-        json.dump(productos_json, f, ensure_ascii=False, indent=2)
+    escribir_lista_json(ruta_consolidado, textos, compacto)
     
     print(f"\n✅ Conversión completada!")
     print(f"📁 Archivos generados en: {carpeta_salida}/")
@@ -444,8 +812,29 @@ def convertir_csv_a_json(
     return productos_json
 
 if __name__ == "__main__":
+    import argparse
+    import os
     import sys
     
+    from parseo_paralelo import procesos_por_defecto
+    
+    parser = argparse.ArgumentParser(description="Convierte el CSV de productos a JSON (modo incremental)")
+    # Con un solo núcleo el pool solo suma el costo de enviar los trozos entre procesos
+    parser.add_argument('--procesos', type=int,
+                        default=procesos_por_defecto() if (os.cpu_count() or 1) > 1 else 0,
+                        help="Procesos para convertir en paralelo (0 = un solo proceso, útil para depurar)")
+    parser.add_argument('--filas-por-trozo', type=int, default=FILAS_POR_TROZO,
+                        help=f"Filas del CSV que se convierten juntas (por defecto {FILAS_POR_TROZO})")
+    parser.add_argument('--exportar-json', action='store_true',
+                        help="Reescribe también productos_mercadolibre.json desde el catálogo .jsonl")
+    parser.add_argument('--individuales', choices=MODOS_INDIVIDUALES + ('ninguno',), default='plano',
+                        help="JSON de cada producto: en la carpeta (plano), en subcarpetas (carpetas), "
+                             "en un solo archivo con índice (paquete) o ninguno")
+    parser.add_argument('--compacto', action='store_true', help="JSON sin sangría (más chicos y rápidos de escribir)")
+    parser.add_argument('--entrada', help="CSV o Parquet a convertir (por defecto el más reciente de datos/csv/, "
+                                           "prefiriendo el que tiene detalles)")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("🔄 CONVERSOR DE CSV A JSON - MODO INCREMENTAL")
     print("=" * 70)
@@ -455,18 +844,35 @@ if __name__ == "__main__":
     archivo_csv_base = "datos/csv/viaje_azul_productos.csv"
     archivo_csv_detallado = "datos/csv/viaje_azul_productos_con_detalles.csv"
     
-    # Usar el archivo con detalles si existe
-    if Path(archivo_csv_detallado).exists():
-        archivo_csv = archivo_csv_detallado
-        print("📋 Usando CSV con detalles completos")
-    elif Path(archivo_csv_base).exists():
-        archivo_csv = archivo_csv_base
-        print("📋 Usando CSV básico")
+    # Si el scraping también generó Parquet (--formatos ...,parquet) puede leerse ese, ya tipado;
+    # entre el CSV y el Parquet de la misma salida se usa el más reciente (el otro puede ser viejo)
+    # y con la misma fecha, el Parquet
+    opciones_entrada = [
+        ("con detalles completos", [str(Path(archivo_csv_detallado).with_suffix('.parquet')), archivo_csv_detallado]),
+        ("básico", [str(Path(archivo_csv_base).with_suffix('.parquet')), archivo_csv_base]),
+    ]
+    
+    archivo_csv = None
+    if args.entrada:
+        if not Path(args.entrada).exists():
+            print(f"❌ Error: No existe el archivo de entrada {args.entrada}")
+            sys.exit(1)
+        archivo_csv = args.entrada
     else:
+        for descripcion, rutas in opciones_entrada:
+            existentes = [ruta for ruta in rutas if Path(ruta).exists()]
+            if existentes:
+                archivo_csv = max(existentes, key=lambda ruta: Path(ruta).stat().st_mtime)
+                formato = 'Parquet' if archivo_csv.endswith('.parquet') else 'CSV'
+                print(f"📋 Usando {formato} {descripcion}")
+                break
+    
+    if archivo_csv is None:
         print("❌ Error: No se encontró ningún archivo CSV en datos/csv/")
         print("   Esperado: viaje_azul_productos_con_detalles.csv o viaje_azul_productos.csv")
         sys.exit(1)
     
+    print(f"📄 Entrada: {archivo_csv}")
     print()
     
     # Convertir en modo incremental (preserva productos existentes)
@@ -474,7 +880,12 @@ if __name__ == "__main__":
         archivo_csv=archivo_csv,
         carpeta_salida="datos/json",
         archivo_salida="productos_mercadolibre.json",
-        generar_individuales=True
+        generar_individuales=args.individuales != 'ninguno',
+        procesos=args.procesos,
+        filas_por_trozo=args.filas_por_trozo,
+        exportar_json=args.exportar_json,
+        modo_individuales='plano' if args.individuales == 'ninguno' else args.individuales,
+        compacto=args.compacto
     )
     
     print()
@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scraping repartido entre varios procesos trabajadores mediante una cola de tareas.
+
+El scraping de una tienda se divide en tareas que se guardan en una cola SQLite
+(datos/cola_tareas.sqlite):
+- 'listado': descarga una página del listado y encola un 'detalle' por tarjeta. La primera
+  página encola además las demás (o la siguiente, si el esquema de paginación no se reconoce).
+- 'detalle': extrae los detalles y la imagen de un producto.
+
+Cada trabajador toma una tarea con un lease (DURACION_LEASE segundos) que renueva mientras la
+procesa. Si el trabajador muere, al vencer el lease la tarea vuelve a quedar disponible, hasta
+MAX_INTENTOS veces. Al final, fusionar() junta los resultados en el orden del listado y con los
+mismos IDs que un scraping en un solo proceso, así guardar_resultados y conversor_a_json.py
+producen los mismos archivos.
+
+Uso en una sola máquina (encola, lanza 4 trabajadores, espera y fusiona):
+    python distribuido.py local URL_TIENDA --trabajadores 4
+
+O por partes (los trabajadores pueden correr en otras terminales o máquinas que vean la cola):
+    python distribuido.py encolar URL_TIENDA
+    python distribuido.py trabajador --hilos 4
+    python distribuido.py fusionar URL_TIENDA --nombre viaje_azul_productos
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from cache_http import CacheHTTP
+from huellas import CAMPOS_DETALLE, HuellasProductos, clave_producto
+from imagenes import CARPETA_IMAGENES, AlmacenImagenes
+from parseo_paralelo import ParseadorHTML
+from perfil_layout import PerfilLayout
+from salidas import FORMATOS_POR_DEFECTO, SALIDAS
+from scraper_mercadolibre_v2 import (HEADERS_NAVEGADOR, URL_TIENDA_POR_DEFECTO, _descargar_listado, aplicar_detalles,
+                                     descargar_imagen, extraer_detalles_producto, guardar_resultados,
+                                     producto_desde_tarjeta, urls_paginas_listado)
+from sesion_http import SesionHTTP
+
+RUTA_COLA = 'datos/cola_tareas.sqlite'
+
+# Segundos que un trabajador tiene para terminar una tarea antes de que otro la pueda tomar
+DURACION_LEASE = 120
+
+# Cada cuántos segundos un trabajador renueva los leases de las tareas que está procesando
+# (una página lenta no vence mientras el trabajador siga vivo)
+RENOVAR_LEASE_CADA = DURACION_LEASE / 4
+
+# Veces que se entrega una tarea antes de darla por fallida
+MAX_INTENTOS = 3
+
+# Segundos que espera un trabajador sin tareas disponibles antes de volver a mirar la cola
+ESPERA_SIN_TAREAS = 1.0
+
+# Opciones del scraping que se guardan con la tienda y leen los trabajadores
+OPCIONES_POR_DEFECTO = {
+    'extraer_detalles': True,
+    'descargar_imagenes': True,
+    'modo_detalle': 'completo',
+    'max_paginas': None,
+}
+
+
+class ColaTareas:
+    """
+    Cola de tareas en SQLite con leases, compartida por varios procesos (y sus hilos).
+    Cada tienda se identifica por la URL inicial de su listado, como en checkpoint.py.
+    """
+
+    def __init__(self, ruta: str = RUTA_COLA):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        # Sin transacciones implícitas: tomar() usa BEGIN IMMEDIATE para no entregar dos veces
+        self._db = sqlite3.connect(ruta, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tiendas (
+                url_tienda TEXT PRIMARY KEY,
+                opciones TEXT NOT NULL,
+                creada REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tareas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_tienda TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                pagina INTEGER NOT NULL,
+                indice INTEGER NOT NULL DEFAULT 0,
+                datos TEXT NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                intentos INTEGER NOT NULL DEFAULT 0,
+                trabajador TEXT,
+                vence REAL,
+                resultado TEXT,
+                error TEXT,
+                UNIQUE (url_tienda, tipo, pagina, indice)
+            );
+            CREATE INDEX IF NOT EXISTS tareas_estado ON tareas (estado, vence);
+        """)
+
+    def _transaccion(self, funcion, *args):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                resultado = funcion(*args)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return resultado
+
+    def _insertar(self, url_tienda: str, tareas: Sequence[Tuple[str, int, int, Dict]]):
+        # Las tareas ya encoladas se ignoran: reencolar es idempotente
+        self._db.executemany(
+            "INSERT OR IGNORE INTO tareas (url_tienda, tipo, pagina, indice, datos) VALUES (?, ?, ?, ?, ?)",
+            [(url_tienda, tipo, pagina, indice, json.dumps(datos, ensure_ascii=False))
+             for tipo, pagina, indice, datos in tareas]
+        )
+
+    def encolar_tienda(self, url_tienda: str, opciones: Optional[Dict] = None, reiniciar: bool = False):
+        """
+        Encola la primera página del listado de una tienda.
+
+        Args:
+            url_tienda: URL inicial del listado
+            opciones: Opciones del scraping (ver OPCIONES_POR_DEFECTO)
+            reiniciar: Si es True se descarta lo hecho antes para esta tienda
+        """
+        opciones = {**OPCIONES_POR_DEFECTO, **(opciones or {})}
+
+        def encolar():
+            if reiniciar:
+                self._db.execute("DELETE FROM tareas WHERE url_tienda = ?", (url_tienda,))
+            self._db.execute("INSERT OR REPLACE INTO tiendas (url_tienda, opciones, creada) VALUES (?, ?, ?)",
+                             (url_tienda, json.dumps(opciones), time.time()))
+            self._insertar(url_tienda, [('listado', 1, 0, {'url': url_tienda, 'descubrir': True})])
+        self._transaccion(encolar)
+
+    def opciones(self, url_tienda: str) -> Dict:
+        with self._lock:
+            fila = self._db.execute("SELECT opciones FROM tiendas WHERE url_tienda = ?", (url_tienda,)).fetchone()
+        return json.loads(fila[0]) if fila else dict(OPCIONES_POR_DEFECTO)
+
+    def tomar(self, trabajador: str, duracion_lease: float = DURACION_LEASE) -> Optional[Dict]:
+        """
+        Toma la siguiente tarea disponible (pendiente o con el lease vencido).
+        Las páginas de listado van primero, porque son las que generan más tareas.
+
+        Returns:
+            La tarea (id, url_tienda, tipo, pagina, indice, datos, intentos) o None si no hay
+        """
+        def tomar():
+            ahora = time.time()
+            # Leases vencidos que ya agotaron sus intentos
+            self._db.execute(
+                "UPDATE tareas SET estado = 'fallida', error = coalesce(error, 'lease vencido') "
+                "WHERE estado = 'tomada' AND vence < ? AND intentos >= ?", (ahora, MAX_INTENTOS))
+            fila = self._db.execute(
+                "SELECT id, url_tienda, tipo, pagina, indice, datos, intentos FROM tareas "
+                "WHERE estado = 'pendiente' OR (estado = 'tomada' AND vence < ?) "
+                "ORDER BY tipo = 'detalle', id LIMIT 1", (ahora,)).fetchone()
+            if not fila:
+                return None
+            self._db.execute(
+                "UPDATE tareas SET estado = 'tomada', trabajador = ?, vence = ?, intentos = intentos + 1 "
+                "WHERE id = ?", (trabajador, ahora + duracion_lease, fila[0]))
+            tarea = dict(zip(('id', 'url_tienda', 'tipo', 'pagina', 'indice', 'datos', 'intentos'), fila))
+            tarea['datos'] = json.loads(tarea['datos'])
+            tarea['intentos'] += 1
+            return tarea
+        return self._transaccion(tomar)
+
+    def completar(self, tarea: Dict, trabajador: str, resultado: Dict,
+                  nuevas: Sequence[Tuple[str, int, int, Dict]] = ()) -> bool:
+        """
+        Guarda el resultado de una tarea y encola las tareas que generó, en una transacción.
+
+        Returns:
+            False si el lease ya lo tenía otro trabajador (el resultado se descarta)
+        """
+        def completar():
+            cursor = self._db.execute(
+                "UPDATE tareas SET estado = 'hecha', resultado = ?, error = NULL "
+                "WHERE id = ? AND estado = 'tomada' AND trabajador = ?",
+                (json.dumps(resultado, ensure_ascii=False), tarea['id'], trabajador))
+            if not cursor.rowcount:
+                return False
+            self._insertar(tarea['url_tienda'], nuevas)
+            return True
+        return self._transaccion(completar)
+
+    def renovar(self, ids: Sequence[int], trabajador: str, duracion_lease: float = DURACION_LEASE) -> int:
+        """
+        Extiende el lease de las tareas que el trabajador sigue procesando.
+
+        Returns:
+            Cantidad de tareas renovadas (las que ya tomó otro trabajador no cambian)
+        """
+        def renovar():
+            cursor = self._db.execute(
+                f"UPDATE tareas SET vence = ? WHERE id IN ({','.join('?' * len(ids))}) "
+                "AND estado = 'tomada' AND trabajador = ?",
+                (time.time() + duracion_lease, *ids, trabajador))
+            return cursor.rowcount
+        return self._transaccion(renovar) if ids else 0
+
+    def fallar(self, tarea: Dict, trabajador: str, error: Exception):
+        """Devuelve la tarea a la cola, o la da por fallida si agotó sus intentos"""
+        def fallar():
+            self._db.execute(
+                "UPDATE tareas SET estado = CASE WHEN intentos >= ? THEN 'fallida' ELSE 'pendiente' END, "
+                "vence = NULL, error = ? WHERE id = ? AND estado = 'tomada' AND trabajador = ?",
+                (MAX_INTENTOS, str(error), tarea['id'], trabajador))
+        self._transaccion(fallar)
+
+    def conteo(self, url_tienda: Optional[str] = None) -> Dict[str, int]:
+        """Tareas por estado (de una tienda o de toda la cola)"""
+        consulta = "SELECT estado, count(*) FROM tareas"
+        parametros = ()
+        if url_tienda:
+            consulta += " WHERE url_tienda = ?"
+            parametros = (url_tienda,)
+        with self._lock:
+            return dict(self._db.execute(consulta + " GROUP BY estado", parametros).fetchall())
+
+    def activas(self, url_tienda: Optional[str] = None) -> int:
+        """Tareas pendientes o tomadas: mientras haya, pueden aparecer tareas nuevas"""
+        conteo = self.conteo(url_tienda)
+        return conteo.get('pendiente', 0) + conteo.get('tomada', 0)
+
+    def hechas(self, url_tienda: str, tipo: str, pagina: Optional[int] = None) -> List[Dict]:
+        """Tareas terminadas de una tienda, en el orden del listado"""
+        consulta = ("SELECT pagina, indice, datos, resultado FROM tareas "
+                    "WHERE url_tienda = ? AND tipo = ? AND estado = 'hecha'")
+        parametros = [url_tienda, tipo]
+        if pagina is not None:
+            consulta += " AND pagina = ?"
+            parametros.append(pagina)
+        with self._lock:
+            filas = self._db.execute(consulta + " ORDER BY pagina, indice", parametros).fetchall()
+        return [{'pagina': pagina, 'indice': indice, 'datos': json.loads(datos), 'resultado': json.loads(resultado)}
+                for pagina, indice, datos, resultado in filas]
+
+    def fallidas(self, url_tienda: str) -> List[Tuple[str, int, int, str]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT tipo, pagina, indice, error FROM tareas WHERE url_tienda = ? AND estado = 'fallida' "
+                "ORDER BY pagina, indice", (url_tienda,)).fetchall()
+
+    def cerrar(self):
+        with self._lock:
+            self._db.close()
+
+
+class TrabajadorCola:
+    """
+    Toma tareas de la cola y las ejecuta en uno o más hilos que comparten la sesión HTTP,
+    el parseador, el almacén de imágenes y las huellas. Termina cuando la cola queda vacía.
+    """
+
+    def __init__(self, cola: ColaTareas, nombre: Optional[str] = None, hilos: int = 1,
+                 sesion: Optional[SesionHTTP] = None, parser: str = 'bs4',
+                 carpeta_imagenes: str = CARPETA_IMAGENES, reutilizar_detalles: bool = True):
+        """
+        Args:
+            cola: ColaTareas de la que se toman las tareas
+            nombre: Identificador del trabajador en los leases (por defecto host:pid)
+            hilos: Tareas que se ejecutan a la vez en este proceso
+            sesion: SesionHTTP a usar (por defecto una nueva)
+            parser: Extractor de tarjetas del listado ('bs4' o 'lxml')
+            carpeta_imagenes: Carpeta del almacén de imágenes
+            reutilizar_detalles: Reutilizar los detalles de productos cuya tarjeta no cambió
+        """
+        self.cola = cola
+        self.nombre = nombre or f"{socket.gethostname()}:{os.getpid()}"
+        self.hilos = max(1, hilos)
+        self.sesion = sesion or SesionHTTP()
+        self.parseador = ParseadorHTML(0, parser)
+        self.perfil_layout = PerfilLayout()
+        self.almacen = AlmacenImagenes(carpeta_imagenes)
+        self.huellas = HuellasProductos(reutilizar=reutilizar_detalles)
+        self.estadisticas = {'listado': 0, 'detalle': 0, 'errores': 0, 'descartadas': 0}
+        self._opciones = {}
+        self._lock = threading.Lock()
+        # Tareas en proceso, cuyos leases renueva _renovar_leases
+        self._en_curso = set()
+        self._terminado = threading.Event()
+
+    def _opciones_tienda(self, url_tienda: str) -> Dict:
+        with self._lock:
+            if url_tienda not in self._opciones:
+                self._opciones[url_tienda] = self.cola.opciones(url_tienda)
+            return self._opciones[url_tienda]
+
+    def _listado(self, tarea: Dict, opciones: Dict) -> Tuple[Dict, List]:
+        """Descarga una página del listado; encola sus productos y las páginas que descubre"""
+        numero = tarea['pagina']
+        resumen = _descargar_listado(tarea['datos']['url'], HEADERS_NAVEGADOR, self.sesion, self.parseador,
+                                     self.perfil_layout)
+        self.perfil_layout.registrar(resumen['url'], resumen['estrategia'], resumen['fallidas'])
+        tarjetas = resumen['tarjetas']
+        # Igual que iter_productos: sin tarjetas ni enlaces la tienda termina en esta página
+        sin_productos = resumen['enlaces'] is not None and not resumen['enlaces']
+        nuevas = [('detalle', numero, idx, {'tarjeta': datos})
+                  for idx, datos in enumerate(tarjetas, 1) if 'Error' not in datos]
+        max_paginas = opciones.get('max_paginas')
+        if not sin_productos:
+            urls = urls_paginas_listado(resumen) if tarea['datos'].get('descubrir') else None
+            if urls is not None:
+                if max_paginas:
+                    urls = urls[:max_paginas - 1]
+                nuevas += [('listado', n, 0, {'url': url}) for n, url in enumerate(urls, 2)]
+            elif resumen['siguiente'] and not (max_paginas and numero >= max_paginas):
+                # Esquema "Siguiente" (o no reconocido desde la primera página): una página a la vez
+                if tarea['datos'].get('descubrir') or tarea['datos'].get('seguir'):
+                    nuevas.append(('listado', numero + 1, 0, {'url': resumen['siguiente'], 'seguir': True}))
+        resultado = {'url': resumen['url'], 'items': len(tarjetas), 'sin_productos': sin_productos}
+        return resultado, nuevas
+
+    def _detalle(self, tarea: Dict, opciones: Dict) -> Tuple[Dict, List]:
+        """Extrae los detalles y la imagen de un producto (como iter_productos)"""
+        tarjeta = tarea['datos']['tarjeta']
+        # El ID correlativo se asigna al fusionar; mientras tanto el producto se identifica por su link
+        producto = producto_desde_tarjeta(tarjeta, clave_producto(tarjeta['Link']) or
+                                          f"{tarea['pagina']}/{tarea['indice']}")
+        link = producto['Link']
+        url_imagen = producto['URL_Imagen']
+        detalles_previos = None
+        if opciones['extraer_detalles'] and link:
+            detalles_previos = self.huellas.detalles_guardados(producto)
+            if detalles_previos:
+                producto.update(detalles_previos)
+            else:
+                detalles = extraer_detalles_producto(link, HEADERS_NAVEGADOR, verbose=False, sesion=self.sesion,
+                                                     modo_detalle=opciones['modo_detalle'],
+                                                     parseador=self.parseador)
+                aplicar_detalles(producto, detalles)
+                self.huellas.guardar(producto)
+        if opciones['descargar_imagenes'] and url_imagen:
+            producto['Imagen_Local'] = descargar_imagen(url_imagen, None, producto['Titulo'], tarea['indice'],
+                                                        sesion=self.sesion, almacen=self.almacen,
+                                                        link=link) or ""
+        return {campo: producto[campo] for campo in ('Imagen_Local',) + CAMPOS_DETALLE}, []
+
+    def ejecutar_tarea(self, tarea: Dict):
+        opciones = self._opciones_tienda(tarea['url_tienda'])
+        with self._lock:
+            self._en_curso.add(tarea['id'])
+        try:
+            if tarea['tipo'] == 'listado':
+                resultado, nuevas = self._listado(tarea, opciones)
+            else:
+                resultado, nuevas = self._detalle(tarea, opciones)
+        except Exception as e:
+            with self._lock:
+                self._en_curso.discard(tarea['id'])
+            with self._lock:
+                self.estadisticas['errores'] += 1
+            print(f"  ❌ {tarea['tipo']} {tarea['pagina']}/{tarea['indice']} "
+                  f"(intento {tarea['intentos']}): {e}")
+            self.cola.fallar(tarea, self.nombre, e)
+            return
+        aceptada = self.cola.completar(tarea, self.nombre, resultado, nuevas)
+        with self._lock:
+            self._en_curso.discard(tarea['id'])
+            self.estadisticas[tarea['tipo'] if aceptada else 'descartadas'] += 1
+        if tarea['tipo'] == 'listado':
+            print(f"  📄 Página {tarea['pagina']}: {resultado['items']} productos encolados")
+
+    def _renovar_leases(self):
+        """Renueva periódicamente los leases de las tareas en proceso, hasta que termina el trabajador"""
+        while not self._terminado.wait(RENOVAR_LEASE_CADA):
+            with self._lock:
+                ids = list(self._en_curso)
+            try:
+                self.cola.renovar(ids, self.nombre)
+            except sqlite3.Error as e:
+                # Si no se pudo, se reintenta en la próxima vuelta (el lease dura varias)
+                print(f"  ⚠️  No se pudieron renovar los leases: {e}")
+
+    def _bucle(self):
+        while True:
+            tarea = self.cola.tomar(self.nombre)
+            if tarea is None:
+                # Otras tareas en curso todavía pueden encolar más (p. ej. las páginas del listado)
+                if not self.cola.activas():
+                    return
+                time.sleep(ESPERA_SIN_TAREAS)
+                continue
+            self.ejecutar_tarea(tarea)
+
+    def ejecutar(self):
+        """Procesa tareas hasta que no quede ninguna pendiente ni en curso"""
+        print(f"👷 Trabajador {self.nombre}: {self.hilos} hilos")
+        hilos = [threading.Thread(target=self._bucle, name=f'trabajador-{n}', daemon=True)
+                 for n in range(self.hilos)]
+        renovador = threading.Thread(target=self._renovar_leases, name='renovar-leases', daemon=True)
+        try:
+            renovador.start()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        finally:
+            self._terminado.set()
+            renovador.join()
+            self.cerrar()
+        stats = self.estadisticas
+        print(f"👷 Trabajador {self.nombre}: {stats['listado']} páginas, {stats['detalle']} productos, "
+              f"{stats['errores']} errores, {stats['descartadas']} resultados descartados (lease perdido)")
+
+    def cerrar(self):
+        self.parseador.cerrar()
+        self.perfil_layout.guardar()
+        self.almacen.cerrar()
+        self.huellas.cerrar()
+
+
+def fusionar(cola: ColaTareas, url_tienda: str) -> Iterator[Dict]:
+    """
+    Junta los productos terminados de una tienda en el orden del listado, con los mismos
+    IDs que iter_productos (correlativos por tarjeta, contando las que fallaron).
+    """
+    contador_productos = 0
+    for pagina in cola.hechas(url_tienda, 'listado'):
+        if pagina['resultado']['sin_productos']:
+            break
+        detalles = {tarea['indice']: tarea for tarea in cola.hechas(url_tienda, 'detalle', pagina['pagina'])}
+        for idx in range(1, pagina['resultado']['items'] + 1):
+            contador_productos += 1
+            tarea = detalles.get(idx)
+            if tarea is None:
+                print(f"  [{idx}/{pagina['resultado']['items']}] ❌ Producto de la página {pagina['pagina']} "
+                      f"sin terminar")
+                continue
+            producto = producto_desde_tarjeta(tarea['datos']['tarjeta'], contador_productos)
+            producto.update(tarea['resultado'])
+            yield producto
+
+
+def lanzar_trabajadores(cantidad: int, hilos: int, ruta_cola: str = RUTA_COLA,
+                        argumentos: Sequence[str] = ()) -> List[subprocess.Popen]:
+    """Lanza procesos trabajadores locales (python distribuido.py trabajador ...)"""
+    return [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--cola', ruta_cola, 'trabajador',
+                          '--hilos', str(hilos), '--nombre', f"{socket.gethostname()}:local-{numero}",
+                          *argumentos])
+        for numero in range(1, cantidad + 1)
+    ]
+
+
+def imprimir_estado(cola: ColaTareas, url_tienda: Optional[str] = None):
+    conteo = cola.conteo(url_tienda)
+    print(f"📊 Tareas: {conteo.get('hecha', 0)} hechas, {conteo.get('pendiente', 0)} pendientes, "
+          f"{conteo.get('tomada', 0)} en curso, {conteo.get('fallida', 0)} fallidas")
+    if url_tienda:
+        for tipo, pagina, indice, error in cola.fallidas(url_tienda):
+            print(f"   ❌ {tipo} {pagina}/{indice}: {error}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Scraping de Mercado Libre repartido entre varios trabajadores')
+    parser.add_argument('--cola', default=RUTA_COLA, help=f'Archivo SQLite de la cola (por defecto {RUTA_COLA})')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    def opciones_tienda(subparser):
+        subparser.add_argument('url', nargs='?', default=URL_TIENDA_POR_DEFECTO, help='URL del listado de la tienda')
+        subparser.add_argument('--reanudar', action='store_true',
+                               help='Continuar con las tareas ya encoladas de la tienda en vez de empezar de cero')
+        subparser.add_argument('--sin-detalles', action='store_true', help='No visitar las páginas de producto')
+        subparser.add_argument('--sin-imagenes', action='store_true', help='No descargar las imágenes')
+        subparser.add_argument('--detalle', choices=['completo', 'parcial'], default='completo',
+                               help='Parsear la página de producto entera o solo hasta encontrar sus secciones')
+        subparser.add_argument('--max-paginas', type=int, help='Límite de páginas del listado')
+
+    def opciones_trabajador(subparser):
+        subparser.add_argument('--hilos', type=int, default=4, help='Tareas a la vez por trabajador')
+        subparser.add_argument('--parser', choices=['bs4', 'lxml'], default='bs4',
+                               help='Extractor de tarjetas del listado (lxml es más rápido)')
+        subparser.add_argument('--sin-cache', action='store_true',
+                               help='No usar el cache de respuestas en datos/cache_http/')
+        subparser.add_argument('--refrescar-detalles', action='store_true',
+                               help='Visitar todas las páginas de producto aunque su tarjeta no haya cambiado')
+
+    def opciones_fusion(subparser):
+        subparser.add_argument('--nombre', default='viaje_azul_productos', help='Ruta de salida sin extensión')
+        subparser.add_argument('--formatos', default=','.join(FORMATOS_POR_DEFECTO),
+                               help=f"Formatos de salida separados por coma ({', '.join(SALIDAS)})")
+
+    opciones_tienda(comandos.add_parser('encolar', help='Encolar el scraping de una tienda'))
+    trabajador = comandos.add_parser('trabajador', help='Procesar tareas hasta vaciar la cola')
+    trabajador.add_argument('--nombre', help='Identificador del trabajador (por defecto host:pid)')
+    opciones_trabajador(trabajador)
+    fusion = comandos.add_parser('fusionar', help='Guardar los productos terminados de una tienda')
+    fusion.add_argument('url', nargs='?', default=URL_TIENDA_POR_DEFECTO, help='URL del listado de la tienda')
+    opciones_fusion(fusion)
+    estado = comandos.add_parser('estado', help='Mostrar las tareas por estado')
+    estado.add_argument('url', nargs='?', help='URL del listado de la tienda (por defecto toda la cola)')
+    local = comandos.add_parser('local', help='Encolar, lanzar trabajadores locales, esperar y fusionar')
+    opciones_tienda(local)
+    opciones_trabajador(local)
+    opciones_fusion(local)
+    local.add_argument('--trabajadores', type=int, default=4, help='Procesos trabajadores a lanzar')
+    args = parser.parse_args()
+
+    if args.comando in ('fusionar', 'local'):
+        formatos = [f.strip() for f in args.formatos.split(',') if f.strip()]
+        if not formatos or any(f not in SALIDAS for f in formatos):
+            parser.error(f"formatos no válidos: {args.formatos} (opciones: {', '.join(SALIDAS)})")
+
+    cola = ColaTareas(args.cola)
+    try:
+        if args.comando in ('encolar', 'local'):
+            cola.encolar_tienda(args.url, {'extraer_detalles': not args.sin_detalles,
+                                           'descargar_imagenes': not args.sin_imagenes,
+                                           'modo_detalle': args.detalle, 'max_paginas': args.max_paginas},
+                                reiniciar=not args.reanudar)
+            print(f"📥 Tienda encolada: {args.url}")
+
+        if args.comando == 'trabajador':
+            sesion = SesionHTTP(cache=None if args.sin_cache else CacheHTTP())
+            TrabajadorCola(cola, args.nombre, args.hilos, sesion, args.parser,
+                           reutilizar_detalles=not args.refrescar_detalles).ejecutar()
+            sesion.imprimir_estadisticas()
+
+        if args.comando == 'local':
+            argumentos = ['--parser', args.parser]
+            argumentos += ['--sin-cache'] if args.sin_cache else []
+            argumentos += ['--refrescar-detalles'] if args.refrescar_detalles else []
+            inicio = time.time()
+            procesos = lanzar_trabajadores(args.trabajadores, args.hilos, args.cola, argumentos)
+            try:
+                fallidos = sum(proceso.wait() != 0 for proceso in procesos)
+            except KeyboardInterrupt:
+                for proceso in procesos:
+                    proceso.terminate()
+                print("\n\n⏸️  Scraping interrumpido. Las tareas quedaron en la cola;")
+                print("   ejecuta de nuevo con --reanudar para continuar desde ahí.")
+                raise SystemExit(1)
+            print(f"\n⏱️  {args.trabajadores} trabajadores terminaron en {time.time() - inicio:.0f}s")
+            if fallidos:
+                print(f"⚠️  {fallidos} trabajadores terminaron con error")
+
+        if args.comando in ('fusionar', 'local'):
+            if cola.activas(args.url):
+                print("⚠️  Todavía hay tareas pendientes o en curso; se guardan solo las terminadas")
+            imprimir_estado(cola, args.url)
+            guardar_resultados(fusionar(cola, args.url), nombre_archivo=args.nombre, formatos=formatos)
+
+        if args.comando == 'estado':
+            imprimir_estado(cola, args.url)
+    finally:
+        cola.cerrar()
@@ -0,0 +1,769 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extractores de tarjetas de producto para las páginas de listado de Mercado Libre.
+
+Hay dos implementaciones con la misma interfaz (ExtractorListado):
+- ExtractorBS4: la referencia, con BeautifulSoup (el comportamiento original del scraper).
+- ExtractorLXML: la misma lógica con expresiones XPath de lxml precompiladas, bastante más rápida.
+
+Ambas deben producir exactamente los mismos datos; `benchmark_extractores.py` lo verifica
+sobre páginas guardadas y mide tarjetas por segundo de cada una.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+# Estrategias para encontrar las tarjetas, en el orden en que se prueban
+ESTRATEGIAS_ITEMS = ('layout_item', 'result_wrapper', 'andes_card', 'shops_item', 'article')
+
+# Expresiones regulares compartidas (se compilan una sola vez)
+RE_TITULO_A = re.compile(r'poly-component__title')
+RE_TITULO_H2 = re.compile(r'ui-search-item__title|poly-component__title')
+RE_PRECIO = re.compile(r'price')
+RE_LINK_PRODUCTO = re.compile(r'/p/|/MLC|/up/')
+RE_UBICACION = re.compile(r'location')
+RE_CONDICION = re.compile(r'condition')
+RE_ENVIO = re.compile(r'shipping|envio')
+RE_PADRE_ENLACE = re.compile(r'poly-card|ui-search|shops')
+RE_SIGUIENTE = re.compile(r'Siguiente|Next', re.I)
+RE_BOTON_SIGUIENTE = re.compile(r'andes-pagination__button--next')
+RE_CANTIDAD_RESULTADOS = re.compile(r'ui-search-search-result__quantity-results')
+RE_CONTADOR_PAGINAS = re.compile(r'andes-pagination__page-count')
+RE_NO_PRECIO = re.compile(r'[^\d,.]')
+
+
+def _es_enlace_producto(href):
+    return bool(href) and ('/p/' in href or '/MLC' in href)
+
+
+class ExtractorListado:
+    """
+    Interfaz de un extractor de páginas de listado.
+    `doc` e `item` son objetos propios de cada implementación.
+    """
+
+    nombre = ''
+
+    def parsear(self, html: str):
+        """Parsea el HTML de la página y devuelve el documento"""
+        raise NotImplementedError
+
+    def buscar_items(self, doc, estrategia: str) -> List:
+        """Tarjetas encontradas con una de las ESTRATEGIAS_ITEMS"""
+        raise NotImplementedError
+
+    def enlaces_productos(self, doc) -> List:
+        """Enlaces que apuntan a productos (método alternativo)"""
+        raise NotImplementedError
+
+    def items_desde_enlaces(self, enlaces) -> List:
+        """Contenedores de tarjeta de los enlaces a productos, sin repetir"""
+        raise NotImplementedError
+
+    def datos_tarjeta(self, item, url_pagina: str) -> Dict[str, str]:
+        """Título, precio, condición, ubicación, envío, link e imagen de una tarjeta"""
+        raise NotImplementedError
+
+    def enlace_siguiente(self, doc, url_actual: str) -> Optional[str]:
+        """URL absoluta del botón "Siguiente", o None"""
+        raise NotImplementedError
+
+    def texto_cantidad_resultados(self, doc) -> str:
+        """Texto con la cantidad de resultados del listado ("1.234 resultados")"""
+        raise NotImplementedError
+
+    def texto_contador_paginas(self, doc) -> str:
+        """Texto del contador de páginas ("de 5")"""
+        raise NotImplementedError
+
+
+class ExtractorBS4(ExtractorListado):
+    """Extractor de referencia basado en BeautifulSoup"""
+
+    nombre = 'bs4'
+
+    SELECTORES = {
+        'layout_item': ('li', 'ui-search-layout__item'),
+        'result_wrapper': ('div', 'ui-search-result__wrapper'),
+        'andes_card': ('div', 'andes-card'),
+        'shops_item': ('div', 'shops__layout-item'),
+        'article': ('article', ''),
+    }
+
+    def parsear(self, html):
+        return BeautifulSoup(html, 'lxml')
+
+    def buscar_items(self, doc, estrategia):
+        etiqueta, clase = self.SELECTORES[estrategia]
+        return doc.find_all(etiqueta, class_=clase)
+
+    def enlaces_productos(self, doc):
+        return doc.find_all('a', href=_es_enlace_producto)
+
+    def items_desde_enlaces(self, enlaces):
+        items = []
+        for enlace in enlaces[:50]:  # Limitar a 50 para no saturar
+            parent = enlace.find_parent('div', class_=RE_PADRE_ENLACE)
+            if parent and parent not in items:
+                items.append(parent)
+        return items
+
+    def datos_tarjeta(self, item, url_pagina):
+        # Título del producto
+        titulo = ""
+
+        # Método 1: Buscar en <a> con clase poly-component__title
+        titulo_elem = item.find('a', class_=RE_TITULO_A)
+        if titulo_elem:
+            titulo = titulo_elem.text.strip()
+
+        # Método 2: Buscar en <h2>
+        if not titulo:
+            titulo_elem = item.find('h2', class_=RE_TITULO_H2)
+            if titulo_elem:
+                titulo = titulo_elem.text.strip()
+
+        # Método 3: Buscar por atributo title en enlaces
+        if not titulo:
+            any_link = item.find('a', title=True)
+            if any_link:
+                titulo = any_link.get('title', '').strip()
+
+        # Método 4: Buscar en <h3>
+        if not titulo:
+            titulo_elem = item.find('h3')
+            if titulo_elem:
+                titulo = titulo_elem.text.strip()
+
+        # Precio
+        precio_texto = "0"
+        precio_container = item.find('span', class_='andes-money-amount__fraction')
+        if not precio_container:
+            precio_container = item.find('span', class_=RE_PRECIO)
+        if not precio_container:
+            precio_match = item.find('div', class_=RE_PRECIO)
+            if precio_match:
+                precio_texto = RE_NO_PRECIO.sub('', precio_match.text.strip())
+
+        if precio_container:
+            precio_texto = precio_container.text.strip().replace('.', '').replace(',', '')
+            centavos = item.find('span', class_='andes-money-amount__cents')
+            if centavos:
+                precio_texto = f"{precio_texto}.{centavos.text.strip()}"
+
+        # Link del producto
+        link = ""
+        link_elem = item.find('a', href=RE_LINK_PRODUCTO)
+        if link_elem:
+            link = link_elem.get('href', '')
+            # Asegurar URL completa
+            if link and not link.startswith('http'):
+                link = urljoin(url_pagina, link)
+
+        # Imagen del producto
+        url_imagen = ""
+        img_elem = item.find('img')
+        if img_elem:
+            url_imagen = img_elem.get('data-src') or img_elem.get('src', '')
+            # Limpiar data URIs
+            if url_imagen.startswith('data:'):
+                url_imagen = ""
+
+        # Información adicional
+        ubicacion = ""
+        ubicacion_elem = item.find('span', class_=RE_UBICACION)
+        if ubicacion_elem:
+            ubicacion = ubicacion_elem.text.strip()
+
+        condicion = ""
+        condicion_elem = item.find('span', class_=RE_CONDICION)
+        if condicion_elem:
+            condicion = condicion_elem.text.strip()
+
+        envio = ""
+        envio_elem = item.find('span', class_=RE_ENVIO)
+        if envio_elem:
+            envio = envio_elem.text.strip()
+
+        return {
+            'Titulo': titulo,
+            'Precio': precio_texto,
+            'Condicion': condicion,
+            'Ubicacion': ubicacion,
+            'Envio': envio,
+            'Link': link,
+            'URL_Imagen': url_imagen,
+        }
+
+    def enlace_siguiente(self, doc, url_actual):
+        next_btn = doc.find('a', {'title': RE_SIGUIENTE})
+        if not next_btn:
+            next_btn = doc.find('a', class_=RE_BOTON_SIGUIENTE)
+
+        if next_btn and next_btn.get('href'):
+            # Construir URL completa si es relativa
+            return urljoin(url_actual, next_btn['href'])
+        return None
+
+    def texto_cantidad_resultados(self, doc):
+        elem = doc.find(class_=RE_CANTIDAD_RESULTADOS)
+        return elem.get_text() if elem else ''
+
+    def texto_contador_paginas(self, doc):
+        elem = doc.find(class_=RE_CONTADOR_PAGINAS)
+        return elem.get_text() if elem else ''
+
+
+def _clase_exacta(clase):
+    """Condición XPath equivalente a class_='clase' de BeautifulSoup"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {clase} ')"
+
+
+def _clase_contiene(*fragmentos):
+    """Condición XPath equivalente a class_=re.compile('a|b') de BeautifulSoup"""
+    return '(' + ' or '.join(f"contains(@class, '{f}')" for f in fragmentos) + ')'
+
+
+def _primero(xpath):
+    """XPath precompilado que devuelve solo el primer nodo"""
+    return etree.XPath(f'({xpath})[1]')
+
+
+class ExtractorLXML(ExtractorListado):
+    """
+    Extractor con lxml y XPath precompilados.
+    Replica la semántica de ExtractorBS4 (incluido el texto sin <script>/<style>).
+    """
+
+    nombre = 'lxml'
+
+    ITEMS = {
+        'layout_item': etree.XPath(f"//li[{_clase_exacta('ui-search-layout__item')}]"),
+        'result_wrapper': etree.XPath(f"//div[{_clase_exacta('ui-search-result__wrapper')}]"),
+        'andes_card': etree.XPath(f"//div[{_clase_exacta('andes-card')}]"),
+        'shops_item': etree.XPath(f"//div[{_clase_exacta('shops__layout-item')}]"),
+        'article': etree.XPath("//article[@class = '']"),
+    }
+
+    X_TEXTO = etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+    X_ENLACES_HREF = etree.XPath("//a[@href]")
+    X_PADRES_ENLACE = etree.XPath(f"ancestor::div[{_clase_contiene('poly-card', 'ui-search', 'shops')}]")
+
+    X_TITULO_A = _primero(f".//a[{_clase_contiene('poly-component__title')}]")
+    X_TITULO_H2 = _primero(f".//h2[{_clase_contiene('ui-search-item__title', 'poly-component__title')}]")
+    X_A_CON_TITLE = _primero(".//a[@title]")
+    X_H3 = _primero(".//h3")
+    X_FRACCION = _primero(f".//span[{_clase_exacta('andes-money-amount__fraction')}]")
+    X_SPAN_PRECIO = _primero(f".//span[{_clase_contiene('price')}]")
+    X_DIV_PRECIO = _primero(f".//div[{_clase_contiene('price')}]")
+    X_CENTAVOS = _primero(f".//span[{_clase_exacta('andes-money-amount__cents')}]")
+    X_LINKS = etree.XPath(".//a[@href]")
+    X_IMG = _primero(".//img")
+    X_UBICACION = _primero(f".//span[{_clase_contiene('location')}]")
+    X_CONDICION = _primero(f".//span[{_clase_contiene('condition')}]")
+    X_ENVIO = _primero(f".//span[{_clase_contiene('shipping', 'envio')}]")
+
+    X_A_TITLE = etree.XPath("//a[@title]")
+    X_BOTON_SIGUIENTE = _primero(f"//a[{_clase_contiene('andes-pagination__button--next')}]")
+    X_CANTIDAD = _primero(f"//*[{_clase_contiene('ui-search-search-result__quantity-results')}]")
+    X_CONTADOR = _primero(f"//*[{_clase_contiene('andes-pagination__page-count')}]")
+
+    def _texto(self, elem):
+        return ''.join(self.X_TEXTO(elem))
+
+    def _uno(self, xpath, elem):
+        nodos = xpath(elem)
+        return nodos[0] if nodos else None
+
+    def parsear(self, html):
+        return lxml_html.document_fromstring(html)
+
+    def buscar_items(self, doc, estrategia):
+        return self.ITEMS[estrategia](doc)
+
+    def enlaces_productos(self, doc):
+        return [a for a in self.X_ENLACES_HREF(doc) if _es_enlace_producto(a.get('href'))]
+
+    def items_desde_enlaces(self, enlaces):
+        items = []
+        vistos = set()
+        for enlace in enlaces[:50]:  # Limitar a 50 para no saturar
+            padres = self.X_PADRES_ENLACE(enlace)
+            if not padres:
+                continue
+            # El ancestro más cercano, como find_parent de BeautifulSoup
+            parent = padres[-1]
+            # BeautifulSoup compara tarjetas por contenido, no por identidad
+            clave = etree.tostring(parent, with_tail=False)
+            if clave not in vistos:
+                vistos.add(clave)
+                items.append(parent)
+        return items
+
+    def datos_tarjeta(self, item, url_pagina):
+        titulo = ""
+        titulo_elem = self._uno(self.X_TITULO_A, item)
+        if titulo_elem is not None:
+            titulo = self._texto(titulo_elem).strip()
+
+        if not titulo:
+            titulo_elem = self._uno(self.X_TITULO_H2, item)
+            if titulo_elem is not None:
+                titulo = self._texto(titulo_elem).strip()
+
+        if not titulo:
+            any_link = self._uno(self.X_A_CON_TITLE, item)
+            if any_link is not None:
+                titulo = any_link.get('title', '').strip()
+
+        if not titulo:
+            titulo_elem = self._uno(self.X_H3, item)
+            if titulo_elem is not None:
+                titulo = self._texto(titulo_elem).strip()
+
+        precio_texto = "0"
+        precio_container = self._uno(self.X_FRACCION, item)
+        if precio_container is None:
+            precio_container = self._uno(self.X_SPAN_PRECIO, item)
+        if precio_container is None:
+            precio_match = self._uno(self.X_DIV_PRECIO, item)
+            if precio_match is not None:
+                precio_texto = RE_NO_PRECIO.sub('', self._texto(precio_match).strip())
+
+        if precio_container is not None:
+            precio_texto = self._texto(precio_container).strip().replace('.', '').replace(',', '')
+            centavos = self._uno(self.X_CENTAVOS, item)
+            if centavos is not None:
+                precio_texto = f"{precio_texto}.{self._texto(centavos).strip()}"
+
+        link = ""
+        for link_elem in self.X_LINKS(item):
+            if RE_LINK_PRODUCTO.search(link_elem.get('href')):
+                link = link_elem.get('href', '')
+                if link and not link.startswith('http'):
+                    link = urljoin(url_pagina, link)
+                break
+
+        url_imagen = ""
+        img_elem = self._uno(self.X_IMG, item)
+        if img_elem is not None:
+            url_imagen = img_elem.get('data-src') or img_elem.get('src', '')
+            if url_imagen.startswith('data:'):
+                url_imagen = ""
+
+        ubicacion = ""
+        ubicacion_elem = self._uno(self.X_UBICACION, item)
+        if ubicacion_elem is not None:
+            ubicacion = self._texto(ubicacion_elem).strip()
+
+        condicion = ""
+        condicion_elem = self._uno(self.X_CONDICION, item)
+        if condicion_elem is not None:
+            condicion = self._texto(condicion_elem).strip()
+
+        envio = ""
+        envio_elem = self._uno(self.X_ENVIO, item)
+        if envio_elem is not None:
+            envio = self._texto(envio_elem).strip()
+
+        return {
+            'Titulo': titulo,
+            'Precio': precio_texto,
+            'Condicion': condicion,
+            'Ubicacion': ubicacion,
+            'Envio': envio,
+            'Link': link,
+            'URL_Imagen': url_imagen,
+        }
+
+    def enlace_siguiente(self, doc, url_actual):
+        next_btn = None
+        for a in self.X_A_TITLE(doc):
+            if RE_SIGUIENTE.search(a.get('title')):
+                next_btn = a
+                break
+        if next_btn is None:
+            next_btn = self._uno(self.X_BOTON_SIGUIENTE, doc)
+
+        if next_btn is not None and next_btn.get('href'):
+            return urljoin(url_actual, next_btn.get('href'))
+        return None
+
+    def texto_cantidad_resultados(self, doc):
+        elem = self._uno(self.X_CANTIDAD, doc)
+        return self._texto(elem) if elem is not None else ''
+
+    def texto_contador_paginas(self, doc):
+        elem = self._uno(self.X_CONTADOR, doc)
+        return self._texto(elem) if elem is not None else ''
+
+
+EXTRACTORES = {
+    'bs4': ExtractorBS4,
+    'lxml': ExtractorLXML,
+}
+
+
+def obtener_extractor(nombre: str = 'bs4') -> ExtractorListado:
+    """Devuelve una instancia del extractor de listado indicado ('bs4' o 'lxml')"""
+    if nombre not in EXTRACTORES:
+        raise ValueError(f"Extractor desconocido: {nombre} (opciones: {', '.join(EXTRACTORES)})")
+    return EXTRACTORES[nombre]()
+
+
+def resumir_listado(html: str, url_pagina: str, parser: str = 'bs4',
+                    estrategias=ESTRATEGIAS_ITEMS) -> Dict:
+    """
+    Parsea una página de listado y devuelve solo datos planos (sin objetos del parser),
+    para poder ejecutarse en otro proceso y devolver un resultado pequeño.
+
+    Args:
+        html: HTML de la página
+        url_pagina: URL final de la página (para resolver enlaces relativos)
+        parser: Extractor a usar ('bs4' o 'lxml')
+        estrategias: Estrategias de ESTRATEGIAS_ITEMS en el orden en que se prueban
+
+    Returns:
+        Diccionario con 'tarjetas' (datos_tarjeta de cada item, o {'Error': mensaje}),
+        'estrategia' ganadora, 'fallidas', 'enlaces' (cantidad de enlaces del método
+        alternativo, None si no se usó) y los datos de paginación 'siguiente',
+        'cantidad' y 'contador'.
+    """
+    extractor = obtener_extractor(parser)
+    doc = extractor.parsear(html)
+
+    items = []
+    estrategia = None
+    fallidas = []
+    for nombre in estrategias:
+        items = extractor.buscar_items(doc, nombre)
+        if items:
+            estrategia = nombre
+            break
+        fallidas.append(nombre)
+
+    enlaces = None
+    if not items:
+        # Método alternativo: contenedores de los enlaces a productos
+        enlaces_productos = extractor.enlaces_productos(doc)
+        enlaces = len(enlaces_productos)
+        if enlaces_productos:
+            items = extractor.items_desde_enlaces(enlaces_productos)
+
+    tarjetas = []
+    for item in items:
+        try:
+            tarjetas.append(extractor.datos_tarjeta(item, url_pagina))
+        except Exception as e:
+            tarjetas.append({'Error': str(e)})
+
+    return {
+        'url': url_pagina,
+        'tarjetas': tarjetas,
+        'estrategia': estrategia,
+        'fallidas': fallidas,
+        'enlaces': enlaces,
+        'siguiente': extractor.enlace_siguiente(doc, url_pagina),
+        'cantidad': extractor.texto_cantidad_resultados(doc),
+        'contador': extractor.texto_contador_paginas(doc),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Páginas de producto (detalles)
+# ---------------------------------------------------------------------------
+
+RE_DESC_PDP = re.compile(r'ui-pdp-description')
+RE_DESC_ITEM = re.compile(r'item-description')
+RE_DESC_CONTENIDO = re.compile(r'ui-pdp-description__content')
+RE_TABLA_SPECS = re.compile(r'andes-table|specs')
+RE_DESTACADAS = re.compile(r'ui-pdp-highlighted-specs|ui-vpp-highlighted-specs')
+RE_DESTACADA_ITEM = re.compile(r'ui-pdp-highlighted-specs__item')
+RE_ETIQUETA = re.compile(r'label')
+RE_VALOR = re.compile(r'value')
+RE_SPECS_TECNICAS = re.compile(r'ui-pdp-specs')
+
+# Tamaño de los trozos en que se lee la respuesta en modo parcial
+TAMANO_TROZO = 32 * 1024
+
+
+def detalles_vacios() -> Dict:
+    """Estructura de detalles sin datos"""
+    return {
+        'Descripcion': '',
+        'Caracteristicas_Principales': {},
+        'Caracteristicas_Ventas': {},
+        'Otras_Caracteristicas': {}
+    }
+
+
+def aplicar_json_ld(detalles: Dict, texto: Optional[str]):
+    """Completa los detalles con un script JSON-LD (descripción y propiedades adicionales)"""
+    try:
+        data = json.loads(texto)
+        if isinstance(data, dict):
+            # Extraer descripción si está disponible
+            if 'description' in data and not detalles['Descripcion']:
+                detalles['Descripcion'] = data['description'][:500]
+
+            # Extraer propiedades adicionales
+            if 'additionalProperty' in data:
+                for prop in data['additionalProperty']:
+                    if isinstance(prop, dict):
+                        name = prop.get('name', '')
+                        value = prop.get('value', '')
+                        if name and value:
+                            detalles['Caracteristicas_Principales'][name] = str(value)
+    except Exception:
+        pass
+
+
+def detalles_desde_html(html: str) -> Dict:
+    """
+    Extrae descripción y características de una página de producto completa
+    con BeautifulSoup (implementación de referencia).
+    """
+    detalles = detalles_vacios()
+    soup = BeautifulSoup(html, 'lxml')
+
+    # Extraer descripción
+    desc_elem = soup.find('div', class_=RE_DESC_PDP)
+    if not desc_elem:
+        desc_elem = soup.find('div', class_=RE_DESC_ITEM)
+    if not desc_elem:
+        # Buscar en el contenido de texto
+        desc_elem = soup.find('p', class_=RE_DESC_CONTENIDO)
+
+    if desc_elem:
+        detalles['Descripcion'] = desc_elem.get_text(strip=True, separator=' ')[:500]
+
+    # Extraer características/especificaciones
+    # Mercado Libre usa diferentes estructuras según el tipo de producto
+
+    # Método 1: Tabla de especificaciones estándar
+    spec_table = soup.find('table', class_=RE_TABLA_SPECS)
+    if spec_table:
+        rows = spec_table.find_all('tr')
+        for row in rows:
+            cells = row.find_all(['th', 'td'])
+            if len(cells) >= 2:
+                key = cells[0].get_text(strip=True)
+                value = cells[1].get_text(strip=True)
+                detalles['Caracteristicas_Principales'][key] = value
+
+    # Método 2: Divs con atributos
+    specs_container = soup.find_all('div', class_=RE_DESTACADAS)
+    for container in specs_container:
+        spec_items = container.find_all('div', class_=RE_DESTACADA_ITEM)
+        for item in spec_items:
+            label = item.find('span', class_=RE_ETIQUETA)
+            value = item.find('span', class_=RE_VALOR)
+            if label and value:
+                detalles['Caracteristicas_Ventas'][label.get_text(strip=True)] = value.get_text(strip=True)
+
+    # Método 3: Sección de especificaciones técnicas
+    tech_specs = soup.find_all('div', class_=RE_SPECS_TECNICAS)
+    for spec_section in tech_specs:
+        spec_pairs = spec_section.find_all('tr')
+        for pair in spec_pairs:
+            th = pair.find('th')
+            td = pair.find('td')
+            if th and td:
+                key = th.get_text(strip=True)
+                value = td.get_text(strip=True)
+                if key and value:
+                    detalles['Otras_Caracteristicas'][key] = value
+
+    # Método 4: Buscar en scripts JSON-LD (datos estructurados)
+    for script in soup.find_all('script', type='application/ld+json'):
+        aplicar_json_ld(detalles, script.string)
+
+    return detalles
+
+
+class LectorDetalleParcial:
+    """
+    Extracción incremental de una página de producto con el parser "pull" de lxml.
+
+    Se alimenta con trozos de bytes a medida que llegan de la red. Solo se conservan
+    los subárboles de las secciones que interesan (descripción, tablas de características
+    y scripts JSON-LD); el resto del documento se descarta apenas termina de parsearse,
+    así que la memoria no crece con el tamaño de la página. Cuando ya se vio cada tipo
+    de sección, `completo` pasa a True y se puede dejar de leer la respuesta.
+
+    Produce los mismos detalles que `detalles_desde_html` salvo cuando una sección
+    que se repite (características destacadas, técnicas o JSON-LD) vuelve a aparecer
+    después del punto de corte.
+    """
+
+    # Secciones que deben verse para cortar la lectura
+    SECCIONES_REQUERIDAS = ('descripcion_pdp', 'tabla', 'destacadas', 'tecnicas', 'json_ld')
+
+    # Secciones de las que solo interesa la primera aparición (como soup.find)
+    SECCIONES_UNICAS = ('descripcion_pdp', 'descripcion_item', 'descripcion_contenido', 'tabla')
+
+    X_TEXTO = etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+    X_FILAS = etree.XPath(".//tr")
+    X_CELDAS = etree.XPath(".//th | .//td")
+    X_TH = etree.XPath("(.//th)[1]")
+    X_TD = etree.XPath("(.//td)[1]")
+    X_DESTACADA_ITEMS = etree.XPath(f".//div[{_clase_contiene('ui-pdp-highlighted-specs__item')}]")
+    X_ETIQUETA = etree.XPath(f"(.//span[{_clase_contiene('label')}])[1]")
+    X_VALOR = etree.XPath(f"(.//span[{_clase_contiene('value')}])[1]")
+
+    def __init__(self):
+        self._parser = etree.HTMLPullParser(events=('start', 'end'), encoding='utf-8')
+        self._abiertas = {}
+        self._vistas = set()
+        self._capturas = {'descripcion_pdp': None, 'descripcion_item': None,
+                          'descripcion_contenido': None, 'tabla': None,
+                          'destacadas': [], 'tecnicas': [], 'json_ld': []}
+        self.bytes_leidos = 0
+
+    @property
+    def completo(self) -> bool:
+        return not self._abiertas and all(s in self._vistas for s in self.SECCIONES_REQUERIDAS)
+
+    def _secciones(self, elem):
+        """Tipos de sección que empiezan en este elemento"""
+        tag = elem.tag
+        if tag == 'script':
+            return ['json_ld'] if elem.get('type') == 'application/ld+json' else []
+        clase = elem.get('class')
+        if not clase:
+            return []
+        secciones = []
+        if tag == 'div':
+            if RE_DESC_PDP.search(clase):
+                secciones.append('descripcion_pdp')
+            if RE_DESC_ITEM.search(clase):
+                secciones.append('descripcion_item')
+            if RE_DESTACADAS.search(clase):
+                secciones.append('destacadas')
+            if RE_SPECS_TECNICAS.search(clase):
+                secciones.append('tecnicas')
+        elif tag == 'p' and RE_DESC_CONTENIDO.search(clase):
+            secciones.append('descripcion_contenido')
+        elif tag == 'table' and RE_TABLA_SPECS.search(clase):
+            secciones.append('tabla')
+        return secciones
+
+    @staticmethod
+    def _aporta_datos(texto):
+        prueba = detalles_vacios()
+        aplicar_json_ld(prueba, texto)
+        return bool(prueba['Descripcion'] or prueba['Caracteristicas_Principales'])
+
+    def _dentro_de(self, seccion):
+        return any(seccion in secciones for secciones in self._abiertas.values())
+
+    def _texto(self, elem, separador=''):
+        return separador.join(t.strip() for t in self.X_TEXTO(elem) if t.strip())
+
+    def _cerrar_seccion(self, seccion, elem):
+        """Convierte el subárbol terminado en datos planos"""
+        if seccion.startswith('descripcion'):
+            self._capturas[seccion] = self._texto(elem, ' ')[:500]
+        elif seccion == 'tabla':
+            filas = []
+            for row in self.X_FILAS(elem):
+                cells = self.X_CELDAS(row)
+                if len(cells) >= 2:
+                    filas.append((self._texto(cells[0]), self._texto(cells[1])))
+            self._capturas['tabla'] = filas
+        elif seccion == 'destacadas':
+            for item in self.X_DESTACADA_ITEMS(elem):
+                label = self.X_ETIQUETA(item)
+                value = self.X_VALOR(item)
+                if label and value:
+                    self._capturas['destacadas'].append((self._texto(label[0]), self._texto(value[0])))
+        elif seccion == 'tecnicas':
+            for pair in self.X_FILAS(elem):
+                th = self.X_TH(pair)
+                td = self.X_TD(pair)
+                if th and td:
+                    self._capturas['tecnicas'].append((self._texto(th[0]), self._texto(td[0])))
+        elif seccion == 'json_ld':
+            self._capturas['json_ld'].append(elem.text)
+            # Las páginas traen varios JSON-LD (breadcrumbs, vendedor...): solo cuenta
+            # como visto el que tiene datos del producto
+            if not self._aporta_datos(elem.text):
+                self._vistas.discard('json_ld')
+
+    def alimentar(self, trozo: bytes):
+        """Procesa un trozo de la respuesta"""
+        self.bytes_leidos += len(trozo)
+        self._parser.feed(trozo)
+        self._procesar_eventos()
+
+    def _procesar_eventos(self):
+        for evento, elem in self._parser.read_events():
+            if evento == 'start':
+                nuevas = [
+                    s for s in self._secciones(elem)
+                    if not (s in self.SECCIONES_UNICAS and s in self._vistas) and not self._dentro_de(s)
+                ]
+                if nuevas:
+                    self._abiertas[elem] = nuevas
+                    self._vistas.update(nuevas)
+                continue
+
+            secciones = self._abiertas.pop(elem, None)
+            if secciones:
+                for seccion in secciones:
+                    self._cerrar_seccion(seccion, elem)
+            if not self._abiertas:
+                # Nada abierto que capturar: liberar el elemento y sus hermanos anteriores
+                elem.clear(keep_tail=False)
+                padre = elem.getparent()
+                if padre is not None:
+                    while elem.getprevious() is not None:
+                        del padre[0]
+
+    def detalles(self) -> Dict:
+        """Detalles extraídos hasta ahora, con el mismo formato que detalles_desde_html"""
+        detalles = detalles_vacios()
+        capturas = self._capturas
+
+        for seccion in ('descripcion_pdp', 'descripcion_item', 'descripcion_contenido'):
+            if capturas[seccion] is not None:
+                detalles['Descripcion'] = capturas[seccion]
+                break
+
+        for key, value in capturas['tabla'] or []:
+            detalles['Caracteristicas_Principales'][key] = value
+        for key, value in capturas['destacadas']:
+            detalles['Caracteristicas_Ventas'][key] = value
+        for key, value in capturas['tecnicas']:
+            if key and value:
+                detalles['Otras_Caracteristicas'][key] = value
+        for texto in capturas['json_ld']:
+            aplicar_json_ld(detalles, texto)
+
+        return detalles
+
+
+def detalles_parciales(trozos) -> Tuple[Dict, Dict]:
+    """
+    Extrae los detalles de una página de producto leyendo los trozos solo
+    hasta que aparecen todas las secciones.
+
+    Args:
+        trozos: Iterable de bytes (por ejemplo response.iter_content())
+
+    Returns:
+        (detalles, lectura) donde lectura tiene 'bytes_leidos' y 'corte_anticipado'
+    """
+    lector = LectorDetalleParcial()
+    for trozo in trozos:
+        if trozo:
+            lector.alimentar(trozo)
+        if lector.completo:
+            break
+    return lector.detalles(), {'bytes_leidos': lector.bytes_leidos, 'corte_anticipado': lector.completo}
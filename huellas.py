@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Huellas de las tarjetas del listado para re-scrapeos incrementales.
+Por cada producto se guarda un hash de lo que muestra su tarjeta (título, precio y link)
+junto con los detalles que se extrajeron de su página. En la siguiente ejecución, si la
+tarjeta no cambió, se reutilizan esos detalles y no se visita la página del producto.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+RUTA_HUELLAS = 'datos/huellas_productos.sqlite'
+
+# Campos de la tarjeta que forman la huella
+CAMPOS_HUELLA = ('Titulo', 'Precio', 'Link')
+
+# Campos de detalle que se reutilizan
+CAMPOS_DETALLE = ('Descripcion', 'Caracteristicas_Principales', 'Caracteristicas_Ventas', 'Otras_Caracteristicas')
+
+RE_ID_PRODUCTO = re.compile(r'(MLC)-?(\d+)', re.I)
+
+
+def clave_producto(link: str) -> str:
+    """Identificador estable del producto: el código MLC o el link sin query ni fragmento"""
+    match = RE_ID_PRODUCTO.search(link or '')
+    if match:
+        return f"{match.group(1).upper()}{match.group(2)}"
+    partes = urlparse(link or '')
+    return f"{partes.netloc}{partes.path}"
+
+
+def huella_tarjeta(producto: Dict) -> str:
+    """Hash de los datos visibles en la tarjeta (el link sin parámetros de seguimiento)"""
+    valores = [str(producto.get(campo) or '') for campo in CAMPOS_HUELLA]
+    valores[CAMPOS_HUELLA.index('Link')] = clave_producto(producto.get('Link'))
+    return hashlib.sha1('\x1f'.join(valores).encode('utf-8')).hexdigest()
+
+
+class HuellasProductos:
+    """
+    Huella y detalles de cada producto visto en ejecuciones anteriores.
+    Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, ruta: str = RUTA_HUELLAS, reutilizar: bool = True):
+        """
+        Args:
+            ruta: Archivo SQLite con las huellas
+            reutilizar: Si es False nunca se reutilizan detalles, pero las huellas se
+                        siguen actualizando (para refrescar todo el catálogo)
+        """
+        self.ruta = ruta
+        self.reutilizar = reutilizar
+        self.estadisticas = {'reutilizados': 0, 'nuevos': 0, 'cambiados': 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS huellas (
+                clave TEXT PRIMARY KEY,
+                huella TEXT NOT NULL,
+                descripcion TEXT,
+                caracteristicas_principales TEXT,
+                caracteristicas_ventas TEXT,
+                otras_caracteristicas TEXT,
+                actualizado REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def detalles_guardados(self, producto: Dict) -> Optional[Dict[str, str]]:
+        """
+        Detalles de la ejecución anterior si la tarjeta del producto no cambió.
+
+        Returns:
+            Diccionario con los CAMPOS_DETALLE, o None si el producto es nuevo o cambió
+        """
+        if not self.reutilizar:
+            return None
+        with self._lock:
+            fila = self._db.execute(
+                "SELECT huella, descripcion, caracteristicas_principales, caracteristicas_ventas, "
+                "otras_caracteristicas FROM huellas WHERE clave = ?",
+                (clave_producto(producto.get('Link')),)
+            ).fetchone()
+            if not fila:
+                self.estadisticas['nuevos'] += 1
+                return None
+            if fila[0] != huella_tarjeta(producto):
+                self.estadisticas['cambiados'] += 1
+                return None
+            self.estadisticas['reutilizados'] += 1
+        return dict(zip(CAMPOS_DETALLE, (valor or '' for valor in fila[1:])))
+
+    def guardar(self, producto: Dict):
+        """Guarda la huella y los detalles de un producto ya completo"""
+        # Si no se obtuvo ningún detalle (p. ej. falló la descarga) se reintenta la próxima vez
+        if not any(producto.get(campo) for campo in CAMPOS_DETALLE):
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO huellas (clave, huella, descripcion, caracteristicas_principales, "
+                "caracteristicas_ventas, otras_caracteristicas, actualizado) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (clave_producto(producto.get('Link')), huella_tarjeta(producto),
+                 *(producto.get(campo, '') for campo in CAMPOS_DETALLE), time.time())
+            )
+            self._db.commit()
+
+    def imprimir_estadisticas(self):
+        stats = self.estadisticas
+        print(f"🔁 Detalles: {stats['reutilizados']} reutilizados (tarjeta sin cambios), "
+              f"{stats['nuevos']} productos nuevos, {stats['cambiados']} con cambios")
+
+    def cerrar(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Descarga de imágenes de productos en un pool de hilos.
+
+Cada imagen se escribe en disco a medida que llega (sin cargarla entera en memoria)
+en un archivo temporal que se renombra al terminar, así nunca queda una imagen a medias.
+El archivo final se llama como el hash de su contenido: la misma imagen usada por varios
+productos se guarda una sola vez y todos apuntan a ella.
+
+AlmacenImagenes guarda las imágenes directamente en datos/imagenes/ (donde las busca
+conversor_a_json.py) junto a un índice SQLite producto → hash → archivo, que también dice
+qué URLs ya están descargadas sin revisar el disco archivo por archivo.
+
+Por cada URL se guardan su ETag/Last-Modified y cuándo se revisó: dentro de TTL_IMAGENES
+no se vuelve a pedir, y después se revalida con un GET condicional (un 304 no descarga nada).
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from huellas import clave_producto
+from sesion_http import obtener_sesion
+
+# Carpeta del almacén de imágenes (la que lee conversor_a_json.py)
+CARPETA_IMAGENES = 'datos/imagenes'
+
+# Índice del almacén, dentro de su carpeta
+NOMBRE_INDICE = 'indice_imagenes.sqlite'
+
+# Hilos de descarga por defecto
+HILOS_IMAGENES = 4
+
+# Tiempo durante el que una imagen revisada no se vuelve a consultar (en segundos)
+TTL_IMAGENES = 7 * 24 * 60 * 60
+
+# Tamaño de los trozos que se leen de la respuesta
+TAMANO_TROZO_IMAGEN = 64 * 1024
+
+# Mercado Libre sirve la misma imagen en varios tamaños; -F es el más grande
+RE_TAMANO_ML = re.compile(r'-[IOD]\..*$')
+
+EXTENSIONES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+
+
+def url_imagen_grande(url_imagen: str) -> str:
+    """URL de la versión grande de una imagen de Mercado Libre"""
+    if '-I' in url_imagen or '-O' in url_imagen or '-D' in url_imagen:
+        return RE_TAMANO_ML.sub('-F.jpg', url_imagen)
+    return url_imagen
+
+
+def guardar_respuesta(response, carpeta_destino: str,
+                      existe: Callable[[str], bool] = os.path.exists) -> Tuple[str, bool]:
+    """
+    Escribe el cuerpo de la respuesta en carpeta_destino, nombrado por su hash.
+
+    Args:
+        response: Respuesta pedida con stream=True
+        carpeta_destino: Carpeta de las imágenes
+        existe: Cómo saber si ya hay un archivo con esa ruta (por defecto, mirando el disco)
+
+    Returns:
+        (ruta, nueva): nueva es False si ya había una imagen con el mismo contenido
+    """
+    os.makedirs(carpeta_destino, exist_ok=True)
+    tipo = response.headers.get('Content-Type', '').split(';')[0].strip()
+    extension = EXTENSIONES.get(tipo, '.jpg')
+    digest = hashlib.sha256()
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta_destino, prefix='.descarga-', suffix=extension)
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            for trozo in response.iter_content(TAMANO_TROZO_IMAGEN):
+                digest.update(trozo)
+                archivo.write(trozo)
+        ruta = os.path.join(carpeta_destino, digest.hexdigest() + extension)
+        if existe(ruta):
+            os.remove(temporal)
+            return ruta, False
+        os.replace(temporal, ruta)
+        return ruta, True
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+class AlmacenImagenes:
+    """
+    Imágenes guardadas por hash en una carpeta, con un índice de qué archivo corresponde
+    a cada URL y a cada producto. Es seguro usarlo desde varios hilos.
+    En el índice solo se guarda el nombre del archivo: la carpeta se puede mover entera.
+    """
+
+    def __init__(self, carpeta: str = CARPETA_IMAGENES):
+        self.carpeta = carpeta
+        self._lock = threading.Lock()
+        os.makedirs(carpeta, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(carpeta, NOMBRE_INDICE), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS archivos (
+                hash TEXT PRIMARY KEY,
+                archivo TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                guardado REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                revisado REAL
+            );
+            CREATE TABLE IF NOT EXISTS productos (
+                clave TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS variantes (
+                hash TEXT NOT NULL,
+                tamano TEXT NOT NULL,
+                formato TEXT NOT NULL,
+                archivo TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                PRIMARY KEY (hash, tamano, formato)
+            );
+        """)
+        # Índices creados antes de guardar la validación de cada URL
+        columnas = {fila[1] for fila in self._db.execute("PRAGMA table_info(urls)")}
+        for columna, tipo in (('etag', 'TEXT'), ('last_modified', 'TEXT'), ('revisado', 'REAL')):
+            if columna not in columnas:
+                self._db.execute(f"ALTER TABLE urls ADD COLUMN {columna} {tipo}")
+        self._db.commit()
+        with self._lock:
+            self._archivos = {archivo for (archivo,) in self._db.execute("SELECT archivo FROM archivos")}
+
+    @staticmethod
+    def existe_indice(carpeta: str = CARPETA_IMAGENES) -> bool:
+        return os.path.exists(os.path.join(carpeta, NOMBRE_INDICE))
+
+    def _ruta(self, archivo: Optional[str]) -> Optional[str]:
+        return f"{self.carpeta}/{archivo}" if archivo else None
+
+    def entrada_url(self, url_imagen: str) -> Optional[Dict]:
+        """Imagen ya descargada desde esa URL (ruta, etag, last_modified, revisado), si hay"""
+        with self._lock:
+            fila = self._db.execute(
+                "SELECT a.archivo, u.etag, u.last_modified, u.revisado FROM urls u "
+                "JOIN archivos a ON a.hash = u.hash WHERE u.url = ?",
+                (url_imagen,)
+            ).fetchone()
+        if not fila:
+            return None
+        return {'ruta': self._ruta(fila[0]), 'etag': fila[1], 'last_modified': fila[2], 'revisado': fila[3] or 0}
+
+    def ruta_producto(self, link: str) -> Optional[str]:
+        """Ruta de la imagen de un producto (por su link, ver huellas.clave_producto)"""
+        with self._lock:
+            fila = self._db.execute(
+                "SELECT a.archivo FROM productos p JOIN archivos a ON a.hash = p.hash WHERE p.clave = ?",
+                (clave_producto(link),)
+            ).fetchone()
+        return self._ruta(fila[0] if fila else None)
+
+    def guardar(self, response, url_imagen: str) -> Tuple[str, bool]:
+        """
+        Guarda la imagen de la respuesta y la anota en el índice para esa URL,
+        con su ETag/Last-Modified.
+
+        Returns:
+            (ruta, nueva) como guardar_respuesta
+        """
+        ruta, nueva = guardar_respuesta(response, self.carpeta,
+                                        existe=lambda r: os.path.basename(r) in self._archivos)
+        archivo = os.path.basename(ruta)
+        digest = os.path.splitext(archivo)[0]
+        with self._lock:
+            if nueva:
+                self._db.execute("INSERT OR REPLACE INTO archivos (hash, archivo, bytes, guardado) VALUES (?, ?, ?, ?)",
+                                 (digest, archivo, os.path.getsize(ruta), time.time()))
+                self._archivos.add(archivo)
+            anterior = self._db.execute("SELECT hash FROM urls WHERE url = ?", (url_imagen,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO urls (url, hash, etag, last_modified, revisado) VALUES (?, ?, ?, ?, ?)",
+                (url_imagen, digest, response.headers.get('ETag'), response.headers.get('Last-Modified'), time.time())
+            )
+            if anterior and anterior[0] != digest:
+                self._eliminar_si_huerfano(anterior[0])
+            self._db.commit()
+        return ruta, nueva
+
+    def renovar(self, url_imagen: str, response):
+        """Marca como revisada una URL que respondió 304 Not Modified"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE urls SET revisado = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), response.headers.get('ETag'), response.headers.get('Last-Modified'), url_imagen)
+            )
+            self._db.commit()
+
+    def asociar(self, link: str, url_imagen: str):
+        """Anota que la imagen de esa URL (ya guardada) es la del producto"""
+        clave = clave_producto(link)
+        with self._lock:
+            fila = self._db.execute("SELECT hash FROM urls WHERE url = ?", (url_imagen,)).fetchone()
+            if fila:
+                anterior = self._db.execute("SELECT hash FROM productos WHERE clave = ?", (clave,)).fetchone()
+                self._db.execute("INSERT OR REPLACE INTO productos (clave, url, hash) VALUES (?, ?, ?)",
+                                 (clave, url_imagen, fila[0]))
+                if anterior and anterior[0] != fila[0]:
+                    self._eliminar_si_huerfano(anterior[0])
+                self._db.commit()
+
+    def _eliminar_si_huerfano(self, digest: str):
+        """
+        Borra la imagen (y sus variantes) si ninguna URL ni producto la referencia,
+        p. ej. la versión anterior de una imagen que cambió (requiere el lock)
+        """
+        for tabla in ('urls', 'productos'):
+            if self._db.execute(f"SELECT 1 FROM {tabla} WHERE hash = ? LIMIT 1", (digest,)).fetchone():
+                return
+        fila = self._db.execute("SELECT archivo FROM archivos WHERE hash = ?", (digest,)).fetchone()
+        archivos = [fila[0]] if fila else []
+        archivos += [archivo for (archivo,) in self._db.execute("SELECT archivo FROM variantes WHERE hash = ?",
+                                                                  (digest,))]
+        self._db.execute("DELETE FROM archivos WHERE hash = ?", (digest,))
+        self._db.execute("DELETE FROM variantes WHERE hash = ?", (digest,))
+        if fila:
+            self._archivos.discard(fila[0])
+        for archivo in archivos:
+            try:
+                os.remove(os.path.join(self.carpeta, archivo))
+            except FileNotFoundError:
+                pass
+
+    # --- Variantes (ver variantes_imagenes.py) ---
+
+    def tiene_variantes(self, digest: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM variantes WHERE hash = ? LIMIT 1", (digest,)).fetchone() is not None
+
+    def registrar_variantes(self, digest: str, variantes):
+        """Anota las variantes generadas: (tamaño, formato, archivo, bytes)"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO variantes (hash, tamano, formato, archivo, bytes) VALUES (?, ?, ?, ?, ?)",
+                [(digest, *variante) for variante in variantes]
+            )
+            self._db.commit()
+
+    def variantes_producto(self, link: str) -> Dict[str, Dict[str, str]]:
+        """Rutas de las variantes de la imagen de un producto: {tamaño: {formato: ruta}}"""
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT v.tamano, v.formato, v.archivo FROM productos p JOIN variantes v ON v.hash = p.hash "
+                "WHERE p.clave = ? ORDER BY v.tamano, v.formato",
+                (clave_producto(link),)
+            ).fetchall()
+        variantes = {}
+        for tamano, formato, archivo in filas:
+            variantes.setdefault(tamano, {})[formato] = self._ruta(archivo)
+        return variantes
+
+    def cerrar(self):
+        with self._lock:
+            self._db.close()
+
+
+def obtener_imagen(sesion, almacen: AlmacenImagenes, url_imagen: str,
+                   ttl: float = TTL_IMAGENES) -> Tuple[Optional[str], str]:
+    """
+    Trae una imagen al almacén: no la pide si se revisó hace menos de ttl, la revalida con
+    un GET condicional si ya estaba y la descarga si no. Si la sesión está en modo solo
+    replay nunca accede a la red: usa la imagen del almacén, si hay.
+
+    Returns:
+        (ruta, resultado): resultado es 'omitida', 'revalidada' (304), 'refrescada' (cambió),
+        'nueva', 'duplicada' (contenido que ya estaba en el almacén) o 'ausente' (modo replay
+        sin copia en el almacén); ruta es None si falló o está ausente
+    """
+    entrada = almacen.entrada_url(url_imagen)
+    if entrada and (sesion.solo_replay or time.time() - entrada['revisado'] < ttl):
+        return entrada['ruta'], 'omitida'
+    if sesion.solo_replay:
+        return None, 'ausente'
+    condicionales = {}
+    if entrada and entrada['etag']:
+        condicionales['If-None-Match'] = entrada['etag']
+    if entrada and entrada['last_modified']:
+        condicionales['If-Modified-Since'] = entrada['last_modified']
+    response = sesion.get(url_imagen, headers=condicionales, timeout=10, usar_cache=False, stream=True)
+    try:
+        if response.status_code == 304 and entrada:
+            almacen.renovar(url_imagen, response)
+            return entrada['ruta'], 'revalidada'
+        if response.status_code != 200:
+            raise ValueError(f"HTTP {response.status_code}")
+        ruta, nueva = almacen.guardar(response, url_imagen)
+    finally:
+        response.close()
+    if entrada:
+        return ruta, 'refrescada'
+    return ruta, 'nueva' if nueva else 'duplicada'
+
+
+class DescargadorImagenes:
+    """
+    Pool de descargas de imágenes hacia un AlmacenImagenes. pedir() devuelve un Future con
+    la ruta local (o None si la descarga falló) y se bloquea si hay demasiadas descargas en
+    espera. Las URLs del índice revisadas hace menos de ttl no se piden; las demás se
+    revalidan (ver obtener_imagen). Una misma URL se pide una sola vez por ejecución.
+    """
+
+    def __init__(self, almacen: AlmacenImagenes, sesion=None, hilos: int = HILOS_IMAGENES,
+                 max_pendientes: Optional[int] = None, procesador=None, ttl: float = TTL_IMAGENES):
+        """
+        Args:
+            almacen: AlmacenImagenes donde se guardan las imágenes
+            sesion: SesionHTTP a usar (por defecto la del proceso)
+            hilos: Descargas simultáneas
+            max_pendientes: Imágenes en espera antes de frenar a quien las pide
+                            (por defecto 8 por hilo)
+            procesador: ProcesadorVariantes opcional al que se pasa cada imagen guardada
+                        (ver variantes_imagenes.py)
+            ttl: Segundos durante los que una imagen revisada no se vuelve a consultar
+                 (0 = revalidar todas)
+        """
+        self.almacen = almacen
+        self.procesador = procesador
+        self.ttl = ttl
+        self.sesion = sesion or obtener_sesion()
+        self.estadisticas = {'nuevas': 0, 'duplicadas': 0, 'omitidas': 0, 'revalidadas': 0,
+                             'refrescadas': 0, 'ausentes': 0, 'repetidas': 0, 'errores': 0, 'bytes': 0}
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='imagenes')
+        self._cupos = threading.Semaphore(max_pendientes or hilos * 8)
+        self._lock = threading.Lock()
+        self._pedidas: Dict[str, Future] = {}
+
+    def pedir(self, url_imagen: str, link: Optional[str] = None) -> Future:
+        """
+        Pide la imagen de esa URL (o devuelve la ya pedida o guardada).
+
+        Args:
+            url_imagen: URL de la imagen
+            link: Link del producto; si se indica, el índice anota que esa es su imagen
+        """
+        url_imagen = url_imagen_grande(url_imagen)
+        futuro = self._pedida(url_imagen)
+        if futuro is None:
+            entrada = self.almacen.entrada_url(url_imagen)
+            if entrada and time.time() - entrada['revisado'] < self.ttl:
+                # Revisada hace poco: ni siquiera se revalida
+                if self.procesador:
+                    self.procesador.procesar(entrada['ruta'])
+                futuro = Future()
+                futuro.set_result(entrada['ruta'])
+                with self._lock:
+                    self.estadisticas['omitidas'] += 1
+                    self._pedidas[url_imagen] = futuro
+            else:
+                # El cupo se toma fuera del lock: los hilos de descarga también lo usan al terminar
+                self._cupos.acquire()
+                futuro = self._pedida(url_imagen)
+                if futuro is not None:
+                    self._cupos.release()
+                else:
+                    with self._lock:
+                        futuro = self._pool.submit(self._descargar, url_imagen)
+                        futuro.add_done_callback(lambda _: self._cupos.release())
+                        self._pedidas[url_imagen] = futuro
+        if link:
+            futuro.add_done_callback(lambda f: self._asociar(link, url_imagen, f))
+        return futuro
+
+    def _pedida(self, url_imagen: str) -> Optional[Future]:
+        """Futuro de una URL ya pedida en esta ejecución"""
+        with self._lock:
+            futuro = self._pedidas.get(url_imagen)
+            if futuro is not None:
+                self.estadisticas['repetidas'] += 1
+        return futuro
+
+    def _asociar(self, link: str, url_imagen: str, futuro: Future):
+        if not futuro.cancelled() and futuro.result():
+            self.almacen.asociar(link, url_imagen)
+
+    def _descargar(self, url_imagen: str) -> Optional[str]:
+        try:
+            ruta, resultado = obtener_imagen(self.sesion, self.almacen, url_imagen, self.ttl)
+        except Exception as e:
+            print(f"Error descargando imagen: {e}")
+            with self._lock:
+                self.estadisticas['errores'] += 1
+            return None
+        with self._lock:
+            self.estadisticas[resultado + 's'] += 1
+            if resultado in ('nueva', 'refrescada'):
+                self.estadisticas['bytes'] += os.path.getsize(ruta)
+        if ruta is None:
+            return None
+        if self.procesador:
+            self.procesador.procesar(ruta)
+        return ruta
+
+    def imprimir_estadisticas(self):
+        stats = self.estadisticas
+        print(f"🖼️  Imágenes: {stats['nuevas']} nuevas, {stats['refrescadas']} re-descargadas "
+              f"({stats['bytes'] / 1024:.0f} KB), {stats['revalidadas']} revalidadas (304), "
+              f"{stats['omitidas']} omitidas (revisadas hace poco), {stats['duplicadas']} con contenido repetido, "
+              f"{stats['repetidas']} URLs repetidas, {stats['errores']} errores")
+        if stats['ausentes']:
+            print(f"   {stats['ausentes']} imágenes sin copia en el almacén (modo replay, no se descargaron)")
+        if self.procesador:
+            self.procesador.imprimir_estadisticas()
+
+    def cerrar(self, cancelar: bool = False):
+        """Espera las descargas pendientes (o las descarta si cancelar es True) y sus variantes"""
+        self._pool.shutdown(wait=True, cancel_futures=cancelar)
+        if self.procesador:
+            self.procesador.cerrar()
@@ -11,6 +11,8 @@ from typing import Dict, List, Tuple
 from datetime import datetime
 import time
 
+from catalogo import CatalogoJSONL, RUTA_CATALOGO
+
 # Importar configuración
 try:
     from config_servidor import (
@@ -33,12 +35,15 @@ except ImportError:
 
 
 def cargar_productos(archivo_json: str) -> List[Dict]:
-    """Carga los productos desde el archivo JSON"""
+    """Carga los productos desde el archivo JSON (o desde el catálogo .jsonl, ver catalogo.py)"""
     ruta = Path(archivo_json)
     
     if not ruta.exists():
         raise FileNotFoundError(f"No se encontró el archivo: {archivo_json}")
     
+    if ruta.suffix == '.jsonl':
+        return list(CatalogoJSONL(ruta).productos())
+    
     with open(ruta, 'r', encoding='utf-8') as f:
         productos = json.load(f)
     
@@ -291,8 +296,8 @@ if __name__ == "__main__":
         archivo = sys.argv[1]
         importar_producto_individual(archivo)
     else:
-        # Modo: importar todos los productos
+        # Modo: importar todos los productos (del catálogo del modo incremental si existe)
         importar_productos_a_servidor(
-            archivo_json="datos/json/productos_mercadolibre.json",
+            archivo_json=RUTA_CATALOGO if Path(RUTA_CATALOGO).exists() else "datos/json/productos_mercadolibre.json",
             generar_reporte=True
         )
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limitador de velocidad adaptativo por host para el scraper.
+Cada host tiene un token bucket cuya tasa se ajusta con AIMD:
+- Sube de a poco (suma) mientras las respuestas son sanas y rápidas.
+- Baja a la mitad (multiplica) ante 429/503, errores de red o latencia creciente.
+  La latencia base sigue a la de todas las respuestas sanas, así que si el sitio pasa a ser
+  más lento de forma sostenida la base se ajusta; por latencia se baja a lo más una vez
+  cada PAUSA_REDUCCION_LATENCIA segundos.
+- Respeta el header Retry-After pausando el host el tiempo indicado.
+Reemplaza las pausas fijas (time.sleep) entre páginas y detalles.
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Peticiones por segundo al empezar y límites del ajuste
+TASA_INICIAL = 2.0
+TASA_MINIMA = 0.2
+TASA_MAXIMA = 10.0
+
+# Tasa inicial para hosts que toleran más carga (CDN de imágenes)
+TASA_INICIAL_POR_HOST = {
+    'http2.mlstatic.com': 5.0,
+}
+
+# Ajuste AIMD
+INCREMENTO = 0.25           # peticiones/s que se suman por respuesta sana
+FACTOR_REDUCCION = 0.5      # la tasa se multiplica por esto ante una señal de saturación
+FACTOR_LATENCIA = 3.0       # latencia sobre FACTOR_LATENCIA x la latencia base = saturación
+PAUSA_REDUCCION_LATENCIA = 5.0  # segundos mínimos entre dos reducciones por latencia
+PESO_LATENCIA = 0.2         # peso de cada respuesta en la media móvil de la latencia
+RAFAGA = 2                  # tokens acumulables (peticiones seguidas permitidas)
+
+# Estados HTTP que indican que el sitio pide bajar el ritmo
+ESTADOS_SATURACION = (429, 503)
+
+
+def segundos_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Convierte el header Retry-After (segundos o fecha HTTP) a segundos de espera"""
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        return max(parsedate_to_datetime(valor).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class _EstadoHost:
+    """Token bucket y estadísticas de un host"""
+
+    def __init__(self, tasa: float):
+        self.lock = threading.Lock()
+        self.tasa = tasa
+        self.tokens = 1.0
+        self.ultimo = time.monotonic()
+        self.bloqueado_hasta = 0.0
+        self.latencia_base = None
+        self.ultima_reduccion_latencia = None
+        self.peticiones = 0
+        self.reducciones = 0
+        self.espera_total = 0.0
+
+
+class LimitadorAdaptativo:
+    """
+    Token bucket por host con control AIMD. Es seguro usarlo desde varios hilos.
+
+    Uso:
+        limitador.esperar(url)          # antes de cada petición
+        limitador.registrar(url, ...)   # después, con el resultado
+    """
+
+    def __init__(self, tasa_inicial: float = TASA_INICIAL, tasa_minima: float = TASA_MINIMA,
+                 tasa_maxima: float = TASA_MAXIMA, tasas_por_host: Optional[Dict[str, float]] = None):
+        self.tasa_inicial = tasa_inicial
+        self.tasa_minima = tasa_minima
+        self.tasa_maxima = tasa_maxima
+        self.tasas_por_host = {**TASA_INICIAL_POR_HOST, **(tasas_por_host or {})}
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _estado(self, url: str) -> _EstadoHost:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _EstadoHost(self.tasas_por_host.get(host, self.tasa_inicial))
+            return self._hosts[host]
+
+    def esperar(self, url: str):
+        """Bloquea hasta que el host de la URL tenga un token disponible"""
+        estado = self._estado(url)
+        with estado.lock:
+            ahora = time.monotonic()
+            estado.tokens = min(RAFAGA, estado.tokens + (ahora - estado.ultimo) * estado.tasa)
+            estado.ultimo = ahora
+            # Se reserva el token aunque quede negativo: la deuda se paga esperando
+            estado.tokens -= 1
+            espera = max(-estado.tokens / estado.tasa, estado.bloqueado_hasta - ahora, 0.0)
+            estado.peticiones += 1
+            estado.espera_total += espera
+        if espera > 0:
+            time.sleep(espera)
+
+    def registrar(self, url: str, estado_http: Optional[int], latencia: float,
+                  retry_after: Optional[str] = None):
+        """
+        Ajusta la tasa del host según el resultado de la petición.
+
+        Args:
+            url: URL pedida
+            estado_http: Código HTTP de la respuesta, o None si hubo error de red
+            latencia: Segundos que tardó la respuesta
+            retry_after: Valor del header Retry-After, si vino
+        """
+        estado = self._estado(url)
+        with estado.lock:
+            ahora = time.monotonic()
+            if estado_http is None or estado_http in ESTADOS_SATURACION:
+                self._reducir(estado)
+                pausa = segundos_retry_after(retry_after)
+                if pausa:
+                    estado.bloqueado_hasta = max(estado.bloqueado_hasta, ahora + pausa)
+                return
+
+            if estado_http >= 400:
+                return
+
+            lenta = (estado.latencia_base is not None
+                     and latencia > estado.latencia_base * FACTOR_LATENCIA)
+            # Media móvil de la latencia de todas las respuestas sanas, también las lentas:
+            # si el sitio queda más lento de forma sostenida, la base lo alcanza
+            if estado.latencia_base is None:
+                estado.latencia_base = latencia
+            else:
+                estado.latencia_base += PESO_LATENCIA * (latencia - estado.latencia_base)
+
+            if not lenta:
+                estado.tasa = min(self.tasa_maxima, estado.tasa + INCREMENTO)
+            elif (estado.ultima_reduccion_latencia is None
+                  or ahora - estado.ultima_reduccion_latencia >= PAUSA_REDUCCION_LATENCIA):
+                # Un tramo de respuestas lentas baja la tasa una vez, no hasta el mínimo
+                estado.ultima_reduccion_latencia = ahora
+                self._reducir(estado)
+
+    def _reducir(self, estado: _EstadoHost):
+        """Baja la tasa del host a la mitad (requiere estado.lock)"""
+        estado.tasa = max(self.tasa_minima, estado.tasa * FACTOR_REDUCCION)
+        estado.tokens = min(estado.tokens, 0.0)
+        estado.reducciones += 1
+
+    def estadisticas(self) -> Dict[str, Dict]:
+        """Tasa final, peticiones, reducciones y espera acumulada por host"""
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {
+            host: {
+                'tasa': round(estado.tasa, 2),
+                'peticiones': estado.peticiones,
+                'reducciones': estado.reducciones,
+                'espera_total': round(estado.espera_total, 1),
+            }
+            for host, estado in hosts.items()
+        }
+
+    def imprimir_estadisticas(self):
+        """Muestra el ritmo alcanzado por cada host"""
+        for host, stats in self.estadisticas().items():
+            print(f"⏱️  {host}: {stats['peticiones']} peticiones, {stats['tasa']} pet/s al final, "
+                  f"{stats['reducciones']} reducciones, {stats['espera_total']}s en espera")
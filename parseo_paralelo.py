@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parseo de HTML en varios procesos.
+Parsear con lxml/BeautifulSoup ocupa CPU y, en hilos, compite por el GIL con la red.
+ParseadorHTML recibe los bytes crudos de cada página, los procesa en un pool de procesos
+y devuelve solo los diccionarios pequeños con los datos extraídos.
+
+Con procesos=0 todo se ejecuta en el mismo proceso (útil para depurar con pdb o prints).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Sequence
+
+from extractores import ESTRATEGIAS_ITEMS, detalles_desde_html, obtener_extractor, resumir_listado
+
+
+def _decodificar(contenido: bytes) -> str:
+    """Mismo texto que response.text con encoding utf-8"""
+    return str(contenido, 'utf-8', errors='replace')
+
+
+def _resumir_listado_bytes(contenido: bytes, url_pagina: str, parser: str, estrategias) -> Dict:
+    return resumir_listado(_decodificar(contenido), url_pagina, parser, estrategias)
+
+
+def _detalles_bytes(contenido: bytes) -> Dict:
+    return detalles_desde_html(_decodificar(contenido))
+
+
+def procesos_por_defecto() -> int:
+    """Un proceso por núcleo, dejando uno libre para la red y el hilo principal"""
+    return max((os.cpu_count() or 1) - 1, 1)
+
+
+class ParseadorHTML:
+    """
+    Ejecuta el parseo de listados y páginas de producto en un pool de procesos.
+    Se puede llamar desde varios hilos: cada llamada espera su resultado sin tomar el GIL.
+    Si el pool falla (por ejemplo un proceso muere) sigue parseando en el proceso actual.
+    """
+
+    def __init__(self, procesos: int = 0, parser: str = 'bs4'):
+        """
+        Args:
+            procesos: Procesos de parseo; 0 desactiva el pool y parsea en el proceso actual
+            parser: Extractor de tarjetas del listado ('bs4' o 'lxml')
+        """
+        obtener_extractor(parser)  # valida el nombre antes de crear procesos
+        self.procesos = procesos
+        self.parser = parser
+        self._pool = ProcessPoolExecutor(max_workers=procesos) if procesos > 0 else None
+
+    def _ejecutar(self, funcion, *args):
+        if self._pool is not None:
+            try:
+                return self._pool.submit(funcion, *args).result()
+            except BrokenProcessPool:
+                print("⚠️  El pool de parseo dejó de funcionar; se sigue parseando en este proceso")
+                self._pool = None
+        return funcion(*args)
+
+    def listado(self, contenido: bytes, url_pagina: str,
+                estrategias: Optional[Sequence[str]] = None) -> Dict:
+        """Resumen de una página de listado (ver extractores.resumir_listado)"""
+        return self._ejecutar(_resumir_listado_bytes, contenido, url_pagina, self.parser,
+                              tuple(estrategias or ESTRATEGIAS_ITEMS))
+
+    def detalle(self, contenido: bytes) -> Dict:
+        """Detalles de una página de producto (ver extractores.detalles_desde_html)"""
+        return self._ejecutar(_detalles_bytes, contenido)
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
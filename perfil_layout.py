@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfil de layout aprendido para los listados de Mercado Libre.
+Recuerda qué estrategia de búsqueda de tarjetas (ver extractores.ESTRATEGIAS_ITEMS)
+funcionó para cada tienda y dominio, y la prueba primero en las siguientes páginas
+y ejecuciones. Solo si deja de encontrar productos se vuelve a la cascada completa.
+
+El perfil se guarda en datos/perfil_layout.json con contadores de aciertos y fallos
+por estrategia, para notar enseguida cuando Mercado Libre cambia el layout. Al guardar se
+vuelve a leer el archivo (con un bloqueo) y se le suma lo de esta ejecución, así varios
+trabajadores (distribuido.py) pueden guardar el mismo perfil sin pisarse.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from extractores import ESTRATEGIAS_ITEMS
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+RUTA_PERFIL = 'datos/perfil_layout.json'
+
+
+def clave_tienda(url: str) -> str:
+    """Clave de la tienda: host + ruta del listado sin el offset de paginación"""
+    partes = urlparse(url)
+    ruta = re.sub(r'_Desde_\d+.*$', '', partes.path).rstrip('/')
+    return f"{partes.netloc}{ruta}"
+
+
+class PerfilLayout:
+    """
+    Estrategia ganadora por tienda (y por dominio, para tiendas nuevas) con
+    contadores de aciertos/fallos por estrategia. Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, ruta: Optional[str] = RUTA_PERFIL):
+        """
+        Args:
+            ruta: Archivo JSON donde se persiste el perfil (None = solo en memoria)
+        """
+        self.ruta = Path(ruta) if ruta else None
+        self._lock = threading.Lock()
+        self._perfiles = self._cargar()
+        # Contadores de esta ejecución: estrategia -> {'aciertos', 'fallos'}
+        self.estadisticas = {}
+        # Cambios aún no guardados: contadores por tienda y estrategias ganadoras
+        self._sin_guardar = {'tiendas': {}, 'dominios': {}}
+        self.cambios_layout = 0
+
+    def _cargar(self) -> Dict:
+        perfiles = {'tiendas': {}, 'dominios': {}}
+        if self.ruta is None or not self.ruta.exists():
+            return perfiles
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                perfiles.update(json.load(f))
+        except (OSError, ValueError):
+            print(f"⚠️  No se pudo leer {self.ruta}, se empieza con un perfil vacío")
+        return perfiles
+
+    def preferida(self, url: str) -> Optional[str]:
+        """Estrategia aprendida para la tienda de la URL (o su dominio), si hay"""
+        with self._lock:
+            tienda = self._perfiles['tiendas'].get(clave_tienda(url)) or {}
+            dominio = self._perfiles['dominios'].get(urlparse(url).netloc)
+        for estrategia in (tienda.get('estrategia'), dominio):
+            if estrategia in ESTRATEGIAS_ITEMS:
+                return estrategia
+        return None
+
+    def orden(self, url: str) -> List[str]:
+        """Estrategias en el orden en que conviene probarlas para la URL"""
+        primera = self.preferida(url)
+        if primera is None:
+            return list(ESTRATEGIAS_ITEMS)
+        return [primera] + [e for e in ESTRATEGIAS_ITEMS if e != primera]
+
+    def _contar(self, clave: str, estrategia: str, campo: str):
+        """Suma al contador de la ejecución y al persistido (requiere el lock)"""
+        self.estadisticas.setdefault(estrategia, {'aciertos': 0, 'fallos': 0})[campo] += 1
+        for perfiles in (self._perfiles, self._sin_guardar):
+            perfil = perfiles['tiendas'].setdefault(clave, {'estrategia': None, 'estrategias': {}})
+            perfil['estrategias'].setdefault(estrategia, {'aciertos': 0, 'fallos': 0})[campo] += 1
+
+    def registrar(self, url: str, estrategia: Optional[str], fallidas: List[str]):
+        """
+        Anota el resultado de una página.
+
+        Args:
+            url: URL de la página del listado
+            estrategia: Estrategia que encontró productos (None si ninguna)
+            fallidas: Estrategias que se probaron antes sin encontrar nada
+        """
+        clave = clave_tienda(url)
+        with self._lock:
+            anterior = (self._perfiles['tiendas'].get(clave) or {}).get('estrategia')
+            for nombre in fallidas:
+                self._contar(clave, nombre, 'fallos')
+            if estrategia is None:
+                return
+            self._contar(clave, estrategia, 'aciertos')
+            if anterior and anterior != estrategia:
+                self.cambios_layout += 1
+                print(f"⚠️  Cambio de layout en {clave}: '{anterior}' ya no encuentra productos, "
+                      f"ahora funciona '{estrategia}'")
+            actualizado = time.strftime('%Y-%m-%d %H:%M:%S')
+            for perfiles in (self._perfiles, self._sin_guardar):
+                perfiles['tiendas'][clave].update(estrategia=estrategia, actualizado=actualizado)
+                # Las tiendas nuevas del mismo dominio empiezan con la última estrategia que funcionó
+                perfiles['dominios'][urlparse(url).netloc] = estrategia
+
+    def _combinar(self, perfiles: Dict) -> Dict:
+        """Suma los cambios sin guardar al perfil leído del disco (requiere el lock)"""
+        for clave, cambios in self._sin_guardar['tiendas'].items():
+            perfil = perfiles['tiendas'].setdefault(clave, {'estrategia': None, 'estrategias': {}})
+            for estrategia, contadores in cambios['estrategias'].items():
+                guardados = perfil.setdefault('estrategias', {}).setdefault(estrategia, {'aciertos': 0, 'fallos': 0})
+                for campo, cantidad in contadores.items():
+                    guardados[campo] = guardados.get(campo, 0) + cantidad
+            if cambios['estrategia']:
+                perfil['estrategia'] = cambios['estrategia']
+                perfil['actualizado'] = cambios['actualizado']
+        perfiles['dominios'].update(self._sin_guardar['dominios'])
+        return perfiles
+
+    def guardar(self):
+        """
+        Suma lo de esta ejecución al perfil en disco y lo escribe (reemplazo atómico).
+        Mientras tanto se bloquea el archivo .lock, para que otro proceso no guarde a la vez.
+        """
+        if self.ruta is None:
+            return
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.ruta.with_name(f"{self.ruta.name}.lock"), 'w') as bloqueo:
+            if fcntl is not None:
+                fcntl.flock(bloqueo, fcntl.LOCK_EX)
+            perfiles = self._combinar(self._cargar())
+            self._escribir(json.dumps(perfiles, ensure_ascii=False, indent=2))
+            self._perfiles = perfiles
+            self._sin_guardar = {'tiendas': {}, 'dominios': {}}
+
+    def _escribir(self, datos: str):
+        """Reemplaza el archivo del perfil por datos"""
+        # Temporal único: varios hilos o trabajadores (distribuido.py) pueden guardar a la vez
+        descriptor, temporal = tempfile.mkstemp(dir=self.ruta.parent, prefix=f'.{self.ruta.name}-')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                f.write(datos)
+            os.chmod(temporal, 0o644)
+            os.replace(temporal, self.ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def imprimir_estadisticas(self):
+        """Muestra aciertos y fallos por estrategia en esta ejecución"""
+        if not self.estadisticas:
+            return
+        resumen = ', '.join(
+            f"{nombre} {stats['aciertos']}✓/{stats['fallos']}✗"
+            for nombre, stats in self.estadisticas.items()
+        )
+        print(f"🧭 Estrategias de listado: {resumen}")
+        if self.cambios_layout:
+            print(f"⚠️  {self.cambios_layout} cambios de layout detectados (revisar selectores)")
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador para scrapear varias tiendas de Mercado Libre en una sola ejecución.
+
+Las tiendas se recorren a la vez (TIENDAS_CONCURRENTES hilos) compartiendo la sesión HTTP,
+así el límite de ritmo por host (limitador.py) y el máximo de peticiones simultáneas por host
+valen para todas juntas y no por tienda. También comparten el pool de parseo, el almacén de
+imágenes y el perfil de layout.
+
+El orden sale de una cola de prioridad: primero las tiendas nunca scrapeadas, después las que
+tuvieron más cambios en su último scraping y, entre iguales, las que llevan más tiempo sin
+revisarse. El historial se guarda en datos/historial_tiendas.json.
+
+Cada tienda escribe sus propios archivos en datos/tiendas/<tienda>.<formato>.
+
+Uso:
+    python planificador.py URL_TIENDA_1 URL_TIENDA_2 ...
+    python planificador.py --archivo tiendas.txt --formatos csv,jsonl
+"""
+
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cache_http import CacheHTTP
+from checkpoint import CheckpointCrawl
+from huellas import HuellasProductos
+from imagenes import CARPETA_IMAGENES, HILOS_IMAGENES, TTL_IMAGENES, AlmacenImagenes, DescargadorImagenes
+from parseo_paralelo import ParseadorHTML, procesos_por_defecto
+from perfil_layout import PerfilLayout, clave_tienda
+from salidas import FORMATOS_POR_DEFECTO, SALIDAS
+from scraper_mercadolibre_v2 import (URL_TIENDA_POR_DEFECTO, LimiteConcurrenciaPorHost, guardar_resultados,
+                                     iter_productos)
+from sesion_http import SesionHTTP
+from variantes_imagenes import ProcesadorVariantes, formatos_disponibles
+
+RUTA_HISTORIAL = 'datos/historial_tiendas.json'
+CARPETA_TIENDAS = 'datos/tiendas'
+
+# Tiendas que se scrapean a la vez
+TIENDAS_CONCURRENTES = 3
+
+
+def cargar_tiendas(archivo: str) -> List[str]:
+    """
+    Lee las URLs de las tiendas de un archivo de texto (una por línea).
+    Se ignoran las líneas vacías y las que empiezan con #.
+    """
+    with open(archivo, 'r', encoding='utf-8') as f:
+        lineas = (linea.strip() for linea in f)
+        return [linea for linea in lineas if linea and not linea.startswith('#')]
+
+
+def nombre_tienda(url: str) -> str:
+    """Nombre de archivo de la tienda, a partir de su clave (host + ruta del listado)"""
+    return re.sub(r'[^\w.-]+', '_', clave_tienda(url)).strip('_')
+
+
+class HistorialTiendas:
+    """
+    Resultado del último scraping de cada tienda, para decidir el orden del siguiente.
+    Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, ruta: str = RUTA_HISTORIAL):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._tiendas = {}
+        if os.path.exists(ruta):
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    self._tiendas = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️  No se pudo leer {ruta}, se empieza con un historial vacío")
+
+    def prioridad(self, url: str) -> Tuple:
+        """
+        Clave de orden de la tienda (menor = antes): nunca scrapeada, proporción de productos
+        nuevos o con cambios en el último scraping y antigüedad de ese scraping.
+        """
+        with self._lock:
+            tienda = self._tiendas.get(clave_tienda(url))
+        if not tienda:
+            return (0, 0.0, 0.0)
+        cambios = tienda.get('cambios')
+        proporcion = cambios / tienda['productos'] if cambios is not None and tienda.get('productos') else 0.0
+        return (1, -proporcion, tienda.get('terminado', 0.0))
+
+    def registrar(self, url: str, productos: int, cambios: Optional[int], duracion: float):
+        """Anota un scraping terminado y guarda el historial"""
+        with self._lock:
+            anterior = self._tiendas.get(clave_tienda(url), {})
+            self._tiendas[clave_tienda(url)] = {
+                'url': url,
+                'terminado': time.time(),
+                'productos': productos,
+                # Sin datos de cambios (p. ej. --refrescar-detalles) se conserva el anterior
+                'cambios': anterior.get('cambios') if cambios is None else cambios,
+                'duracion': round(duracion, 1),
+            }
+            os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._tiendas, f, ensure_ascii=False, indent=2)
+            os.replace(temporal, self.ruta)
+
+
+class PlanificadorTiendas:
+    """
+    Scrapea una lista de tiendas a la vez con recursos compartidos (ver docstring del módulo).
+    Si una tienda falla se avisa y las demás siguen.
+    """
+
+    def __init__(self, urls: Sequence[str], tiendas_concurrentes: int = TIENDAS_CONCURRENTES,
+                 carpeta_salida: str = CARPETA_TIENDAS, formatos: Sequence[str] = FORMATOS_POR_DEFECTO,
+                 sesion: Optional[SesionHTTP] = None, historial: Optional[HistorialTiendas] = None,
+                 reanudar: bool = False, refrescar_detalles: bool = False, **opciones):
+        """
+        Args:
+            urls: URLs de los listados de las tiendas (las repetidas se scrapean una vez)
+            tiendas_concurrentes: Tiendas que se scrapean a la vez
+            carpeta_salida: Carpeta con los archivos de cada tienda
+            formatos: Formatos de salida (ver salidas.py)
+            sesion: SesionHTTP compartida por todas las tiendas (por defecto una nueva)
+            historial: HistorialTiendas con el que se ordenan (por defecto datos/historial_tiendas.json)
+            reanudar: Continuar el scraping interrumpido de cada tienda (ver checkpoint.py)
+            refrescar_detalles: Visitar todas las páginas de producto (ver huellas.py)
+            **opciones: Argumentos de iter_productos: detalles_concurrentes, max_por_host,
+                max_paginas, parser, procesos_parseo, modo_detalle, hilos_imagenes,
+                variantes_imagenes, ttl_imagenes, ...
+        """
+        self.urls = list(dict.fromkeys(urls))
+        self.tiendas_concurrentes = max(1, tiendas_concurrentes)
+        self.carpeta_salida = carpeta_salida
+        self.formatos = list(formatos)
+        self.sesion = sesion or SesionHTTP()
+        self.historial = historial or HistorialTiendas()
+        self.reanudar = reanudar
+        self.refrescar_detalles = refrescar_detalles
+        self.opciones = opciones
+        # Resultado por tienda: productos, cambios, segundos y error
+        self.resultados = {}
+        self._cola = []
+        self._lock = threading.Lock()
+
+    def _siguiente(self) -> Optional[str]:
+        with self._lock:
+            return heapq.heappop(self._cola)[-1] if self._cola else None
+
+    def _trabajador(self, argumentos: Dict):
+        while True:
+            url = self._siguiente()
+            if url is None:
+                return
+            self._scrapear_tienda(url, argumentos)
+
+    def _scrapear_tienda(self, url: str, argumentos: Dict):
+        nombre = nombre_tienda(url)
+        print(f"\n🏪 Empezando tienda {nombre}")
+        inicio = time.time()
+        checkpoint = CheckpointCrawl(url, reanudar=self.reanudar)
+        # Una conexión por tienda, para contar sus cambios por separado
+        huellas = HuellasProductos(reutilizar=not self.refrescar_detalles)
+        resultado = {'productos': 0, 'cambios': None, 'segundos': 0.0, 'error': None}
+        try:
+            productos = iter_productos(url, sesion=self.sesion, checkpoint=checkpoint, huellas=huellas,
+                                       **argumentos)
+            resultado['productos'] = guardar_resultados(
+                productos, nombre_archivo=os.path.join(self.carpeta_salida, nombre), formatos=self.formatos)
+            stats = huellas.estadisticas
+            if any(stats.values()):
+                resultado['cambios'] = stats['nuevos'] + stats['cambiados']
+            resultado['segundos'] = time.time() - inicio
+            self.historial.registrar(url, resultado['productos'], resultado['cambios'], resultado['segundos'])
+        except Exception as e:
+            resultado['error'] = e
+            resultado['segundos'] = time.time() - inicio
+            print(f"\n❌ Error scrapeando {nombre}: {e}")
+        finally:
+            huellas.cerrar()
+            checkpoint.cerrar()
+            with self._lock:
+                self.resultados[url] = resultado
+        print(f"\n🏁 Tienda {nombre}: {resultado['productos']} productos en {resultado['segundos']:.0f}s")
+
+    def ejecutar(self) -> Dict[str, Dict]:
+        """
+        Scrapea todas las tiendas y muestra el resumen conjunto.
+
+        Returns:
+            Resultado por URL: productos, cambios, segundos y error (None si terminó bien)
+        """
+        os.makedirs(self.carpeta_salida, exist_ok=True)
+        self._cola = [(self.historial.prioridad(url), orden, url) for orden, url in enumerate(self.urls)]
+        heapq.heapify(self._cola)
+        print(f"📋 {len(self.urls)} tiendas, {min(self.tiendas_concurrentes, len(self.urls))} a la vez")
+
+        opciones = dict(self.opciones)
+        almacen = AlmacenImagenes(opciones.pop('carpeta_imagenes', CARPETA_IMAGENES))
+        procesador = ProcesadorVariantes(almacen) if opciones.pop('variantes_imagenes', False) else None
+        descargador = DescargadorImagenes(almacen, self.sesion, opciones.pop('hilos_imagenes', HILOS_IMAGENES),
+                                          procesador=procesador, ttl=opciones.pop('ttl_imagenes', TTL_IMAGENES))
+        parseador = ParseadorHTML(opciones.pop('procesos_parseo', 0), opciones.pop('parser', 'bs4'))
+        limite_hosts = LimiteConcurrenciaPorHost(opciones.pop('max_por_host', 4))
+        # Un solo perfil para todas las tiendas; se guarda una vez, al terminar todas
+        perfil_layout = PerfilLayout()
+        # Lo que comparten todas las tiendas, más las demás opciones de iter_productos
+        # (las del planificador ya se sacaron de opciones)
+        argumentos = {
+            **opciones,
+            'parseador': parseador,
+            'perfil_layout': perfil_layout,
+            'descargador_imagenes': descargador,
+            'limite_hosts': limite_hosts,
+        }
+        inicio = time.time()
+        hilos = [threading.Thread(target=self._trabajador, args=(argumentos,), name=f'tienda-{numero}', daemon=True)
+                 for numero in range(min(self.tiendas_concurrentes, len(self.urls)))]
+        try:
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            descargador.cerrar()
+        finally:
+            descargador.cerrar(cancelar=True)
+            almacen.cerrar()
+            parseador.cerrar()
+            perfil_layout.guardar()
+        perfil_layout.imprimir_estadisticas()
+        self.imprimir_resumen(time.time() - inicio)
+        return self.resultados
+
+    def imprimir_resumen(self, segundos: float):
+        total = sum(resultado['productos'] for resultado in self.resultados.values())
+        print(f"\n{'='*60}")
+        print("RESUMEN DE TIENDAS")
+        print(f"{'='*60}")
+        for url in self.urls:
+            resultado = self.resultados.get(url)
+            if resultado is None:
+                print(f"⏭️  {nombre_tienda(url)}: no se alcanzó a scrapear")
+            elif resultado['error'] is not None:
+                print(f"❌ {nombre_tienda(url)}: {resultado['error']}")
+            else:
+                cambios = '' if resultado['cambios'] is None else f", {resultado['cambios']} nuevos o con cambios"
+                print(f"✅ {nombre_tienda(url)}: {resultado['productos']} productos{cambios} "
+                      f"({resultado['segundos']:.0f}s)")
+        print(f"📦 Total: {total} productos en {segundos:.0f}s "
+              f"({total / segundos if segundos else 0:.1f} productos/s)")
+        self.sesion.imprimir_estadisticas()
+        print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Scrapea varias tiendas de Mercado Libre a la vez')
+    parser.add_argument('urls', nargs='*', help='URLs de los listados de las tiendas')
+    parser.add_argument('--archivo', help='Archivo de texto con una URL de tienda por línea')
+    parser.add_argument('--tiendas', type=int, default=TIENDAS_CONCURRENTES,
+                        help=f'Tiendas que se scrapean a la vez (por defecto {TIENDAS_CONCURRENTES})')
+    parser.add_argument('--salida', default=CARPETA_TIENDAS,
+                        help=f'Carpeta de los archivos de cada tienda (por defecto {CARPETA_TIENDAS})')
+    parser.add_argument('--formatos', default=','.join(FORMATOS_POR_DEFECTO),
+                        help=f"Formatos de salida separados por coma ({', '.join(SALIDAS)})")
+    parser.add_argument('--detalles', type=int, default=4,
+                        help='Páginas de producto que se descargan en paralelo por tienda')
+    parser.add_argument('--max-por-host', type=int, default=4,
+                        help='Máximo de páginas de producto simultáneas por host, entre todas las tiendas')
+    parser.add_argument('--parser', choices=['bs4', 'lxml'], default='bs4',
+                        help='Extractor de tarjetas del listado (lxml es más rápido)')
+    parser.add_argument('--procesos', type=int, nargs='?', const=procesos_por_defecto(), default=0,
+                        help='Parsear el HTML en N procesos (sin N: uno por núcleo menos uno; 0 = desactivado)')
+    parser.add_argument('--sin-cache', action='store_true',
+                        help='No usar el cache de respuestas en datos/cache_http/')
+    parser.add_argument('--refrescar-detalles', action='store_true',
+                        help='Visitar todas las páginas de producto aunque su tarjeta no haya cambiado')
+    parser.add_argument('--variantes', action='store_true',
+                        help='Generar miniaturas y versiones WebP/AVIF de las imágenes (requiere Pillow)')
+    parser.add_argument('--reanudar', action='store_true',
+                        help='Continuar los scrapings interrumpidos (datos/checkpoint.sqlite)')
+    args = parser.parse_args()
+    urls = list(args.urls)
+    if args.archivo:
+        urls += cargar_tiendas(args.archivo)
+    urls = urls or [URL_TIENDA_POR_DEFECTO]
+    formatos = [f.strip() for f in args.formatos.split(',') if f.strip()]
+    if not formatos or any(f not in SALIDAS for f in formatos):
+        parser.error(f"formatos no válidos: {args.formatos} (opciones: {', '.join(SALIDAS)})")
+    if args.variantes and not formatos_disponibles():
+        parser.error("--variantes requiere Pillow con soporte WebP o AVIF (pip install Pillow)")
+
+    print("\n" + "="*60)
+    print(" SCRAPER DE MERCADO LIBRE - VARIAS TIENDAS")
+    print("="*60)
+    sesion = SesionHTTP(cache=None if args.sin_cache else CacheHTTP())
+    planificador = PlanificadorTiendas(urls, tiendas_concurrentes=args.tiendas, carpeta_salida=args.salida,
+                                       formatos=formatos, sesion=sesion, reanudar=args.reanudar,
+                                       refrescar_detalles=args.refrescar_detalles,
+                                       detalles_concurrentes=args.detalles, max_por_host=args.max_por_host,
+                                       parser=args.parser, procesos_parseo=args.procesos,
+                                       variantes_imagenes=args.variantes)
+    try:
+        resultados = planificador.ejecutar()
+    except KeyboardInterrupt:
+        print("\n\n⏸️  Scraping interrumpido. Lo avanzado quedó en el checkpoint;")
+        print("   ejecuta de nuevo con --reanudar para continuar desde ahí.")
+        raise SystemExit(1)
+    raise SystemExit(1 if any(r['error'] is not None for r in resultados.values()) else 0)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serialización y escritura de los JSON de conversor_a_json.py.
+
+a_json() usa orjson si está instalado (opcional, pip install orjson) y si no el módulo json;
+el texto es el mismo con los dos, con indent=2 o compacto. orjson escribe distinto algunos
+float (1e-07 como 1e-7, 1e+16 como 1e16, NaN e Infinity como null), así que los objetos
+que los tienen los escribe siempre json.
+
+Los JSON individuales de cada producto se pueden escribir:
+  - plano: un archivo por producto en la carpeta de salida (como siempre)
+  - carpetas: un archivo por producto repartido en subcarpetas (productos/<2 letras>/),
+    para no juntar decenas de miles de archivos en una sola carpeta
+  - paquete: todos en un solo archivo (productos.paquete) con un índice de posiciones
+    (productos.paquete.indice, una línea JSON por producto) para leer cualquiera sin recorrerlo
+"""
+
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+MODOS_INDIVIDUALES = ('plano', 'carpetas', 'paquete')
+
+# Subcarpeta de los individuales en modo carpetas
+CARPETA_INDIVIDUALES = 'productos'
+
+# Archivo del modo paquete (el índice es el mismo nombre con .indice)
+NOMBRE_PAQUETE = 'productos.paquete'
+
+
+def _floats_sin_exponente(objeto: Any) -> bool:
+    """True si todos los float del objeto son finitos y json los escribe sin exponente (igual que orjson)"""
+    if isinstance(objeto, float):
+        return math.isfinite(objeto) and (objeto == 0 or 1e-4 <= abs(objeto) < 1e16)
+    if isinstance(objeto, dict):
+        return all(_floats_sin_exponente(valor) for valor in objeto.values())
+    if isinstance(objeto, (list, tuple)):
+        return all(_floats_sin_exponente(valor) for valor in objeto)
+    return True
+
+
+def a_json(objeto: Any, compacto: bool = False) -> str:
+    """
+    JSON del objeto, igual que json.dumps(objeto, ensure_ascii=False, indent=2)
+    o, con compacto, que json.dumps(objeto, ensure_ascii=False, separators=(',', ':')).
+    """
+    if orjson is not None and _floats_sin_exponente(objeto):
+        try:
+            return orjson.dumps(objeto, option=0 if compacto else orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            pass  # Algo que orjson no admite (p. ej. enteros muy grandes): lo hace json
+    if compacto:
+        return json.dumps(objeto, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(objeto, ensure_ascii=False, indent=2)
+
+
+def subcarpeta(nombre_archivo: str) -> str:
+    """Subcarpeta del modo carpetas: 256 posibles, repartidas por el hash del nombre"""
+    return hashlib.sha1(nombre_archivo.encode('utf-8')).hexdigest()[:2]
+
+
+class PaqueteJSON:
+    """
+    Documentos JSON uno tras otro en un solo archivo, con un índice nombre → (inicio, bytes).
+    Solo se agregan datos: un documento repetido reemplaza al anterior en el índice.
+    """
+
+    def __init__(self, ruta: str, nuevo: bool = False):
+        """
+        Args:
+            ruta: Archivo del paquete (el índice es ruta + '.indice')
+            nuevo: Si True, empieza el paquete de cero
+        """
+        self.ruta = Path(ruta)
+        self.ruta_indice = Path(f"{ruta}.indice")
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        modo = 'wb' if nuevo else 'ab'
+        self._datos = open(self.ruta, modo)
+        self._indice = open(self.ruta_indice, modo)
+        if self._indice.tell():
+            # Si una interrupción dejó cortada la última entrada, la siguiente va en otra línea
+            with open(self.ruta_indice, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self._indice.write(b'\n')
+
+    def agregar(self, nombre: str, texto: str):
+        contenido = texto.encode('utf-8')
+        inicio = self._datos.tell()
+        self._datos.write(contenido + b'\n')
+        # El índice se escribe después del documento: nunca apunta a datos que no están
+        entrada = {'archivo': nombre, 'inicio': inicio, 'bytes': len(contenido)}
+        self._indice.write(a_json(entrada, compacto=True).encode('utf-8') + b'\n')
+
+    def eliminar(self, nombre: str):
+        self._indice.write(a_json({'archivo': nombre, 'eliminado': True}, compacto=True).encode('utf-8') + b'\n')
+
+    def cerrar(self):
+        for archivo in (self._datos, self._indice):
+            archivo.flush()
+            os.fsync(archivo.fileno())
+            archivo.close()
+
+
+def leer_indice(ruta: str) -> Dict[str, Tuple[int, int]]:
+    """Índice de un paquete: nombre → (inicio, bytes), con la última versión de cada uno"""
+    indice = {}
+    ruta_indice = Path(f"{ruta}.indice")
+    if not ruta_indice.exists():
+        return indice
+    with open(ruta_indice, 'r', encoding='utf-8') as f:
+        for linea in f:
+            try:
+                entrada = json.loads(linea)
+            except json.JSONDecodeError:
+                continue  # Una última línea cortada
+            if entrada.get('eliminado'):
+                indice.pop(entrada['archivo'], None)
+            else:
+                indice[entrada['archivo']] = (entrada['inicio'], entrada['bytes'])
+    return indice
+
+
+def leer_paquete(ruta: str, nombres: Optional[List[str]] = None) -> Iterator[Tuple[str, str]]:
+    """(nombre, JSON) de los documentos del paquete (o solo de los nombres dados)"""
+    indice = leer_indice(ruta)
+    with open(ruta, 'rb') as f:
+        for nombre in (nombres if nombres is not None else list(indice)):
+            inicio, cantidad = indice[nombre]
+            f.seek(inicio)
+            yield nombre, f.read(cantidad).decode('utf-8')
+
+
+class EscritorIndividuales:
+    """Escribe el JSON individual de cada producto según el modo (ver MODOS_INDIVIDUALES)"""
+
+    def __init__(self, carpeta: str, modo: str = 'plano', nuevo: bool = False):
+        """
+        Args:
+            carpeta: Carpeta de salida de los JSON
+            modo: 'plano', 'carpetas' o 'paquete'
+            nuevo: En modo paquete, si True empieza el paquete de cero (conversión completa)
+        """
+        if modo not in MODOS_INDIVIDUALES:
+            raise ValueError(f"Modo de JSON individuales desconocido: {modo} "
+                             f"(opciones: {', '.join(MODOS_INDIVIDUALES)})")
+        self.carpeta = Path(carpeta)
+        self.modo = modo
+        self._creadas = set()
+        self._paquete = PaqueteJSON(str(self.carpeta / NOMBRE_PAQUETE), nuevo) if modo == 'paquete' else None
+
+    def ruta(self, nombre_archivo: str) -> Path:
+        """Ruta del archivo de un producto (modos plano y carpetas)"""
+        if self.modo == 'carpetas':
+            return self.carpeta / CARPETA_INDIVIDUALES / subcarpeta(nombre_archivo) / nombre_archivo
+        return self.carpeta / nombre_archivo
+
+    def escribir(self, nombre_archivo: str, texto: str):
+        if self._paquete is not None:
+            self._paquete.agregar(nombre_archivo, texto)
+            return
+        ruta = self.ruta(nombre_archivo)
+        if ruta.parent not in self._creadas:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            self._creadas.add(ruta.parent)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(texto)
+
+    def eliminar(self, nombre_archivo: str):
+        """Quita el JSON de un producto (p. ej. el de antes de un cambio de slug)"""
+        if self._paquete is not None:
+            self._paquete.eliminar(nombre_archivo)
+            return
+        ruta = self.ruta(nombre_archivo)
+        if ruta.exists():
+            ruta.unlink()
+
+    def cerrar(self):
+        if self._paquete is not None:
+            self._paquete.cerrar()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lee o extrae los JSON de un paquete de productos")
+    parser.add_argument('paquete', nargs='?', default=f"datos/json/{NOMBRE_PAQUETE}",
+                        help=f"Archivo del paquete (por defecto datos/json/{NOMBRE_PAQUETE})")
+    parser.add_argument('--extraer', metavar='CARPETA', help="Escribe cada producto como archivo en CARPETA")
+    parser.add_argument('--leer', metavar='ARCHIVO', help="Muestra el JSON de un producto")
+    args = parser.parse_args()
+
+    if args.leer:
+        for _, texto in leer_paquete(args.paquete, [args.leer]):
+            print(texto)
+    elif args.extraer:
+        escritor = EscritorIndividuales(args.extraer)
+        cantidad = 0
+        for nombre, texto in leer_paquete(args.paquete):
+            escritor.escribir(nombre, texto)
+            cantidad += 1
+        print(f"📦 {cantidad} productos extraídos en {args.extraer}")
+    else:
+        indice = leer_indice(args.paquete)
+        print(f"📦 {args.paquete}: {len(indice)} productos")
+        for nombre in list(indice)[:10]:
+            print(f"   • {nombre}")
+        if len(indice) > 10:
+            print(f"   ... y {len(indice) - 10} más")
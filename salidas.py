@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Salidas de los productos scrapeados (CSV, JSONL, Excel, Parquet) escritas a medida que llegan.
+
+Cada formato es una Salida con abrir/escribir/cerrar. EscritorSalidas recibe los
+productos uno a uno y los escribe en un hilo aparte, con una cola acotada: el scraping
+no espera al disco y nunca hace falta tener todo el catálogo en memoria.
+
+Uso:
+    with EscritorSalidas(crear_salidas('productos', ['csv', 'jsonl'])) as escritor:
+        for producto in iter_productos(url):
+            escritor.agregar(producto)
+"""
+
+import csv
+import json
+import queue
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional
+    pa = None
+
+# Productos que pueden esperar en la cola antes de frenar al scraper
+MAX_PENDIENTES = 1000
+
+# Formatos que se generan si no se indica otra cosa
+FORMATOS_POR_DEFECTO = ('xlsx', 'csv')
+
+# Columnas de características ("clave: valor | clave: valor")
+COLUMNAS_CARACTERISTICAS = ('Caracteristicas_Principales', 'Caracteristicas_Ventas', 'Otras_Caracteristicas')
+
+# Filas por grupo del archivo Parquet (se escriben a medida que se completan)
+FILAS_POR_GRUPO = 5000
+
+# Centavos al final de un precio ("12990.50")
+RE_CENTAVOS = re.compile(r'\.(\d{1,2})$')
+
+
+def precio_numerico(precio) -> Optional[float]:
+    """
+    Precio como número, conservando los centavos. El scraper los escribe como "12990.50"
+    (ver extractores.py): un punto seguido de 1 o 2 dígitos al final es decimal; los demás
+    puntos son de miles y la coma es decimal.
+
+    Returns:
+        El precio, o None si el texto no tiene un número
+    """
+    if isinstance(precio, (int, float)):
+        return float(precio)
+    texto = str(precio or '').strip()
+    centavos = RE_CENTAVOS.search(texto)
+    if centavos:
+        limpio = re.sub(r'[^\d]', '', texto[:centavos.start()]) + '.' + centavos.group(1)
+    else:
+        limpio = re.sub(r'[^\d,]', '', texto).replace(',', '.')
+    try:
+        return float(limpio)
+    except ValueError:
+        return None
+
+
+def caracteristicas_a_pares(texto) -> List[Tuple[str, str]]:
+    """Convierte "clave: valor | clave: valor" (ver aplicar_detalles) en pares (clave, valor)"""
+    if isinstance(texto, dict):
+        return [(str(k), str(v)) for k, v in texto.items()]
+    pares = []
+    for parte in str(texto or '').split(' | '):
+        clave, separador, valor = parte.partition(': ')
+        if clave and separador:
+            pares.append((clave, valor))
+    return pares
+
+
+def pares_a_caracteristicas(pares) -> str:
+    """Inverso de caracteristicas_a_pares"""
+    return ' | '.join(f"{clave}: {valor}" for clave, valor in (pares if pares is not None else []))
+
+
+class Salida:
+    """Destino de los productos. Las columnas se toman del primer producto."""
+
+    extension = ''
+    descripcion = ''
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.columnas = None
+        self.filas = 0
+
+    def abrir(self, columnas: List[str]):
+        self.columnas = columnas
+
+    def escribir(self, producto: Dict):
+        raise NotImplementedError
+
+    def cerrar(self):
+        pass
+
+
+class SalidaCSV(Salida):
+    """CSV con BOM (utf-8-sig), igual al que generaba pandas.to_csv"""
+
+    extension = 'csv'
+    descripcion = 'CSV'
+
+    def abrir(self, columnas):
+        super().abrir(columnas)
+        self._archivo = open(self.ruta, 'w', encoding='utf-8-sig', newline='')
+        self._csv = csv.DictWriter(self._archivo, fieldnames=columnas, lineterminator='\n',
+                                   extrasaction='ignore')
+        self._csv.writeheader()
+
+    def escribir(self, producto):
+        self._csv.writerow(producto)
+        self.filas += 1
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class SalidaJSONL(Salida):
+    """Un objeto JSON por línea"""
+
+    extension = 'jsonl'
+    descripcion = 'JSONL'
+
+    def abrir(self, columnas):
+        super().abrir(columnas)
+        self._archivo = open(self.ruta, 'w', encoding='utf-8')
+
+    def escribir(self, producto):
+        self._archivo.write(json.dumps(producto, ensure_ascii=False) + '\n')
+        self.filas += 1
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class SalidaXLSX(Salida):
+    """Excel en modo write_only de openpyxl: memoria constante sin importar las filas"""
+
+    extension = 'xlsx'
+    descripcion = 'Excel'
+
+    def abrir(self, columnas):
+        from openpyxl import Workbook
+
+        super().abrir(columnas)
+        self._libro = Workbook(write_only=True)
+        self._hoja = self._libro.create_sheet('Sheet1')
+        self._hoja.append(columnas)
+
+    def escribir(self, producto):
+        self._hoja.append([producto.get(columna) for columna in self.columnas])
+        self.filas += 1
+
+    def cerrar(self):
+        self._libro.save(self.ruta)
+
+
+class SalidaParquet(Salida):
+    """
+    Parquet con columnas tipadas (requiere pyarrow): ID entero, Precio decimal, características
+    como map<string, string> y Fecha_Scraping con la hora de inicio de la ejecución.
+    Los textos vacíos quedan como nulos. Se escribe por grupos de FILAS_POR_GRUPO filas.
+    """
+
+    extension = 'parquet'
+    descripcion = 'Parquet'
+
+    def __init__(self, ruta: str):
+        if pa is None:
+            raise ValueError("El formato parquet requiere pyarrow (pip install pyarrow)")
+        super().__init__(ruta)
+        self.fecha_scraping = datetime.now(timezone.utc).replace(microsecond=0)
+
+    @staticmethod
+    def tipo_columna(columna: str):
+        if columna == 'ID':
+            return pa.int64()
+        if columna == 'Precio':
+            return pa.float64()
+        if columna in COLUMNAS_CARACTERISTICAS:
+            return pa.map_(pa.string(), pa.string())
+        return pa.string()
+
+    def abrir(self, columnas):
+        super().abrir(columnas)
+        self._esquema = pa.schema(
+            [pa.field(columna, self.tipo_columna(columna)) for columna in columnas]
+            + [pa.field('Fecha_Scraping', pa.timestamp('s', tz='UTC'))]
+        )
+        self._escritor = pq.ParquetWriter(self.ruta, self._esquema, compression='zstd')
+        self._pendientes = {columna: [] for columna in self._esquema.names}
+
+    def escribir(self, producto):
+        for columna in self.columnas:
+            valor = producto.get(columna)
+            if columna == 'Precio':
+                valor = precio_numerico(valor)
+            elif columna in COLUMNAS_CARACTERISTICAS:
+                valor = caracteristicas_a_pares(valor) or None
+            elif columna != 'ID':
+                valor = str(valor) if valor not in (None, '') else None
+            self._pendientes[columna].append(valor)
+        self._pendientes['Fecha_Scraping'].append(self.fecha_scraping)
+        self.filas += 1
+        if len(self._pendientes['Fecha_Scraping']) >= FILAS_POR_GRUPO:
+            self._vaciar()
+
+    def _vaciar(self):
+        if self._pendientes['Fecha_Scraping']:
+            self._escritor.write_table(pa.table(self._pendientes, schema=self._esquema))
+            self._pendientes = {columna: [] for columna in self._esquema.names}
+
+    def cerrar(self):
+        self._vaciar()
+        self._escritor.close()
+
+
+SALIDAS = {
+    'csv': SalidaCSV,
+    'jsonl': SalidaJSONL,
+    'xlsx': SalidaXLSX,
+    'parquet': SalidaParquet,
+}
+
+
+def crear_salidas(nombre_archivo: str, formatos: Iterable[str] = FORMATOS_POR_DEFECTO) -> List[Salida]:
+    """
+    Crea una salida por formato, con el nombre de archivo y la extensión del formato.
+
+    Args:
+        nombre_archivo: Ruta sin extensión
+        formatos: Formatos de SALIDAS ('csv', 'jsonl', 'xlsx', 'parquet')
+    """
+    salidas = []
+    for formato in formatos:
+        if formato not in SALIDAS:
+            raise ValueError(f"Formato de salida desconocido: {formato} (opciones: {', '.join(SALIDAS)})")
+        clase = SALIDAS[formato]
+        salidas.append(clase(f'{nombre_archivo}.{clase.extension}'))
+    return salidas
+
+
+class ResumenProductos:
+    """Totales del resumen final, calculados producto a producto"""
+
+    def __init__(self):
+        self.total = 0
+        self.con_imagen_url = 0
+        self.con_imagen_local = 0
+        self.con_descripcion = 0
+        self.con_caracteristicas = 0
+        self.precio_min = None
+        self.precio_max = None
+
+    def agregar(self, producto: Dict):
+        self.total += 1
+        self.con_imagen_url += bool(producto.get('URL_Imagen'))
+        self.con_imagen_local += bool(producto.get('Imagen_Local'))
+        self.con_descripcion += bool(producto.get('Descripcion'))
+        self.con_caracteristicas += bool(producto.get('Caracteristicas_Principales'))
+        # Mismo precio que la columna tipada de Parquet
+        precio = precio_numerico(producto.get('Precio'))
+        if precio is None:
+            return
+        self.precio_min = precio if self.precio_min is None else min(self.precio_min, precio)
+        self.precio_max = precio if self.precio_max is None else max(self.precio_max, precio)
+
+
+class EscritorSalidas:
+    """
+    Escribe los productos en varias salidas desde un hilo aparte.
+    agregar() solo encola (se bloquea si hay MAX_PENDIENTES esperando) y cerrar()
+    espera a que se escriba todo. Si una salida falla, se avisa y las demás siguen.
+    """
+
+    _FIN = object()
+
+    def __init__(self, salidas: List[Salida], max_pendientes: int = MAX_PENDIENTES):
+        self.salidas = list(salidas)
+        self.resumen = ResumenProductos()
+        self.errores = {}
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._hilo = threading.Thread(target=self._escribir, name='escritor-salidas', daemon=True)
+        self._hilo.start()
+
+    def agregar(self, producto: Dict):
+        if not self._hilo.is_alive():
+            raise RuntimeError("El escritor de salidas ya está cerrado")
+        self._cola.put(producto)
+
+    def _con_salidas(self, accion, *args):
+        """Aplica la acción a cada salida activa; una salida que falla se desactiva"""
+        for salida in self.salidas:
+            if salida.ruta in self.errores:
+                continue
+            try:
+                getattr(salida, accion)(*args)
+            except Exception as e:
+                self.errores[salida.ruta] = e
+                print(f"\n❌ Error guardando {salida.descripcion} ({salida.ruta}): {e}")
+
+    def _escribir(self):
+        abiertas = False
+        while True:
+            producto = self._cola.get()
+            if producto is self._FIN:
+                break
+            if not abiertas:
+                self._con_salidas('abrir', list(producto.keys()))
+                abiertas = True
+            self.resumen.agregar(producto)
+            self._con_salidas('escribir', producto)
+        if abiertas:
+            self._con_salidas('cerrar')
+
+    def cerrar(self):
+        """Termina de escribir lo pendiente y cierra los archivos"""
+        if self._hilo.is_alive():
+            self._cola.put(self._FIN)
+            self._hilo.join()
+
+    def escritas(self) -> List[Salida]:
+        """Salidas que se escribieron completas"""
+        return [s for s in self.salidas if s.columnas is not None and s.ruta not in self.errores]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
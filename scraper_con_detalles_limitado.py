@@ -11,7 +11,9 @@ print("\n" + "="*70)
 print(" SCRAPER DE MERCADO LIBRE - EXTRACCIÓN CON DETALLES")
 print("="*70)
 
-url_inicial = "https://listado.mercadolibre.cl/pagina/ar20240628111129/"
+from scraper_mercadolibre_v2 import URL_TIENDA_POR_DEFECTO
+# URL del listado como primer argumento (por defecto la tienda Viaje Azul)
+url_inicial = sys.argv[1] if len(sys.argv) > 1 else URL_TIENDA_POR_DEFECTO
 
 print(f"\n📍 URL: {url_inicial}")
 print("⚙️  Configuración:")
@@ -23,10 +25,10 @@ print("⚠️  NOTA: El scraper completo (48 productos) tomará ~15-20 minutos\n
 
 input("Presiona ENTER para continuar o Ctrl+C para cancelar...")
 
-import requests
 from bs4 import BeautifulSoup
 from scraper_mercadolibre_v2 import extraer_detalles_producto, descargar_imagen, guardar_resultados
-import time
+from imagenes import CARPETA_IMAGENES, AlmacenImagenes
+from sesion_http import obtener_sesion
 from urllib.parse import urljoin
 import re
 
@@ -42,7 +44,8 @@ print("\n" + "="*70)
 print("Iniciando scraping...")
 print("="*70)
 
-response = requests.get(url_inicial, headers=headers)
+sesion = obtener_sesion()
+response = sesion.get(url_inicial, headers=headers)
 response.encoding = 'utf-8'
 soup = BeautifulSoup(response.text, 'lxml')
 
@@ -51,7 +54,8 @@ items = soup.find_all('li', class_='ui-search-layout__item')[:10]  # Limitar a 1
 print(f"\n✓ Encontrados {len(items)} productos para procesar\n")
 
 productos = []
-carpeta_imagenes = 'imagenes_mercadolibre'
+carpeta_imagenes = CARPETA_IMAGENES
+almacen_imagenes = AlmacenImagenes(carpeta_imagenes)
 
 for idx, item in enumerate(items, 1):
     print(f"[{idx}/{len(items)}] Procesando producto...")
@@ -96,7 +100,8 @@ for idx, item in enumerate(items, 1):
     if img_elem:
         url_imagen = img_elem.get('data-src') or img_elem.get('src', '')
         if url_imagen and not url_imagen.startswith('data:'):
-            ruta_imagen_local = descargar_imagen(url_imagen, carpeta_imagenes, titulo, idx)
+            ruta_imagen_local = descargar_imagen(url_imagen, carpeta_imagenes, titulo, idx, sesion=sesion,
+                                                 almacen=almacen_imagenes, link=link) or ""
     
     # Crear producto base
     producto = {
@@ -114,7 +119,7 @@ for idx, item in enumerate(items, 1):
     
     # Extraer detalles
     if link:
-        detalles = extraer_detalles_producto(link, headers)
+        detalles = extraer_detalles_producto(link, headers, sesion=sesion)
         producto['Descripcion'] = detalles['Descripcion']
         
         if detalles['Caracteristicas_Principales']:
@@ -134,17 +139,13 @@ for idx, item in enumerate(items, 1):
     
     productos.append(producto)
     print(f"  ✓ Completado\n")
-    
-    # Pausa entre productos
-    if idx < len(items):
-        time.sleep(1)
 
 # Guardar resultados
 print("\n" + "="*70)
 print("Guardando resultados...")
 print("="*70)
 
-guardar_resultados(productos, nombre_archivo='viaje_azul_productos_con_detalles')
+guardar_resultados(productos, nombre_archivo='viaje_azul_productos_con_detalles', sesion=sesion)
 
 print("\n" + "="*70)
 print("✅ SCRAPING COMPLETADO")
@@ -1,469 +1,700 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
-import os
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import re
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sesion_http import SesionHTTP, obtener_sesion
+from cache_http import CacheHTTP
+from perfil_layout import PerfilLayout
+from parseo_paralelo import ParseadorHTML, procesos_por_defecto
+from checkpoint import ESQUEMA_OFFSET, ESQUEMA_SIGUIENTE, CheckpointCrawl
+from huellas import HuellasProductos
+from imagenes import (CARPETA_IMAGENES, HILOS_IMAGENES, TTL_IMAGENES, AlmacenImagenes, DescargadorImagenes,
+                      guardar_respuesta, obtener_imagen, url_imagen_grande)
+from variantes_imagenes import ProcesadorVariantes, formatos_disponibles
+from salidas import FORMATOS_POR_DEFECTO, SALIDAS, EscritorSalidas, crear_salidas
+from extractores import (TAMANO_TROZO, detalles_desde_html, detalles_parciales,
+                         detalles_vacios)
 
-def descargar_imagen(url_imagen, carpeta_destino, nombre_producto, indice):
+# Headers de navegador para las páginas de Mercado Libre
+HEADERS_NAVEGADOR = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'es-CL,es;q=0.9,en;q=0.8',
+    # Removido Accept-Encoding para que requests maneje la descompresión automáticamente
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0'
+}
+
+# Listado de la tienda Viaje Azul (con barra final), la que se scrapea si no se indica otra
+URL_TIENDA_POR_DEFECTO = "https://listado.mercadolibre.cl/pagina/ar20240628111129/"
+
+def descargar_imagen(url_imagen, carpeta_destino, nombre_producto, indice, sesion=None, almacen=None, link=None):
     """
-    Descarga una imagen y la guarda localmente.
+    Descarga una imagen y la guarda localmente, nombrada por el hash de su contenido
+    (ver imagenes.py). nombre_producto e indice ya no forman parte del nombre del archivo.
+    Con un AlmacenImagenes se guarda en el almacén (carpeta_destino se ignora): una URL ya
+    guardada solo se revalida con un GET condicional y, si se indica link, se asocia al producto.
+    Usa la sesión HTTP compartida para reutilizar conexiones con el CDN de imágenes.
+    Para descargar varias a la vez, usar imagenes.DescargadorImagenes.
     """
+    sesion = sesion or obtener_sesion()
+    url_imagen = url_imagen_grande(url_imagen)
     try:
-        if not os.path.exists(carpeta_destino):
-            os.makedirs(carpeta_destino)
-        
-        # Limpiar nombre para el archivo
-        nombre_limpio = re.sub(r'[^\w\s-]', '', nombre_producto)[:50]
-        nombre_limpio = re.sub(r'[-\s]+', '_', nombre_limpio)
-        
-        # Agregar índice para evitar duplicados
-        extension = '.jpg'
-        nombre_archivo = f"{indice}_{nombre_limpio}{extension}"
-        ruta_completa = os.path.join(carpeta_destino, nombre_archivo)
-        
-        # Evitar descargar si ya existe
-        if os.path.exists(ruta_completa):
-            return ruta_completa
-        
-        # Limpiar URL de imagen (Mercado Libre a veces usa tamaños diferentes)
-        if '-I' in url_imagen or '-O' in url_imagen or '-D' in url_imagen:
-            url_imagen = re.sub(r'-[IOD]\..*$', '-F.jpg', url_imagen)
-        
-        response = requests.get(url_imagen, timeout=10)
-        if response.status_code == 200:
-            with open(ruta_completa, 'wb') as f:
-                f.write(response.content)
-            return ruta_completa
-        return None
+        if almacen:
+            ruta, _ = obtener_imagen(sesion, almacen, url_imagen)
+            if link:
+                almacen.asociar(link, url_imagen)
+            return ruta
+        if sesion.solo_replay:
+            # Modo replay: sin almacén no hay copia guardada y no se accede a la red
+            return None
+        response = sesion.get(url_imagen, timeout=10, usar_cache=False, stream=True)
+        try:
+            if response.status_code != 200:
+                return None
+            return guardar_respuesta(response, carpeta_destino)[0]
+        finally:
+            response.close()
     except Exception as e:
         print(f"Error descargando imagen: {e}")
         return None
 
-def extraer_detalles_producto(url_producto, headers):
+def extraer_detalles_producto(url_producto, headers, verbose=True, sesion=None, modo_detalle='completo',
+                              parseador=None):
     """
     Extrae los detalles completos de un producto individual visitando su página.
+    
+    Args:
+        url_producto: URL de la página del producto
+        headers: Headers HTTP a enviar
+        verbose: Si es False no imprime el progreso (útil cuando se llama desde varios hilos)
+        sesion: SesionHTTP a usar (por defecto la sesión compartida del proceso)
+        modo_detalle: 'completo' parsea la página entera con BeautifulSoup;
+                      'parcial' la lee por trozos y deja de descargar cuando ya
+                      encontró todas las secciones (ver extractores.LectorDetalleParcial)
+        parseador: ParseadorHTML opcional para parsear en otro proceso (modo 'completo')
     """
-    detalles = {
-        'Descripcion': '',
-        'Caracteristicas_Principales': {},
-        'Caracteristicas_Ventas': {},
-        'Otras_Caracteristicas': {}
-    }
+    sesion = sesion or obtener_sesion()
+    detalles = detalles_vacios()
     
     try:
-        print(f"    → Extrayendo detalles del producto...", end=' ')
-        response = requests.get(url_producto, headers=headers, timeout=15)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        # Extraer descripción
-        desc_elem = soup.find('div', class_=re.compile(r'ui-pdp-description'))
-        if not desc_elem:
-            desc_elem = soup.find('div', class_=re.compile(r'item-description'))
-        if not desc_elem:
-            # Buscar en el contenido de texto
-            desc_elem = soup.find('p', class_=re.compile(r'ui-pdp-description__content'))
-        
-        if desc_elem:
-            detalles['Descripcion'] = desc_elem.get_text(strip=True, separator=' ')[:500]
-        
-        # Extraer características/especificaciones
-        # Mercado Libre usa diferentes estructuras según el tipo de producto
-        
-        # Método 1: Tabla de especificaciones estándar
-        spec_table = soup.find('table', class_=re.compile(r'andes-table|specs'))
-        if spec_table:
-            rows = spec_table.find_all('tr')
-            for row in rows:
-                cells = row.find_all(['th', 'td'])
-                if len(cells) >= 2:
-                    key = cells[0].get_text(strip=True)
-                    value = cells[1].get_text(strip=True)
-                    detalles['Caracteristicas_Principales'][key] = value
+        if verbose:
+            print(f"    → Extrayendo detalles del producto...", end=' ')
         
-        # Método 2: Divs con atributos
-        specs_container = soup.find_all('div', class_=re.compile(r'ui-pdp-highlighted-specs|ui-vpp-highlighted-specs'))
-        for container in specs_container:
-            spec_items = container.find_all('div', class_=re.compile(r'ui-pdp-highlighted-specs__item'))
-            for item in spec_items:
-                label = item.find('span', class_=re.compile(r'label'))
-                value = item.find('span', class_=re.compile(r'value'))
-                if label and value:
-                    detalles['Caracteristicas_Ventas'][label.get_text(strip=True)] = value.get_text(strip=True)
-        
-        # Método 3: Sección de especificaciones técnicas
-        tech_specs = soup.find_all('div', class_=re.compile(r'ui-pdp-specs'))
-        for spec_section in tech_specs:
-            spec_pairs = spec_section.find_all('tr')
-            for pair in spec_pairs:
-                th = pair.find('th')
-                td = pair.find('td')
-                if th and td:
-                    key = th.get_text(strip=True)
-                    value = td.get_text(strip=True)
-                    if key and value:
-                        detalles['Otras_Caracteristicas'][key] = value
-        
-        # Método 4: Buscar en scripts JSON-LD (datos estructurados)
-        scripts = soup.find_all('script', type='application/ld+json')
-        for script in scripts:
+        if modo_detalle == 'parcial':
+            # Una copia completa en el cache se usa tal cual; si no hay, se lee por trozos sin
+            # guardarla (guardarla obligaría a descargar la página entera). En modo replay
+            # sesion.get no accede a la red.
+            response = sesion.desde_cache(url_producto, tipo='detalle')
+            if response is None:
+                response = sesion.get(url_producto, headers=headers, timeout=15, usar_cache=False, stream=True)
             try:
-                data = json.loads(script.string)
-                if isinstance(data, dict):
-                    # Extraer descripción si está disponible
-                    if 'description' in data and not detalles['Descripcion']:
-                        detalles['Descripcion'] = data['description'][:500]
-                    
-                    # Extraer propiedades adicionales
-                    if 'additionalProperty' in data:
-                        for prop in data['additionalProperty']:
-                            if isinstance(prop, dict):
-                                name = prop.get('name', '')
-                                value = prop.get('value', '')
-                                if name and value:
-                                    detalles['Caracteristicas_Principales'][name] = str(value)
-            except:
-                continue
+                detalles, _ = detalles_parciales(response.iter_content(TAMANO_TROZO))
+            finally:
+                # Si se cortó antes, la conexión se cierra en vez de leer el resto
+                response.close()
+        else:
+            response = sesion.get(url_producto, headers=headers, timeout=15, tipo='detalle')
+            if parseador:
+                detalles = parseador.detalle(response.content)
+            else:
+                response.encoding = 'utf-8'
+                detalles = detalles_desde_html(response.text)
         
-        print("✓")
-        time.sleep(0.5)  # Pequeña pausa entre peticiones de detalles
+        if verbose:
+            print("✓")
         
     except Exception as e:
-        print(f"✗ Error: {e}")
+        if verbose:
+            print(f"✗ Error: {e}")
+        else:
+            print(f"    ✗ Error en detalles de {url_producto[:60]}: {e}")
     
     return detalles
 
-def extraer_datos_json(soup):
+def aplicar_detalles(producto, detalles):
     """
-    Intenta extraer datos de producto desde el JSON embebido en la página.
-    Mercado Libre a menudo incluye datos estructurados en JSON-LD o en scripts.
+    Copia los detalles extraídos al producto, convirtiendo cada diccionario
+    de características a texto con el formato "clave: valor | clave: valor".
     """
-    productos = []
+    producto['Descripcion'] = detalles['Descripcion']
     
-    # Buscar scripts con datos JSON
-    scripts = soup.find_all('script', type='application/ld+json')
+    for campo in ('Caracteristicas_Principales', 'Caracteristicas_Ventas', 'Otras_Caracteristicas'):
+        if detalles[campo]:
+            producto[campo] = ' | '.join(
+                [f"{k}: {v}" for k, v in detalles[campo].items()]
+            )
     
-    for script in scripts:
-        try:
-            data = json.loads(script.string)
-            if isinstance(data, dict) and data.get('@type') == 'Product':
-                producto = {
-                    'Titulo': data.get('name', ''),
-                    'Precio': data.get('offers', {}).get('price', ''),
-                    'URL_Imagen': data.get('image', ''),
-                    'Link': data.get('url', '')
-                }
-                productos.append(producto)
-        except:
-            continue
-    
-    return productos
+    return producto
 
-def scrapear_tienda_ml(url_tienda, descargar_imagenes=True, extraer_detalles=True):
+def producto_desde_tarjeta(datos, id_producto):
+    """
+    Producto base (columnas de la salida, sin detalles ni imagen local) a partir de una
+    tarjeta del listado ya extraída (ver extractores.resumir_listado).
+    """
+    titulo = datos['Titulo']
+    # Fallback solo si realmente no se encuentra nada
+    if not titulo:
+        print(f"  ⚠️  No se pudo extraer título para item {id_producto}")
+        titulo = f"Producto {id_producto}"
+    return {
+        'ID': id_producto,
+        'Titulo': titulo,
+        'Precio': datos['Precio'],
+        'Condicion': datos['Condicion'],
+        'Ubicacion': datos['Ubicacion'],
+        'Envio': datos['Envio'],
+        'Link': datos['Link'],
+        'URL_Imagen': datos['URL_Imagen'],
+        'Imagen_Local': "",
+        'Descripcion': '',
+        'Caracteristicas_Principales': '',
+        'Caracteristicas_Ventas': '',
+        'Otras_Caracteristicas': ''
+    }
+
+class LimiteConcurrenciaPorHost:
+    """
+    Limita la cantidad de peticiones simultáneas hacia un mismo host.
+    Se usa como context manager: `with limite.para(url): ...`
     """
-    Scrapea productos de Mercado Libre con sus detalles e imágenes.
-    Versión mejorada que detecta diferentes estructuras de página.
+    
+    def __init__(self, max_por_host=4):
+        self.max_por_host = max_por_host
+        self._semaforos = {}
+        self._lock = threading.Lock()
+    
+    def para(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.max_por_host)
+            return self._semaforos[host]
+
+def _al_terminar_detalles(checkpoint, huellas, pagina, indice, producto, futuro):
+    """Callback de los futuros de detalles: guarda el producto apenas queda completo"""
+    if futuro.cancelled() or futuro.exception() is not None:
+        return
+    if huellas:
+        huellas.guardar(producto)
+    if checkpoint:
+        checkpoint.guardar_producto(pagina, indice, producto)
+
+def _entregar_producto(entrada, total, pagina, checkpoint):
+    """
+    Deja listo un producto de la página para entregarlo: espera su imagen (si se pidió una)
+    y lo guarda en el checkpoint.
     
     Args:
-        url_tienda: URL del listado de productos
-        descargar_imagenes: Si es True, descarga las imágenes localmente
-        extraer_detalles: Si es True, visita cada producto para extraer características detalladas
+        entrada: (idx, producto, pendiente, futuro_imagen, recuperado); pendiente indica que
+            sus detalles se extrajeron en el pool (ya lo guardó _al_terminar_detalles) y
+            recuperado que viene del checkpoint de una ejecución anterior
     """
-    productos = []
-    carpeta_imagenes = 'imagenes_mercadolibre'
-    contador_productos = 0
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-        'Accept-Language': 'es-CL,es;q=0.9,en;q=0.8',
-        # Removido Accept-Encoding para que requests maneje la descompresión automáticamente
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Cache-Control': 'max-age=0'
-    }
+    idx, producto, pendiente, futuro_imagen, recuperado = entrada
+    if recuperado:
+        print(f"  [{idx}/{total}] ♻️  {producto['Titulo'][:60]}... (checkpoint)")
+        return producto
+    if futuro_imagen is not None:
+        producto['Imagen_Local'] = futuro_imagen.result() or ""
+    if checkpoint and (not pendiente or futuro_imagen is not None):
+        checkpoint.guardar_producto(pagina, idx, producto)
+    print(f"  [{idx}/{total}] ✓ {producto['Titulo'][:60]}... - ${producto['Precio']}")
+    return producto
 
-    pagina_actual = 1
-    max_paginas = 10
+def _detalles_con_limite(producto, headers, limite, sesion, modo_detalle='completo', parseador=None):
+    """Extrae los detalles de un producto respetando el límite por host."""
+    with limite.para(producto['Link']):
+        detalles = extraer_detalles_producto(producto['Link'], headers, verbose=False, sesion=sesion,
+                                             modo_detalle=modo_detalle, parseador=parseador)
+    return aplicar_detalles(producto, detalles)
 
-    while url_tienda and pagina_actual <= max_paginas:
-        print(f"\n{'='*60}")
-        print(f"Scrapeando página {pagina_actual}")
-        print(f"URL: {url_tienda[:80]}...")
-        print(f"{'='*60}")
-        
+def urls_paginas_listado(resumen):
+    """
+    Calcula de antemano las URLs de las páginas 2..N del listado a partir de la primera.
+    Mercado Libre pagina con un offset en la URL (`_Desde_49`), así que basta con el
+    enlace a la página siguiente (tamaño de página) y el total de resultados o de páginas.
+    
+    Args:
+        resumen: Resumen de la primera página (ver extractores.resumir_listado)
+    
+    Returns:
+        Lista de URLs (vacía si hay una sola página) o None si no se reconoce el esquema
+    """
+    siguiente = resumen['siguiente']
+    if not siguiente:
+        return []
+    
+    match = re.search(r'_Desde_(\d+)', siguiente)
+    if not match or int(match.group(1)) <= 1:
+        return None
+    por_pagina = int(match.group(1)) - 1
+    
+    total_paginas = None
+    total = re.sub(r'\D', '', resumen['cantidad'])
+    if total:
+        total_paginas = -(-int(total) // por_pagina)
+    if not total_paginas:
+        match_paginas = re.search(r'(\d+)', resumen['contador'])
+        if match_paginas:
+            total_paginas = int(match_paginas.group(1))
+    if not total_paginas:
+        return None
+    
+    return [
+        siguiente[:match.start(1)] + str(1 + n * por_pagina) + siguiente[match.end(1):]
+        for n in range(1, total_paginas)
+    ]
+
+def _descargar_listado(url, headers, sesion, parseador, perfil_layout):
+    """Descarga y resume una página de listado (tarjetas y datos de paginación)"""
+    response = sesion.get(url, headers=headers, timeout=15, tipo='listado')
+    response.raise_for_status()
+    return parseador.listado(response.content, response.url, perfil_layout.orden(url))
+
+def _paginas_en_paralelo(paginas, headers, sesion, parseador, perfil_layout, paginas_concurrentes):
+    """Descarga en paralelo una lista de (número, url) y entrega (número, url, resumen) en orden"""
+    pool = ThreadPoolExecutor(max_workers=paginas_concurrentes)
+    try:
+        futuros = [pool.submit(_descargar_listado, url, headers, sesion, parseador, perfil_layout)
+                   for _, url in paginas]
+        for (numero, url), futuro in zip(paginas, futuros):
+            try:
+                resumen = futuro.result()
+            except requests.RequestException as e:
+                print(f"❌ Error al obtener la página {numero}: {e}")
+                continue
+            yield numero, resumen['url'], resumen
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def _seguir_siguiente(numero, siguiente, headers, sesion, parseador, perfil_layout, max_paginas, checkpoint):
+    """Sigue el botón "Siguiente" desde la página `numero` (ya procesada) hasta el final"""
+    while True:
+        if not siguiente or (max_paginas and numero >= max_paginas):
+            print(f"\n✓ No hay más páginas disponibles")
+            return
+        numero += 1
+        if checkpoint:
+            checkpoint.registrar_paginas([(numero, siguiente)], ESQUEMA_SIGUIENTE)
         try:
-            response = requests.get(url_tienda, headers=headers, timeout=15)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
+            resumen = _descargar_listado(siguiente, headers, sesion, parseador, perfil_layout)
         except requests.RequestException as e:
             print(f"❌ Error al obtener la página: {e}")
-            break
-        
-        soup = BeautifulSoup(response.text, 'lxml')
+            return
+        yield numero, resumen['url'], resumen
+        siguiente = resumen['siguiente']
+
+def _reanudar_listado(headers, sesion, parseador, perfil_layout, max_paginas, paginas_concurrentes, checkpoint):
+    """
+    Recorre el listado a partir de la frontera guardada en el checkpoint.
+    Las páginas completas se entregan con resumen None (sus productos están en el checkpoint).
+    """
+    frontera = checkpoint.frontera()
+    if max_paginas:
+        frontera = frontera[:max_paginas]
+    completas = sum(1 for pagina in frontera if pagina['completa'])
+    print(f"♻️  Reanudando: {completas} de {len(frontera)} páginas conocidas ya estaban completas")
+    
+    if checkpoint.esquema == ESQUEMA_OFFSET:
+        # Todas las URLs se conocen: las pendientes se descargan en paralelo, en orden
+        pendientes = [(p['numero'], p['url']) for p in frontera if not p['completa']]
+        descargas = _paginas_en_paralelo(pendientes, headers, sesion, parseador, perfil_layout,
+                                         paginas_concurrentes)
+        completas = iter(p for p in frontera if p['completa'])
+        pagina = next(completas, None)
+        for numero, url, resumen in descargas:
+            while pagina and pagina['numero'] < numero:
+                yield pagina['numero'], pagina['url'], None
+                pagina = next(completas, None)
+            yield numero, url, resumen
+        while pagina:
+            yield pagina['numero'], pagina['url'], None
+            pagina = next(completas, None)
+        return
+    
+    # Esquema "Siguiente": repetir las completas y seguir desde la primera pendiente
+    for pagina in frontera:
+        if not pagina['completa']:
+            yield from _seguir_siguiente(pagina['numero'] - 1, pagina['url'], headers, sesion, parseador,
+                                         perfil_layout, max_paginas, checkpoint)
+            return
+        yield pagina['numero'], pagina['url'], None
+    if frontera:
+        yield from _seguir_siguiente(frontera[-1]['numero'], frontera[-1]['siguiente'], headers, sesion,
+                                     parseador, perfil_layout, max_paginas, checkpoint)
+
+def iterar_paginas_listado(url_tienda, headers, sesion, parseador, perfil_layout, max_paginas=None,
+                           paginas_concurrentes=4, checkpoint=None):
+    """
+    Recorre las páginas de un listado y entrega (número, url, resumen) en orden.
+    El resumen es el de extractores.resumir_listado: tarjetas ya extraídas y paginación.
+    
+    Si desde la primera página se reconoce el esquema de paginación, todas las demás
+    páginas se descargan en paralelo (el limitador de la sesión sigue controlando el ritmo).
+    Si no, se sigue el botón "Siguiente" página por página.
+    
+    Args:
+        url_tienda: URL de la primera página del listado
+        headers: Headers HTTP a enviar
+        sesion: SesionHTTP a usar
+        parseador: ParseadorHTML con el que se parsea cada página
+        perfil_layout: PerfilLayout que decide en qué orden probar las estrategias
+        max_paginas: Límite opcional de páginas (por defecto todas las de la tienda)
+        paginas_concurrentes: Páginas de listado descargadas a la vez
+        checkpoint: CheckpointCrawl opcional donde se registra la frontera. Si viene
+            reanudado, las páginas ya completas se entregan con resumen None.
+    """
+    if checkpoint and checkpoint.reanudado and checkpoint.frontera():
+        yield from _reanudar_listado(headers, sesion, parseador, perfil_layout, max_paginas,
+                                     paginas_concurrentes, checkpoint)
+        return
+    
+    try:
+        resumen = _descargar_listado(url_tienda, headers, sesion, parseador, perfil_layout)
+    except requests.RequestException as e:
+        print(f"❌ Error al obtener la página: {e}")
+        return
+    
+    urls = urls_paginas_listado(resumen)
+    if urls is not None and max_paginas:
+        urls = urls[:max_paginas - 1]
+    if checkpoint:
+        paginas = [(1, url_tienda)] + list(enumerate(urls or [], 2))
+        checkpoint.registrar_paginas(paginas, ESQUEMA_SIGUIENTE if urls is None else ESQUEMA_OFFSET)
+    yield 1, resumen['url'], resumen
+    
+    if urls is not None:
+        if not urls:
+            print(f"\n✓ No hay más páginas disponibles")
+            return
         
-        # Intentar múltiples selectores para encontrar productos
-        items = []
+        print(f"\n📑 La tienda tiene {len(urls) + 1} páginas; descargando el resto en paralelo...")
+        yield from _paginas_en_paralelo(list(enumerate(urls, 2)), headers, sesion, parseador, perfil_layout,
+                                        paginas_concurrentes)
+        return
+    
+    # Esquema no reconocido: seguir el botón "Siguiente"
+    yield from _seguir_siguiente(1, resumen['siguiente'], headers, sesion, parseador, perfil_layout,
+                                 max_paginas, checkpoint)
+
+def iter_productos(url_tienda, descargar_imagenes=True, extraer_detalles=True,
+                   detalles_concurrentes=1, max_por_host=4, sesion=None,
+                   max_paginas=None, paginas_concurrentes=4, parser='bs4',
+                   modo_detalle='completo', perfil_layout=None, procesos_parseo=0,
+                   parseador=None, checkpoint=None, huellas=None,
+                   carpeta_imagenes=CARPETA_IMAGENES, headers=None, primer_id=1,
+                   hilos_imagenes=HILOS_IMAGENES, descargador_imagenes=None, variantes_imagenes=False,
+                   ttl_imagenes=TTL_IMAGENES, limite_hosts=None):
+    """
+    Generador que entrega cada producto de la tienda apenas está completo (con sus
+    detalles e imagen), en el orden del listado.
+    
+    Todo el estado se recibe como argumento, así que se pueden recorrer varias tiendas
+    a la vez (en hilos distintos) usando carpetas de imágenes distintas. Si se deja de
+    consumir antes del final, los pools se cierran igual.
+    
+    Args:
+        url_tienda: URL del listado de productos
+        descargar_imagenes: Si es True, descarga las imágenes localmente
+        extraer_detalles: Si es True, visita cada producto para extraer características detalladas
+        detalles_concurrentes: Cantidad de páginas de detalle a descargar en paralelo.
+            Con 1 (por defecto) los detalles se extraen uno a uno.
+        max_por_host: Máximo de peticiones de detalle simultáneas hacia un mismo host
+            (solo aplica con detalles_concurrentes > 1)
+        sesion: SesionHTTP compartida (por defecto la sesión del proceso)
+        max_paginas: Límite opcional de páginas; por defecto se recorren todas las de la tienda
+        paginas_concurrentes: Páginas de listado que se descargan en paralelo
+        parser: Extractor de tarjetas a usar: 'bs4' (referencia) o 'lxml' (más rápido)
+        modo_detalle: 'completo' o 'parcial' (lee cada página de producto solo hasta
+            encontrar sus secciones, ver extraer_detalles_producto)
+        perfil_layout: PerfilLayout con la estrategia de tarjetas aprendida por tienda
+            (por defecto el de datos/perfil_layout.json); si se entrega, lo guarda quien lo creó
+        procesos_parseo: Procesos para parsear el HTML en paralelo (0 = en el proceso actual)
+        parseador: ParseadorHTML ya creado, para compartir su pool entre varias tiendas
+            (si se entrega, procesos_parseo y parser se ignoran)
+        checkpoint: CheckpointCrawl opcional; cada página y producto terminados se guardan
+            ahí, y si está reanudado se continúa desde donde quedó
+        huellas: HuellasProductos opcional; los productos cuya tarjeta no cambió desde la
+            ejecución anterior reutilizan sus detalles en vez de visitar su página
+        carpeta_imagenes: Carpeta del almacén de imágenes (ver imagenes.AlmacenImagenes)
+        headers: Headers HTTP a enviar (por defecto HEADERS_NAVEGADOR)
+        primer_id: ID del primer producto (los siguientes son correlativos)
+        hilos_imagenes: Imágenes que se descargan a la vez, mientras sigue el scraping
+        descargador_imagenes: DescargadorImagenes ya creado, para compartirlo entre tiendas
+            (si se entrega, carpeta_imagenes, hilos_imagenes, variantes_imagenes y
+            ttl_imagenes se ignoran)
+        variantes_imagenes: Si es True, genera miniaturas y versiones WebP/AVIF de cada imagen
+            en un pool de procesos (requiere Pillow, ver variantes_imagenes.py)
+        ttl_imagenes: Segundos durante los que una imagen ya revisada no se vuelve a pedir;
+            después se revalida con un GET condicional (0 = revalidar todas)
+        limite_hosts: LimiteConcurrenciaPorHost ya creado, para que varias tiendas respeten
+            el mismo máximo por host (si se entrega, max_por_host se ignora)
+    """
+    sesion = sesion or obtener_sesion()
+    perfil_propio = perfil_layout is None
+    perfil_layout = perfil_layout or PerfilLayout()
+    descargador_propio = descargar_imagenes and descargador_imagenes is None
+    if descargador_propio:
+        almacen = AlmacenImagenes(carpeta_imagenes)
+        procesador = ProcesadorVariantes(almacen) if variantes_imagenes else None
+        descargador_imagenes = DescargadorImagenes(almacen, sesion, hilos_imagenes, procesador=procesador,
+                                                   ttl=ttl_imagenes)
+    parseador_propio = parseador is None
+    if parseador_propio:
+        parseador = ParseadorHTML(procesos_parseo, parser)
+        if procesos_parseo > 0:
+            print(f"⚙️  Parseo en {procesos_parseo} procesos")
+    contador_productos = primer_id - 1
+    headers = headers or HEADERS_NAVEGADOR
+
+    # Pool de hilos para los detalles (modo concurrente opcional)
+    pool_detalles = None
+    if extraer_detalles and detalles_concurrentes > 1:
+        pool_detalles = ThreadPoolExecutor(max_workers=detalles_concurrentes)
+        limite_hosts = limite_hosts or LimiteConcurrenciaPorHost(max_por_host)
+        print(f"⚡ Detalles en paralelo: {detalles_concurrentes} hilos, "
+              f"máx. {limite_hosts.max_por_host} por host")
+
+    try:
+        reanudando = bool(checkpoint and checkpoint.reanudado)
+        paginas = iterar_paginas_listado(url_tienda, headers, sesion, parseador, perfil_layout,
+                                         max_paginas, paginas_concurrentes, checkpoint)
+        for pagina_actual, url_pagina, resumen in paginas:
+            print(f"\n{'='*60}")
+            print(f"Scrapeando página {pagina_actual}")
+            print(f"URL: {url_pagina[:80]}...")
+            print(f"{'='*60}")
         
-        # Intento 1: Layout estándar de listado
-        items = soup.find_all('li', class_='ui-search-layout__item')
+            if resumen is None:
+                # Página completada en una ejecución anterior: sus productos están en el checkpoint
+                guardados = checkpoint.productos_pagina(pagina_actual)
+                yield from guardados.values()
+                contador_productos += checkpoint.pagina(pagina_actual)['items'] or len(guardados)
+                print(f"♻️  {len(guardados)} productos recuperados del checkpoint")
+                continue
         
-        if not items:
-            # Intento 2: Grilla de productos
-            items = soup.find_all('div', class_='ui-search-result__wrapper')
-        if not items:
-            # Intento 3: Otro formato común
-            items = soup.find_all('div', class_='andes-card')
-        if not items:
-            # Intento 4: Productos en la tienda
-            items = soup.find_all('div', class_='shops__layout-item')
-        if not items:
-            # Intento 5: Formato de artículos
-            items = soup.find_all('article', class_='')
+            # El parseador probó los selectores empezando por el que funcionó antes en esta tienda
+            perfil_layout.registrar(url_pagina, resumen['estrategia'], resumen['fallidas'])
+            items = resumen['tarjetas']
         
-        if not items:
-            print(f"⚠️  No se encontraron productos con los selectores conocidos.")
-            print("Intentando método alternativo...")
+            if resumen['enlaces'] is not None:
+                print(f"⚠️  No se encontraron productos con los selectores conocidos.")
+                print("Intentando método alternativo...")
+                print(f"Encontrados {resumen['enlaces']} enlaces potenciales")
             
-            # Buscar todos los enlaces que apunten a productos
-            enlaces_productos = soup.find_all('a', href=lambda href: href and ('/p/' in href or '/MLC' in href))
-            print(f"Encontrados {len(enlaces_productos)} enlaces potenciales")
-            
-            # Si realmente no hay items, el sitio probablemente usa JavaScript
-            if not enlaces_productos:
-                print("❌ No se pudieron extraer productos. La página podría requerir JavaScript.")
-                break
-            
-            # Crear items pseudo desde los enlaces
-            items = []
-            for enlace in enlaces_productos[:50]:  # Limitar a 50 para no saturar
-                parent = enlace.find_parent('div', class_=re.compile(r'poly-card|ui-search|shops'))
-                if parent and parent not in items:
-                    items.append(parent)
+                # Si realmente no hay items, el sitio probablemente usa JavaScript
+                if not resumen['enlaces']:
+                    print("❌ No se pudieron extraer productos. La página podría requerir JavaScript.")
+                    break
         
-        print(f"✓ Encontrados {len(items)} elementos para procesar")
+            print(f"✓ Encontrados {len(items)} elementos para procesar")
 
-        for idx, item in enumerate(items, 1):
-            contador_productos += 1
-            try:
-                # Título del producto
-                titulo = ""
-                
-                # Método 1: Buscar en <a> con clase poly-component__title
-                titulo_elem = item.find('a', class_=re.compile(r'poly-component__title'))
-                if titulo_elem:
-                    titulo = titulo_elem.text.strip()
-                
-                # Método 2: Buscar en <h2>
-                if not titulo:
-                    titulo_elem = item.find('h2', class_=re.compile(r'ui-search-item__title|poly-component__title'))
-                    if titulo_elem:
-                        titulo = titulo_elem.text.strip()
-                
-                # Método 3: Buscar por atributo title en enlaces
-                if not titulo:
-                    any_link = item.find('a', title=True)
-                    if any_link:
-                        titulo = any_link.get('title', '').strip()
-                
-                # Método 4: Buscar en <h3>
-                if not titulo:
-                    titulo_elem = item.find('h3')
-                    if titulo_elem:
-                        titulo = titulo_elem.text.strip()
-                
-                # Fallback solo si realmente no se encuentra nada
-                if not titulo:
-                    print(f"  ⚠️  No se pudo extraer título para item {contador_productos}")
-                    titulo = f"Producto {contador_productos}"
-                
-                # Precio
-                precio_texto = "0"
-                precio_container = item.find('span', class_='andes-money-amount__fraction')
-                if not precio_container:
-                    precio_container = item.find('span', class_=re.compile(r'price'))
-                if not precio_container:
-                    precio_match = item.find('div', class_=re.compile(r'price'))
-                    if precio_match:
-                        precio_texto = re.sub(r'[^\d,.]', '', precio_match.text.strip())
-                
-                if precio_container:
-                    precio_texto = precio_container.text.strip().replace('.', '').replace(',', '')
-                    centavos = item.find('span', class_='andes-money-amount__cents')
-                    if centavos:
-                        precio_texto = f"{precio_texto}.{centavos.text.strip()}"
-                
-                # Link del producto
-                link = ""
-                link_elem = item.find('a', href=re.compile(r'/p/|/MLC|/up/'))
-                if link_elem:
-                    link = link_elem.get('href', '')
-                    # Asegurar URL completa
-                    if link and not link.startswith('http'):
-                        link = urljoin(url_tienda, link)
+            # Productos de esta página en orden (ver _entregar_producto): su posición, si falta
+            # extraer sus detalles en el pool, el futuro de su imagen y si vienen del checkpoint
+            productos_pagina = []
+            # Productos ya terminados de esta página (si se reanuda una página a medias)
+            guardados = checkpoint.productos_pagina(pagina_actual) if reanudando else {}
+        
+            for idx, datos in enumerate(items, 1):
+                contador_productos += 1
+                try:
+                    if 'Error' in datos:
+                        raise ValueError(datos['Error'])
                 
-                # Imagen del producto
-                url_imagen = ""
-                ruta_imagen_local = ""
+                    previo = guardados.get(idx)
+                    if previo and previo.get('Link') == datos['Link']:
+                        productos_pagina.append((idx, previo, False, None, True))
+                        continue
+                    producto = producto_desde_tarjeta(datos, contador_productos)
+                    link = producto['Link']
+                    url_imagen = producto['URL_Imagen']
                 
-                img_elem = item.find('img')
-                if img_elem:
-                    url_imagen = img_elem.get('data-src') or img_elem.get('src', '')
-                    
-                    # Limpiar data URIs
-                    if url_imagen.startswith('data:'):
-                        url_imagen = ""
-                    
+                    # Imagen del producto: se descarga en el pool mientras sigue el scraping
+                    # (si ya está en el almacén, el futuro viene resuelto)
+                    futuro_imagen = None
                     if descargar_imagenes and url_imagen:
-                        ruta_imagen_local = descargar_imagen(
-                            url_imagen, 
-                            carpeta_imagenes, 
-                            titulo,
-                            contador_productos
-                        )
+                        futuro_imagen = descargador_imagenes.pedir(url_imagen, link)
                 
-                # Información adicional
-                ubicacion = ""
-                ubicacion_elem = item.find('span', class_=re.compile(r'location'))
-                if ubicacion_elem:
-                    ubicacion = ubicacion_elem.text.strip()
+                    # Si la tarjeta no cambió desde la ejecución anterior, reutilizar sus detalles
+                    detalles_previos = None
+                    if huellas and extraer_detalles and link:
+                        detalles_previos = huellas.detalles_guardados(producto)
+                        if detalles_previos:
+                            producto.update(detalles_previos)
                 
-                # Condición
-                condicion = ""
-                condicion_elem = item.find('span', class_=re.compile(r'condition'))
-                if condicion_elem:
-                    condicion = condicion_elem.text.strip()
+                    # Extraer detalles del producto si está habilitado (modo secuencial)
+                    if extraer_detalles and link and not pool_detalles and not detalles_previos:
+                        detalles = extraer_detalles_producto(link, headers, sesion=sesion, modo_detalle=modo_detalle,
+                                                             parseador=parseador)
+                        aplicar_detalles(producto, detalles)
+                        if huellas:
+                            huellas.guardar(producto)
                 
-                # Envío
-                envio = ""
-                envio_elem = item.find('span', class_=re.compile(r'shipping|envio'))
-                if envio_elem:
-                    envio = envio_elem.text.strip()
+                    pendiente = bool(pool_detalles and link) and not detalles_previos
+                    productos_pagina.append((idx, producto, pendiente, futuro_imagen, False))
                 
-                # Crear producto base
-                producto = {
-                    'ID': contador_productos,
-                    'Titulo': titulo,
-                    'Precio': precio_texto,
-                    'Condicion': condicion,
-                    'Ubicacion': ubicacion,
-                    'Envio': envio,
-                    'Link': link,
-                    'URL_Imagen': url_imagen,
-                    'Imagen_Local': ruta_imagen_local if descargar_imagenes else "",
-                    'Descripcion': '',
-                    'Caracteristicas_Principales': '',
-                    'Caracteristicas_Ventas': '',
-                    'Otras_Caracteristicas': ''
-                }
+                except Exception as e:
+                    print(f"  [{idx}/{len(items)}] ❌ Error: {e}")
+                    continue
                 
-                # Extraer detalles del producto si está habilitado
-                if extraer_detalles and link:
-                    detalles = extraer_detalles_producto(link, headers)
-                    producto['Descripcion'] = detalles['Descripcion']
-                    
-                    # Convertir diccionarios a strings formatados
-                    if detalles['Caracteristicas_Principales']:
-                        producto['Caracteristicas_Principales'] = ' | '.join(
-                            [f"{k}: {v}" for k, v in detalles['Caracteristicas_Principales'].items()]
-                        )
-                    
-                    if detalles['Caracteristicas_Ventas']:
-                        producto['Caracteristicas_Ventas'] = ' | '.join(
-                            [f"{k}: {v}" for k, v in detalles['Caracteristicas_Ventas'].items()]
-                        )
-                    
-                    if detalles['Otras_Caracteristicas']:
-                        producto['Otras_Caracteristicas'] = ' | '.join(
-                            [f"{k}: {v}" for k, v in detalles['Otras_Caracteristicas'].items()]
-                        )
-                
-                productos.append(producto)
-                print(f"  [{idx}/{len(items)}] ✓ {titulo[:60]}... - ${precio_texto}")
-                
-            except Exception as e:
-                print(f"  [{idx}/{len(items)}] ❌ Error: {e}")
-                continue
-
-        # Lógica de Paginación
-        next_btn = soup.find('a', {'title': re.compile(r'Siguiente|Next', re.I)})
-        if not next_btn:
-            next_btn = soup.find('a', class_=re.compile(r'andes-pagination__button--next'))
+                # Modo secuencial: entregar en orden los productos cuya imagen ya llegó
+                if not pool_detalles:
+                    while productos_pagina and (productos_pagina[0][3] is None or productos_pagina[0][3].done()):
+                        yield _entregar_producto(productos_pagina.pop(0), len(items), pagina_actual, checkpoint)
         
-        if next_btn and next_btn.get('href'):
-            url_tienda = next_btn['href']
-            if not url_tienda.startswith('http'):
-                # Construir URL completa si es relativa
-                from urllib.parse import urljoin
-                url_tienda = urljoin(response.url, url_tienda)
-            pagina_actual += 1
-            print(f"\n⏳ Esperando 2 segundos antes de la siguiente página...")
-            time.sleep(2)
-        else:
-            print(f"\n✓ No hay más páginas disponibles")
-            url_tienda = None
+            # Modo concurrente: los detalles de la página se descargan en paralelo.
+            # Se espera cada futuro en el orden del listado y se entrega el producto apenas termina.
+            if pool_detalles:
+                futuros = {}
+                for idx, producto, pendiente, _, _ in productos_pagina:
+                    if pendiente:
+                        futuros[idx] = pool_detalles.submit(_detalles_con_limite, producto, headers, limite_hosts,
+                                                            sesion, modo_detalle, parseador)
+                        if checkpoint or huellas:
+                            futuros[idx].add_done_callback(
+                                partial(_al_terminar_detalles, checkpoint, huellas, pagina_actual, idx, producto))
+                print(f"  ⏳ Extrayendo detalles de {len(futuros)} productos en paralelo...")
+                for entrada in productos_pagina:
+                    idx = entrada[0]
+                    if idx in futuros:
+                        try:
+                            futuros[idx].result()
+                        except Exception as e:
+                            print(f"  [{idx}/{len(items)}] ❌ Error en detalles: {e}")
+                    yield _entregar_producto(entrada, len(items), pagina_actual, checkpoint)
+            else:
+                # Modo secuencial: los que siguen esperando su imagen
+                for entrada in productos_pagina:
+                    yield _entregar_producto(entrada, len(items), pagina_actual, checkpoint)
+        
+            if checkpoint:
+                checkpoint.completar_pagina(pagina_actual, len(items), resumen['siguiente'])
 
-    return productos
+        if checkpoint:
+            checkpoint.terminar()
+        if huellas:
+            huellas.imprimir_estadisticas()
+        if descargador_propio:
+            descargador_imagenes.cerrar()
+            descargador_imagenes.imprimir_estadisticas()
+    finally:
+        if pool_detalles:
+            pool_detalles.shutdown(cancel_futures=True)
+        if descargador_propio:
+            descargador_imagenes.cerrar(cancelar=True)
+            descargador_imagenes.almacen.cerrar()
+        if parseador_propio:
+            parseador.cerrar()
+        if perfil_propio:
+            perfil_layout.guardar()
+            perfil_layout.imprimir_estadisticas()
 
-def guardar_resultados(productos, nombre_archivo='productos_mercadolibre'):
+def scrapear_tienda_ml(url_tienda, descargar_imagenes=True, extraer_detalles=True, **kwargs):
+    """
+    Scrapea productos de Mercado Libre con sus detalles e imágenes.
+    Versión mejorada que detecta diferentes estructuras de página.
+    Devuelve la lista completa; para procesar los productos a medida que llegan
+    usa iter_productos, que recibe los mismos argumentos (todos se le pasan tal cual).
     """
-    Guarda los productos en Excel y CSV.
+    return list(iter_productos(url_tienda, descargar_imagenes=descargar_imagenes,
+                               extraer_detalles=extraer_detalles, **kwargs))
+
+def guardar_resultados(productos, nombre_archivo='productos_mercadolibre', sesion=None,
+                       formatos=FORMATOS_POR_DEFECTO):
     """
-    if not productos:
-        print("\n⚠️  No hay productos para guardar.")
-        return
-    
-    df = pd.DataFrame(productos)
+    Guarda los productos en los formatos indicados (por defecto Excel y CSV, ver salidas.py).
+    `productos` puede ser una lista o un iterable como iter_productos: cada producto se escribe
+    desde un hilo aparte apenas llega, así la escritura se superpone al scraping y no hace
+    falta tener todos los productos en memoria.
+    Si se entrega la sesión HTTP usada, el resumen incluye la reutilización de conexiones.
     
-    # Guardar en Excel
-    archivo_excel = f'{nombre_archivo}.xlsx'
+    Returns:
+        Cantidad de productos guardados
+    """
+    escritor = EscritorSalidas(crear_salidas(nombre_archivo, formatos))
     try:
-        df.to_excel(archivo_excel, index=False, engine='openpyxl')
-        print(f"\n✅ Guardado en Excel: {archivo_excel}")
-    except Exception as e:
-        print(f"\n❌ Error guardando Excel: {e}")
+        for producto in productos:
+            escritor.agregar(producto)
+    finally:
+        # También ante un error o Ctrl+C: lo recibido hasta ahí queda en archivos válidos
+        escritor.cerrar()
     
-    # Guardar en CSV como respaldo
-    archivo_csv = f'{nombre_archivo}.csv'
-    try:
-        df.to_csv(archivo_csv, index=False, encoding='utf-8-sig')
-        print(f"✅ Guardado en CSV: {archivo_csv}")
-    except Exception as e:
-        print(f"❌ Error guardando CSV: {e}")
+    resumen = escritor.resumen
+    if not resumen.total:
+        print("\n⚠️  No hay productos para guardar.")
+        return 0
+    
+    for numero, salida in enumerate(escritor.escritas()):
+        print(f"{'' if numero else chr(10)}✅ Guardado en {salida.descripcion}: {salida.ruta}")
     
     # Mostrar resumen
     print(f"\n{'='*60}")
     print("RESUMEN DEL SCRAPING")
     print(f"{'='*60}")
-    print(f"📦 Total de productos extraídos: {len(productos)}")
-    print(f"🖼️  Productos con imagen URL: {df['URL_Imagen'].astype(bool).sum()}")
-    if 'Imagen_Local' in df.columns:
-        imagenes_descargadas = df['Imagen_Local'].astype(bool).sum()
-        print(f"💾 Imágenes descargadas localmente: {imagenes_descargadas}")
-    if 'Descripcion' in df.columns:
-        con_descripcion = df['Descripcion'].astype(bool).sum()
-        print(f"📝 Productos con descripción: {con_descripcion}")
-    if 'Caracteristicas_Principales' in df.columns:
-        con_caracteristicas = df['Caracteristicas_Principales'].astype(bool).sum()
-        print(f"⚙️  Productos con características: {con_caracteristicas}")
-    print(f"💰 Rango de precios: ${df['Precio'].astype(str).str.replace(',', '').replace('', '0').astype(float).min():.0f} - ${df['Precio'].astype(str).str.replace(',', '').replace('', '0').astype(float).max():.0f}")
+    print(f"📦 Total de productos extraídos: {resumen.total}")
+    print(f"🖼️  Productos con imagen URL: {resumen.con_imagen_url}")
+    print(f"💾 Imágenes descargadas localmente: {resumen.con_imagen_local}")
+    print(f"📝 Productos con descripción: {resumen.con_descripcion}")
+    print(f"⚙️  Productos con características: {resumen.con_caracteristicas}")
+    if resumen.precio_min is not None:
+        print(f"💰 Rango de precios: ${resumen.precio_min:.0f} - ${resumen.precio_max:.0f}")
+    if sesion:
+        sesion.imprimir_estadisticas()
     print(f"{'='*60}")
+    return resumen.total
 
 # --- EJEMPLO DE USO ---
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Scraper de Mercado Libre')
+    parser.add_argument('url', nargs='?', default=URL_TIENDA_POR_DEFECTO,
+                        help='URL del listado de la tienda (por defecto Viaje Azul; '
+                             'para varias tiendas a la vez ver planificador.py)')
+    parser.add_argument('--sin-cache', action='store_true',
+                        help='No usar el cache de respuestas en datos/cache_http/')
+    parser.add_argument('--replay', action='store_true',
+                        help='Servir todo desde el cache, sin acceder a la red')
+    parser.add_argument('--parser', choices=['bs4', 'lxml'], default='bs4',
+                        help='Extractor de tarjetas del listado (lxml es más rápido)')
+    parser.add_argument('--procesos', type=int, nargs='?', const=procesos_por_defecto(), default=0,
+                        help='Parsear el HTML en N procesos (sin N: uno por núcleo menos uno; 0 = desactivado)')
+    parser.add_argument('--detalle', choices=['completo', 'parcial'], default='completo',
+                        help='Parsear la página de producto entera o solo hasta encontrar sus secciones')
+    parser.add_argument('--detalles-concurrentes', type=int, default=1,
+                        help='Páginas de producto a descargar en paralelo (por defecto 1)')
+    parser.add_argument('--refrescar-detalles', action='store_true',
+                        help='Visitar todas las páginas de producto aunque su tarjeta no haya cambiado')
+    parser.add_argument('--formatos', default=','.join(FORMATOS_POR_DEFECTO),
+                        help=f"Formatos de salida separados por coma ({', '.join(SALIDAS)}); "
+                             f"p. ej. csv,jsonl para no generar Excel")
+    parser.add_argument('--variantes', action='store_true',
+                        help='Generar miniaturas y versiones WebP/AVIF de las imágenes (requiere Pillow)')
+    parser.add_argument('--revalidar-imagenes', action='store_true',
+                        help='Revalidar todas las imágenes ya descargadas (GET condicional), '
+                             'aunque se hayan revisado hace poco')
+    parser.add_argument('--reanudar', action='store_true',
+                        help='Continuar el último scraping interrumpido (datos/checkpoint.sqlite)')
+    args = parser.parse_args()
+    formatos = [f.strip() for f in args.formatos.split(',') if f.strip()]
+    desconocidos = [f for f in formatos if f not in SALIDAS]
+    if desconocidos or not formatos:
+        parser.error(f"formatos no válidos: {args.formatos} (opciones: {', '.join(SALIDAS)})")
+    if args.variantes and not formatos_disponibles():
+        parser.error("--variantes requiere Pillow con soporte WebP o AVIF (pip install Pillow)")
+    
     print("\n" + "="*60)
     print(" SCRAPER DE MERCADO LIBRE - VERSIÓN MEJORADA")
     print("="*60)
     
-    # URL del listado de productos de la tienda Viaje Azul (con barra final)
-    url_inicial = "https://listado.mercadolibre.cl/pagina/ar20240628111129/"
+    url_inicial = args.url
     
     print(f"\n📍 URL objetivo: {url_inicial}")
     print(f"⚠️  NOTA: Respeta los términos de servicio de Mercado Libre")
@@ -471,12 +702,29 @@ if __name__ == "__main__":
     
     # Scrapear productos con detalles completos
     # Cambia extraer_detalles=False si solo quieres datos básicos (más rápido)
+    # Usa --detalles-concurrentes 4 para descargar los detalles en paralelo
     print(f"Iniciando scraping de TODOS los productos de la tienda...")
     print(f"Esto puede tomar aproximadamente 20-25 minutos.\n")
-    data = scrapear_tienda_ml(url_inicial, descargar_imagenes=True, extraer_detalles=True)
-    
-    # Guardar resultados
-    if data:
-        guardar_resultados(data, nombre_archivo='viaje_azul_productos')
+    cache = None if args.sin_cache else CacheHTTP(solo_replay=args.replay)
+    if args.replay:
+        print("🗄️  Modo replay: solo se usarán páginas guardadas en el cache\n")
+    sesion = SesionHTTP(cache=cache)
+    checkpoint = CheckpointCrawl(url_inicial, reanudar=args.reanudar)
+    # Los productos sin cambios en su tarjeta reutilizan los detalles de la ejecución anterior
+    huellas = HuellasProductos(reutilizar=not args.refrescar_detalles)
+    # Los productos se guardan a medida que se scrapean (ver salidas.py)
+    productos = iter_productos(url_inicial, descargar_imagenes=True, extraer_detalles=True, sesion=sesion,
+                               detalles_concurrentes=args.detalles_concurrentes,
+                               parser=args.parser, modo_detalle=args.detalle,
+                               procesos_parseo=args.procesos, checkpoint=checkpoint,
+                               huellas=huellas, variantes_imagenes=args.variantes,
+                               ttl_imagenes=0 if args.revalidar_imagenes else TTL_IMAGENES)
+    try:
+        guardar_resultados(productos, nombre_archivo='viaje_azul_productos', sesion=sesion,
+                           formatos=formatos)
+    except KeyboardInterrupt:
+        print("\n\n⏸️  Scraping interrumpido. Lo avanzado quedó en el checkpoint;")
+        print("   ejecuta de nuevo con --reanudar para continuar desde ahí.")
+        raise SystemExit(1)
     
     print("\n🎉 ¡Proceso completado!")
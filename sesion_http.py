@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sesión HTTP compartida para el scraper de Mercado Libre.
+Mantiene un pool de conexiones por host para que el handshake TCP+TLS se pague
+una sola vez por ejecución, y cuenta cuántas peticiones reutilizaron una conexión.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from limitador import ESTADOS_SATURACION, LimitadorAdaptativo
+
+# Tamaño del pool de conexiones para los hosts que más visita el scraper
+POOL_POR_HOST = {
+    'listado.mercadolibre.cl': 4,
+    'articulo.mercadolibre.cl': 8,
+    'www.mercadolibre.cl': 8,
+    'http2.mlstatic.com': 8,
+}
+
+# Tamaño del pool para cualquier otro host
+POOL_POR_DEFECTO = 10
+
+# Reintentos ante 429/503 (la espera la decide el limitador, respetando Retry-After)
+REINTENTOS_SATURACION = 3
+
+
+class AdaptadorContado(HTTPAdapter):
+    """
+    HTTPAdapter que conserva los contadores de conexiones de los pools
+    que urllib3 descarta, para que las estadísticas no se pierdan.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.peticiones_descartadas = 0
+        self.conexiones_descartadas = 0
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pools = self.poolmanager.pools
+        cerrar_pool = pools.dispose_func
+
+        def descartar(pool):
+            self.peticiones_descartadas += pool.num_requests
+            self.conexiones_descartadas += pool.num_connections
+            if cerrar_pool:
+                cerrar_pool(pool)
+
+        pools.dispose_func = descartar
+
+    def contadores(self):
+        """Devuelve (peticiones, conexiones nuevas) de todos los pools del adaptador"""
+        peticiones = self.peticiones_descartadas
+        conexiones = self.conexiones_descartadas
+        pools = self.poolmanager.pools
+        for clave in list(pools.keys()):
+            pool = pools.get(clave)
+            if pool is not None:
+                peticiones += pool.num_requests
+                conexiones += pool.num_connections
+        return peticiones, conexiones
+
+
+class SesionHTTP:
+    """
+    Envoltorio de requests.Session con pools de conexiones configurables por host.
+    Se comparte entre el listado, la extracción de detalles y la descarga de imágenes.
+    Opcionalmente usa un CacheHTTP (ver cache_http.py) para las páginas HTML.
+    Todas las peticiones que salen a la red pasan por un LimitadorAdaptativo por host.
+    """
+
+    def __init__(self, pool_por_host: Optional[Dict[str, int]] = None,
+                 pool_por_defecto: int = POOL_POR_DEFECTO, cache=None,
+                 limitador: Optional[LimitadorAdaptativo] = None, limitar: bool = True):
+        """
+        Args:
+            pool_por_host: Tamaño del pool de conexiones por host (por defecto POOL_POR_HOST)
+            pool_por_defecto: Tamaño del pool para los demás hosts
+            cache: CacheHTTP opcional para las páginas HTML
+            limitador: LimitadorAdaptativo a usar (por defecto uno nuevo)
+            limitar: Si es False no se limita el ritmo de las peticiones
+        """
+        self._sesion = requests.Session()
+        self.cache = cache
+        self.limitador = (limitador or LimitadorAdaptativo()) if limitar else None
+        self._adaptadores = []
+
+        adaptador = self._crear_adaptador(pool_por_defecto)
+        self._sesion.mount('http://', adaptador)
+        self._sesion.mount('https://', adaptador)
+
+        for host, tamano in (POOL_POR_HOST if pool_por_host is None else pool_por_host).items():
+            adaptador = self._crear_adaptador(tamano)
+            self._sesion.mount(f'http://{host}/', adaptador)
+            self._sesion.mount(f'https://{host}/', adaptador)
+
+    def _crear_adaptador(self, tamano: int) -> AdaptadorContado:
+        adaptador = AdaptadorContado(pool_connections=POOL_POR_DEFECTO, pool_maxsize=tamano)
+        self._adaptadores.append(adaptador)
+        return adaptador
+
+    def get(self, url: str, usar_cache: bool = True, tipo: Optional[str] = None,
+            **kwargs) -> requests.Response:
+        """
+        GET usando las conexiones del pool (timeout de 15s por defecto).
+        Si la sesión tiene un CacheHTTP y usar_cache es True, la respuesta pasa por el cache
+        con el TTL del tipo de página indicado ('listado', 'detalle'). El cache lee el cuerpo
+        completo, así que las lecturas parciales con stream=True deben usar usar_cache=False.
+        Con un cache en modo solo replay nunca se accede a la red, tampoco con usar_cache=False.
+        """
+        kwargs.setdefault('timeout', 15)
+        if self.cache is None:
+            return self._descargar(url, **kwargs)
+        if not usar_cache:
+            self.cache.exigir_red(url)
+            return self._descargar(url, **kwargs)
+
+        headers = kwargs.pop('headers', None) or {}
+
+        def descargar(condicionales):
+            return self._descargar(url, headers={**headers, **condicionales}, **kwargs)
+
+        return self.cache.obtener(url, descargar, tipo=tipo)
+
+    @property
+    def solo_replay(self) -> bool:
+        """True si la sesión no puede acceder a la red (cache en modo solo replay)"""
+        return self.cache is not None and self.cache.solo_replay
+
+    def desde_cache(self, url: str, tipo: Optional[str] = None) -> Optional[requests.Response]:
+        """Respuesta vigente del cache para la URL, sin acceder a la red (None si no hay)"""
+        if self.cache is None:
+            return None
+        return self.cache.copia_vigente(url, tipo)
+
+    def _descargar(self, url: str, **kwargs) -> requests.Response:
+        """GET real a la red, al ritmo que permite el limitador del host"""
+        if self.limitador is None:
+            return self._sesion.get(url, **kwargs)
+
+        for intento in range(REINTENTOS_SATURACION + 1):
+            self.limitador.esperar(url)
+            inicio = time.monotonic()
+            try:
+                response = self._sesion.get(url, **kwargs)
+            except requests.RequestException:
+                self.limitador.registrar(url, None, time.monotonic() - inicio)
+                raise
+            self.limitador.registrar(url, response.status_code, response.elapsed.total_seconds(),
+                                     response.headers.get('Retry-After'))
+            if response.status_code not in ESTADOS_SATURACION or intento == REINTENTOS_SATURACION:
+                return response
+            response.close()  # Con stream=True la conexión sigue tomada hasta cerrarla
+            print(f"    ⏳ {response.status_code} en {url[:60]}, reintentando más lento...")
+        return response
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Cuenta peticiones, conexiones nuevas y conexiones reutilizadas"""
+        peticiones = 0
+        conexiones = 0
+        for adaptador in self._adaptadores:
+            p, c = adaptador.contadores()
+            peticiones += p
+            conexiones += c
+        return {
+            'peticiones': peticiones,
+            'conexiones_nuevas': conexiones,
+            'conexiones_reutilizadas': max(peticiones - conexiones, 0),
+        }
+
+    def imprimir_estadisticas(self):
+        """Muestra el resumen de reutilización de conexiones (y del cache, si hay)"""
+        stats = self.estadisticas()
+        print(f"🔌 Conexiones: {stats['conexiones_nuevas']} nuevas, "
+              f"{stats['conexiones_reutilizadas']} reutilizadas "
+              f"({stats['peticiones']} peticiones)")
+        if self.cache is not None:
+            self.cache.imprimir_estadisticas()
+        if self.limitador is not None:
+            self.limitador.imprimir_estadisticas()
+
+    def cerrar(self):
+        self._sesion.close()
+        if self.cache is not None:
+            self.cache.cerrar()
+
+
+_sesion_global = None
+_lock_sesion = threading.Lock()
+
+
+def obtener_sesion() -> SesionHTTP:
+    """Devuelve la sesión compartida del proceso, creándola la primera vez"""
+    global _sesion_global
+    with _lock_sesion:
+        if _sesion_global is None:
+            _sesion_global = SesionHTTP()
+        return _sesion_global
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# Pruebas sin red del cache con la lectura parcial de detalles: no descarga la página entera,
+# usa las copias completas guardadas y en modo replay (páginas e imágenes) nunca accede a la red
+# Uso: python -m pytest test_cache_parcial.py
+
+import io
+
+import pytest
+import requests
+
+from cache_http import CacheHTTP, SinCacheError
+from imagenes import AlmacenImagenes, obtener_imagen
+from scraper_mercadolibre_v2 import descargar_imagen, extraer_detalles_producto
+from sesion_http import SesionHTTP
+
+URL_PRODUCTO = 'https://articulo.mercadolibre.cl/MLC-123-producto-de-prueba'
+
+# Todas las secciones de detalle al principio y después mucho relleno
+SECCIONES = b"""<html><body>
+<div class="ui-pdp-description"><p class="ui-pdp-description__content">Una mochila de viaje</p></div>
+<table class="andes-table"><tr><th>Marca</th><td>Viaje Azul</td></tr></table>
+<div class="ui-pdp-highlighted-specs"><div class="ui-pdp-highlighted-specs__item">
+<span class="label">Capacidad</span><span class="value">40 L</span></div></div>
+<div class="ui-pdp-specs"><table><tr><th>Color</th><td>Azul</td></tr></table></div>
+<script type="application/ld+json">{"@type": "Product", "name": "Mochila", "description": "Una mochila de viaje"}</script>
+"""
+RELLENO = b"<div class='relleno'>" + b"x" * 1000 + b"</div>\n"
+
+
+class CuerpoContado(io.BytesIO):
+    """Cuerpo de respuesta por trozos, como urllib3, que anota cuánto se leyó"""
+
+    leidos = 0
+
+    def close(self):
+        if not self.closed:
+            self.leidos = self.tell()
+        super().close()
+
+    def bytes_leidos(self):
+        return self.leidos if self.closed else self.tell()
+
+    def stream(self, tamano, decode_content=None):
+        while True:
+            trozo = self.read(tamano)
+            if not trozo:
+                break
+            yield trozo
+
+
+def respuesta_falsa(cuerpo):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = URL_PRODUCTO
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response.raw = cuerpo
+    return response
+
+
+def test_detalle_parcial_no_lee_todo_con_cache(tmp_path, monkeypatch):
+    pagina = SECCIONES + RELLENO * 2000 + b"</body></html>"
+    cuerpo = CuerpoContado(pagina)
+    cache = CacheHTTP(str(tmp_path / 'cache'))
+    sesion = SesionHTTP(cache=cache, limitar=False)
+    monkeypatch.setattr(sesion._sesion, 'get', lambda url, **kwargs: respuesta_falsa(cuerpo))
+
+    detalles = extraer_detalles_producto(URL_PRODUCTO, {}, verbose=False, sesion=sesion,
+                                         modo_detalle='parcial')
+
+    assert 'mochila' in detalles['Descripcion'].lower()
+    assert cuerpo.bytes_leidos() < len(pagina) // 10
+    # Nunca se guarda una página cortada
+    assert cache.buscar(URL_PRODUCTO) is None
+    sesion.cerrar()
+
+
+def test_detalle_parcial_usa_la_copia_completa_del_cache(tmp_path, monkeypatch):
+    pagina = SECCIONES + RELLENO * 10 + b"</body></html>"
+    cache = CacheHTTP(str(tmp_path / 'cache'))
+    cache.guardar(URL_PRODUCTO, respuesta_falsa(CuerpoContado(pagina)))
+    sesion = SesionHTTP(cache=cache, limitar=False)
+    pedidas = []
+    monkeypatch.setattr(sesion._sesion, 'get', lambda url, **kwargs: pedidas.append(url))
+
+    detalles = extraer_detalles_producto(URL_PRODUCTO, {}, verbose=False, sesion=sesion,
+                                         modo_detalle='parcial')
+
+    assert 'mochila' in detalles['Descripcion'].lower()
+    assert pedidas == []
+    sesion.cerrar()
+
+
+def test_replay_no_accede_a_la_red(tmp_path, monkeypatch):
+    sesion = SesionHTTP(cache=CacheHTTP(str(tmp_path / 'cache'), solo_replay=True), limitar=False)
+    pedidas = []
+    monkeypatch.setattr(sesion._sesion, 'get', lambda url, **kwargs: pedidas.append(url))
+
+    with pytest.raises(SinCacheError):
+        sesion.get(URL_PRODUCTO, usar_cache=False, stream=True)
+    detalles = extraer_detalles_producto(URL_PRODUCTO, {}, verbose=False, sesion=sesion,
+                                         modo_detalle='parcial')
+
+    assert detalles['Descripcion'] == ''
+    assert pedidas == []
+    sesion.cerrar()
+
+
+def test_replay_usa_las_imagenes_del_almacen(tmp_path, monkeypatch):
+    almacen = AlmacenImagenes(str(tmp_path / 'imagenes'))
+    guardada = 'https://http2.mlstatic.com/D_NQ_NP_1-MLC1-F.jpg'
+    imagen = respuesta_falsa(CuerpoContado(b'imagen guardada'))
+    imagen.headers['Content-Type'] = 'image/jpeg'
+    ruta, _ = almacen.guardar(imagen, guardada)
+    sesion = SesionHTTP(cache=CacheHTTP(str(tmp_path / 'cache'), solo_replay=True), limitar=False)
+    pedidas = []
+    monkeypatch.setattr(sesion._sesion, 'get', lambda url, **kwargs: pedidas.append(url))
+
+    # ttl=0 pediría revalidar; en modo replay se usa la copia sin preguntar
+    assert obtener_imagen(sesion, almacen, guardada, ttl=0) == (ruta, 'omitida')
+    assert obtener_imagen(sesion, almacen, 'https://http2.mlstatic.com/D_NQ_NP_2-MLC2-F.jpg') == (None, 'ausente')
+    assert descargar_imagen('https://http2.mlstatic.com/D_NQ_NP_3-MLC3-F.jpg', str(tmp_path), 'x', 1,
+                            sesion=sesion) is None
+    assert pedidas == []
+    almacen.cerrar()
+    sesion.cerrar()
+
+
+def test_objeto_eliminado_entre_buscar_y_leer_es_un_fallo(tmp_path):
+    cache = CacheHTTP(str(tmp_path / 'cache'))
+    cache.guardar(URL_PRODUCTO, respuesta_falsa(CuerpoContado(SECCIONES)))
+    entrada = cache.buscar(URL_PRODUCTO)
+    # Otro hilo aplica el límite de tamaño justo después de buscar
+    cache._ruta_objeto(entrada['hash']).unlink()
+    assert cache.respuesta(entrada) is None
+
+    cache.buscar = lambda url: entrada
+    response = cache.obtener(URL_PRODUCTO, lambda headers: respuesta_falsa(CuerpoContado(SECCIONES)), 'detalle')
+    assert response.status_code == 200
+    assert cache.estadisticas['aciertos'] == 0
+    cache.cerrar()
@@ -4,22 +4,21 @@
 import sys
 sys.path.insert(0, '/home/clynova/proyectos/scrapping_web')
 
-from scraper_mercadolibre_v2 import scrapear_tienda_ml, guardar_resultados
+from scraper_mercadolibre_v2 import URL_TIENDA_POR_DEFECTO
 
 print("\n" + "="*70)
 print(" PRUEBA DE SCRAPER CON DETALLES - 5 PRODUCTOS")
 print("="*70)
 
-url_inicial = "https://listado.mercadolibre.cl/pagina/ar20240628111129/"
+# URL del listado como primer argumento (por defecto la tienda Viaje Azul)
+url_inicial = sys.argv[1] if len(sys.argv) > 1 else URL_TIENDA_POR_DEFECTO
 
 print(f"\n📍 URL: {url_inicial}")
 print("🔧 Extrayendo primeros productos con detalles completos...")
 print("⏱️  Esto tomará aproximadamente 1-2 minutos\n")
 
 # Modificar temporalmente para obtener solo los primeros productos
-import requests
 from bs4 import BeautifulSoup
-import time
 
 headers = {
     'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -32,8 +31,10 @@ headers = {
 
 # Importar función de detalles
 from scraper_mercadolibre_v2 import extraer_detalles_producto
+from sesion_http import obtener_sesion
 
-response = requests.get(url_inicial, headers=headers)
+sesion = obtener_sesion()
+response = sesion.get(url_inicial, headers=headers)
 response.encoding = 'utf-8'
 soup = BeautifulSoup(response.text, 'lxml')
 
@@ -80,7 +81,7 @@ for idx, item in enumerate(items[:3], 1):
     
     if link:
         print("\n🔍 Extrayendo detalles...")
-        detalles = extraer_detalles_producto(link, headers)
+        detalles = extraer_detalles_producto(link, headers, sesion=sesion)
         
         print(f"\n📝 Descripción ({len(detalles['Descripcion'])} chars):")
         if detalles['Descripcion']:
@@ -112,12 +113,10 @@ for idx, item in enumerate(items[:3], 1):
                 print(f"   ... y {len(detalles['Otras_Caracteristicas']) - 3} más")
         else:
             print("   (No disponible)")
-        
-        print("\n⏳ Esperando 2 segundos antes del siguiente producto...")
-        time.sleep(2)
 
 print("\n" + "="*70)
 print("✅ PRUEBA COMPLETADA")
 print("="*70)
+sesion.imprimir_estadisticas()
 print("\n💡 Si los resultados son correctos, ejecuta el scraper completo con:")
 print("   python scraper_mercadolibre_v2.py")
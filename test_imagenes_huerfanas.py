@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# Prueba sin red: cuando una imagen cambia, el archivo de la versión anterior se borra del almacén
+# Uso: python -m pytest test_imagenes_huerfanas.py
+
+import io
+import os
+
+import requests
+
+from imagenes import AlmacenImagenes, obtener_imagen
+
+URL_IMAGEN = 'https://http2.mlstatic.com/D_NQ_NP_123-MLC456-F.jpg'
+LINK_PRODUCTO = 'https://articulo.mercadolibre.cl/MLC-456-mochila-de-viaje'
+
+
+class SesionFalsa:
+    """Responde a cada GET con el contenido que tenga en ese momento"""
+
+    solo_replay = False
+
+    def __init__(self, contenido):
+        self.contenido = contenido
+
+    def get(self, url, headers=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers['Content-Type'] = 'image/jpeg'
+        response.headers['ETag'] = f'"{len(self.contenido)}"'
+        response.raw = io.BytesIO(self.contenido)
+        return response
+
+
+def imagenes_en(almacen):
+    return sorted(nombre for nombre in os.listdir(almacen.carpeta) if nombre.endswith('.jpg'))
+
+
+def test_imagen_refrescada_borra_la_anterior(tmp_path):
+    almacen = AlmacenImagenes(str(tmp_path))
+    sesion = SesionFalsa(b'imagen vieja')
+    ruta_vieja, resultado = obtener_imagen(sesion, almacen, URL_IMAGEN)
+    assert resultado == 'nueva'
+
+    sesion.contenido = b'imagen nueva, distinta'
+    ruta_nueva, resultado = obtener_imagen(sesion, almacen, URL_IMAGEN, ttl=0)
+
+    assert resultado == 'refrescada'
+    assert not os.path.exists(ruta_vieja)
+    assert imagenes_en(almacen) == [os.path.basename(ruta_nueva)]
+    almacen.cerrar()
+
+
+def test_imagen_de_producto_se_borra_al_reasociar(tmp_path):
+    almacen = AlmacenImagenes(str(tmp_path))
+    sesion = SesionFalsa(b'imagen vieja')
+    ruta_vieja, _ = obtener_imagen(sesion, almacen, URL_IMAGEN)
+    almacen.asociar(LINK_PRODUCTO, URL_IMAGEN)
+
+    sesion.contenido = b'imagen nueva, distinta'
+    ruta_nueva, _ = obtener_imagen(sesion, almacen, URL_IMAGEN, ttl=0)
+    # El producto todavía apunta a la versión anterior
+    assert almacen.ruta_producto(LINK_PRODUCTO) == ruta_vieja
+    assert os.path.exists(ruta_vieja)
+
+    almacen.asociar(LINK_PRODUCTO, URL_IMAGEN)
+    assert almacen.ruta_producto(LINK_PRODUCTO) == ruta_nueva
+    assert not os.path.exists(ruta_vieja)
+    assert imagenes_en(almacen) == [os.path.basename(ruta_nueva)]
+    almacen.cerrar()
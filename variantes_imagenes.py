@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Variantes reducidas de las imágenes del almacén (miniaturas y WebP/AVIF), generadas en un
+pool de procesos apenas se descarga cada imagen. Requiere Pillow (opcional).
+
+Cada variante se guarda en datos/imagenes/variantes/<hash>_<tamaño>.<formato> y se anota
+en el índice del almacén, así una imagen ya procesada no se vuelve a procesar y
+conversor_a_json.py puede publicar las variantes de cada producto.
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from parseo_paralelo import procesos_por_defecto
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow es opcional
+    Image = None
+
+# Ancho máximo de cada tamaño (None = tamaño original, solo cambia el formato)
+TAMANOS_VARIANTES = {
+    'miniatura': 200,
+    'media': 600,
+    'grande': None,
+}
+
+# Formatos preferidos; se usan los que soporte la instalación de Pillow
+FORMATOS_VARIANTES = ('webp', 'avif')
+
+CALIDAD = {'webp': 80, 'avif': 60}
+
+CARPETA_VARIANTES = 'variantes'
+
+
+def formatos_disponibles(formatos: Sequence[str] = FORMATOS_VARIANTES) -> List[str]:
+    """Formatos de FORMATOS_VARIANTES que Pillow puede escribir"""
+    if Image is None:
+        return []
+    Image.init()
+    extensiones = Image.registered_extensions()
+    return [formato for formato in formatos if f'.{formato}' in extensiones]
+
+
+def generar_variantes(ruta_original: str, carpeta_variantes: str, digest: str,
+                      tamanos: Dict[str, Optional[int]], formatos: Sequence[str]) -> List[Tuple[str, str, str, int]]:
+    """
+    Genera las variantes de una imagen (se ejecuta en el pool de procesos).
+
+    Returns:
+        Lista de (tamaño, formato, archivo, bytes); archivo es relativo a la carpeta del almacén
+    """
+    os.makedirs(carpeta_variantes, exist_ok=True)
+    generadas = []
+    with Image.open(ruta_original) as original:
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+        for tamano, ancho in tamanos.items():
+            imagen = original
+            if ancho and original.width > ancho:
+                imagen = original.resize((ancho, round(original.height * ancho / original.width)),
+                                         Image.LANCZOS)
+            for formato in formatos:
+                nombre = f"{digest}_{tamano}.{formato}"
+                descriptor, temporal = tempfile.mkstemp(dir=carpeta_variantes, prefix='.variante-')
+                try:
+                    with os.fdopen(descriptor, 'wb') as archivo:
+                        imagen.save(archivo, format=formato.upper(), quality=CALIDAD.get(formato, 80))
+                    os.replace(temporal, os.path.join(carpeta_variantes, nombre))
+                except BaseException:
+                    os.remove(temporal)
+                    raise
+                generadas.append((tamano, formato, f"{CARPETA_VARIANTES}/{nombre}",
+                                  os.path.getsize(os.path.join(carpeta_variantes, nombre))))
+    return generadas
+
+
+class ProcesadorVariantes:
+    """
+    Genera las variantes de las imágenes de un AlmacenImagenes en un pool de procesos.
+    procesar() no espera: el resultado se anota en el índice del almacén al terminar.
+    Se puede llamar desde varios hilos (por ejemplo, los del DescargadorImagenes).
+    Si el pool falla, sigue procesando en el proceso actual (como parseo_paralelo).
+    """
+
+    def __init__(self, almacen, procesos: Optional[int] = None,
+                 tamanos: Dict[str, Optional[int]] = TAMANOS_VARIANTES,
+                 formatos: Sequence[str] = FORMATOS_VARIANTES):
+        """
+        Args:
+            almacen: AlmacenImagenes cuyas imágenes se procesan
+            procesos: Procesos del pool (por defecto uno por núcleo menos uno; 0 = sin pool)
+            tamanos: Tamaños a generar (ver TAMANOS_VARIANTES)
+            formatos: Formatos a generar, entre los que soporte Pillow
+        """
+        self.formatos = formatos_disponibles(formatos)
+        if not self.formatos:
+            raise ValueError(f"Las variantes de imágenes requieren Pillow con soporte para "
+                             f"{' o '.join(formatos)} (pip install Pillow)")
+        self.almacen = almacen
+        self.tamanos = dict(tamanos)
+        self.carpeta_variantes = os.path.join(almacen.carpeta, CARPETA_VARIANTES)
+        self.estadisticas = {'procesadas': 0, 'omitidas': 0, 'errores': 0,
+                             'bytes_originales': 0, 'bytes_miniaturas': 0}
+        self._enviadas = set()
+        self._lock = threading.Lock()
+        procesos = procesos_por_defecto() if procesos is None else procesos
+        self._pool = ProcessPoolExecutor(max_workers=procesos) if procesos > 0 else None
+
+    def procesar(self, ruta_original: str):
+        """Encola la imagen si todavía no tiene sus variantes"""
+        digest = os.path.splitext(os.path.basename(ruta_original))[0]
+        with self._lock:
+            if digest in self._enviadas or self.almacen.tiene_variantes(digest):
+                self.estadisticas['omitidas'] += 1
+                return
+            self._enviadas.add(digest)
+        argumentos = (ruta_original, self.carpeta_variantes, digest, self.tamanos, self.formatos)
+        if self._pool is not None:
+            try:
+                futuro = self._pool.submit(generar_variantes, *argumentos)
+                futuro.add_done_callback(lambda f: self._registrar(ruta_original, digest, f))
+                return
+            except (BrokenProcessPool, RuntimeError):
+                print("⚠️  El pool de variantes dejó de funcionar; se sigue en este proceso")
+                self._pool = None
+        try:
+            self._anotar(ruta_original, digest, generar_variantes(*argumentos))
+        except Exception as e:
+            self._error(ruta_original, e)
+
+    def _registrar(self, ruta_original: str, digest: str, futuro):
+        if futuro.cancelled():
+            return
+        try:
+            self._anotar(ruta_original, digest, futuro.result())
+        except Exception as e:
+            self._error(ruta_original, e)
+
+    def _anotar(self, ruta_original: str, digest: str, generadas):
+        self.almacen.registrar_variantes(digest, generadas)
+        with self._lock:
+            self.estadisticas['procesadas'] += 1
+            self.estadisticas['bytes_originales'] += os.path.getsize(ruta_original)
+            self.estadisticas['bytes_miniaturas'] += min(
+                (tamano_bytes for tamano, _, _, tamano_bytes in generadas if tamano == 'miniatura'), default=0)
+
+    def _error(self, ruta_original: str, error: Exception):
+        with self._lock:
+            self.estadisticas['errores'] += 1
+        print(f"Error generando variantes de {ruta_original}: {error}")
+
+    def imprimir_estadisticas(self):
+        stats = self.estadisticas
+        print(f"🗜️  Variantes ({', '.join(self.formatos)}): {stats['procesadas']} imágenes procesadas, "
+              f"{stats['omitidas']} ya procesadas, {stats['errores']} errores")
+        if stats['procesadas']:
+            print(f"   Originales: {stats['bytes_originales'] / 1024:.0f} KB → "
+                  f"miniaturas: {stats['bytes_miniaturas'] / 1024:.0f} KB")
+
+    def cerrar(self):
+        """Espera las variantes pendientes"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -76,20 +76,18 @@ mkdir -p datos/{csv,imagenes,json}
 
 # Copiar archivos CSV
 echo -e "${BLUE}Copiando archivos CSV...${NC}"
-cp -f *.csv datos/csv/ 2>/dev/null || true
+# -p conserva la fecha: el conversor usa el más reciente entre el CSV y el Parquet
+cp -fp *.csv datos/csv/ 2>/dev/null || true
+cp -fp *.parquet datos/csv/ 2>/dev/null || true
 
-# Copiar imágenes
-if [ -d "imagenes_mercadolibre" ]; then
-    echo -e "${BLUE}Copiando imágenes...${NC}"
-    cp -rf imagenes_mercadolibre/* datos/imagenes/ 2>/dev/null || true
-fi
+# Las imágenes ya quedan en datos/imagenes/ (almacén por hash, ver imagenes.py)
 
 # Contar archivos
 CSV_COUNT=$(ls datos/csv/*.csv 2>/dev/null | wc -l)
-IMG_COUNT=$(ls datos/imagenes/*.jpg 2>/dev/null | wc -l)
+IMG_COUNT=$(ls datos/imagenes/ | grep -cE '\.(jpg|png|webp|gif)$' || true)
 
 echo -e "${GREEN}✓ CSV copiados: $CSV_COUNT${NC}"
-echo -e "${GREEN}✓ Imágenes copiadas: $IMG_COUNT${NC}"
+echo -e "${GREEN}✓ Imágenes en el almacén: $IMG_COUNT${NC}"
 
 echo ""
 echo "═══════════════════════════════════════════════════════════════════════════"
@@ -98,7 +96,8 @@ echo "════════════════════════
 echo ""
 
 echo -e "${BLUE}Convirtiendo CSV a JSON según modelo de productos...${NC}"
-python conversor_a_json.py
+# --exportar-json: además del catálogo incremental (.jsonl) deja la lista JSON de siempre
+python conversor_a_json.py --exportar-json
 
 echo ""
 echo "═══════════════════════════════════════════════════════════════════════════"